@@ -0,0 +1,377 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from results_store import ResultsStore
+from session_engine import (EVENT_ENTER, EVENT_EXIT, EVENT_START, EVENT_STOP, NS_PER_S, ZONES,
+                            ZONE_LABELS, SessionEngine)
+
+# Agregador de estações de pontuação. Cada instância do aplicativo (estação)
+# envia, por TCP local ou socket Unix, os eventos das áreas durante o teste e
+# o resumo de cada sessão finalizada. O agregador mantém uma visão combinada
+# ao vivo (um SessionEngine por sessão em andamento), grava essa visão em um
+# arquivo JSON e guarda as sessões finalizadas em um banco de resultados.
+#
+# Protocolo: uma linha JSON por lote, {"station", "batch", "messages": [...]},
+# respondida com {"ack": batch}. Mensagens:
+#   {"type": "begin", "session", "header"}             início da sessão
+#   {"type": "events", "session", "seq", "events"}     eventos [t_ns, zona, tipo]
+#   {"type": "end", "session", "header", "events"}     sessão finalizada
+# Um lote não confirmado é reenviado após a reconexão; "seq" (posição do
+# primeiro evento na sessão) e a origem única no banco tornam o reenvio
+# inofensivo. A cada conexão, a estação reenvia "begin" e todos os eventos
+# das sessões em andamento, de modo que um agregador reiniciado reconstrói a
+# visão ao vivo. Mensagens inválidas são descartadas (e o lote confirmado),
+# para que a estação não as reenvie indefinidamente. Se o banco falhar ao
+# gravar uma sessão, a conexão é encerrada sem confirmar o lote, que a
+# estação reenvia. Uma sessão gravada no banco fica na visão só com o seu
+# resumo, e apenas as MAX_FINISHED mais recentes são mantidas. Um cliente
+# também pode enviar {"type": "status"} e recebe a visão combinada.
+#
+# Uso:
+#   python aggregator.py --listen 127.0.0.1:8765 --db agregado.db
+#   python aggregator.py --listen unix:/tmp/openfield.sock
+#   python aggregator.py --status 127.0.0.1:8765
+
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+STATE_PATH = 'agregador_estado.json'
+DB_PATH = 'agregado.db'
+
+# Intervalo de gravação da visão combinada, em segundos
+SNAPSHOT_INTERVAL = 1.0
+
+# Tamanho máximo de uma linha do protocolo (um resumo leva todos os eventos)
+LINE_LIMIT = 64 * 1024 * 1024
+
+# Sessões finalizadas mantidas na visão combinada (as demais ficam só no banco)
+MAX_FINISHED = 200
+
+EVENT_KINDS = (EVENT_START, EVENT_ENTER, EVENT_EXIT, EVENT_STOP)
+
+
+def parse_address(text):
+    # 'host:porta' -> ('tcp', host, porta); 'unix:/caminho' -> ('unix', caminho)
+    if text.startswith('unix:'):
+        return 'unix', text[len('unix:'):]
+    host, sep, port = text.rpartition(':')
+    if not sep or not port.isdigit():
+        raise ValueError(f"endereço inválido: {text!r} (use host:porta ou unix:/caminho)")
+    return 'tcp', host or '127.0.0.1', int(port)
+
+
+async def open_connection(address):
+    kind, *target = parse_address(address)
+    if kind == 'unix':
+        return await asyncio.open_unix_connection(target[0], limit=LINE_LIMIT)
+    return await asyncio.open_connection(*target, limit=LINE_LIMIT)
+
+
+def encode(message):
+    return json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n'
+
+
+def check_header(header):
+    if not isinstance(header, dict) or not isinstance(header.get('animal_id'), str):
+        raise ValueError("cabeçalho sem animal_id")
+    if not isinstance(header.get('duration'), (int, float)) or header['duration'] <= 0:
+        raise ValueError("cabeçalho sem duração válida")
+    zones = header.get('zones', ZONES)
+    if not isinstance(zones, (list, tuple)) or not zones or not all(isinstance(z, str) for z in zones):
+        raise ValueError("cabeçalho com áreas inválidas")
+
+
+def check_events(events, zone_count):
+    # Eventos [t_ns, zona, tipo] inteiros, com zona existente em entradas e saídas
+    if not isinstance(events, list):
+        raise ValueError("eventos não são uma lista")
+    for event in events:
+        if (not isinstance(event, list) or len(event) != 3
+                or not all(type(value) is int for value in event)):
+            raise ValueError(f"evento inválido: {event!r}")
+        if event[2] not in EVENT_KINDS:
+            raise ValueError(f"tipo de evento desconhecido: {event!r}")
+        if event[2] in (EVENT_ENTER, EVENT_EXIT) and not 0 <= event[1] < zone_count:
+            raise ValueError(f"área inexistente no evento: {event!r}")
+
+
+class Aggregator:
+    def __init__(self, db_path=DB_PATH, state_path=STATE_PATH):
+        self.db_path = db_path
+        self.state_path = state_path
+        self.stations = {}
+        self.sessions = {}
+        # Sessões já gravadas no banco, da mais antiga à mais recente
+        self.finished = {}
+        self.dirty = False
+        self.server = None
+        self.snapshot_task = None
+        self.clients = set()
+        # O banco é usado por uma única thread, fora do loop de eventos
+        self.db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='aggregator-db')
+        self.store = None
+
+    async def start(self, address):
+        kind, *target = parse_address(address)
+        if kind == 'unix':
+            if os.path.exists(target[0]):
+                os.remove(target[0])
+            self.server = await asyncio.start_unix_server(self.handle_client, target[0], limit=LINE_LIMIT)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, *target, limit=LINE_LIMIT)
+        self.snapshot_task = asyncio.create_task(self.snapshot_loop())
+        return self.server
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        # Encerra as conexões abertas e espera seus handlers terminarem
+        clients = list(self.clients)
+        for task, writer in clients:
+            writer.close()
+        await asyncio.gather(*(task for task, writer in clients), return_exceptions=True)
+        if self.snapshot_task is not None:
+            self.snapshot_task.cancel()
+        self.write_state()
+        await asyncio.get_running_loop().run_in_executor(self.db_executor, self.close_store)
+        self.db_executor.shutdown()
+
+    async def handle_client(self, reader, writer):
+        client = asyncio.current_task(), writer
+        self.clients.add(client)
+        station = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                packet = json.loads(line)
+                if packet.get('type') == 'status':
+                    writer.write(encode(self.view()))
+                    await writer.drain()
+                    continue
+                station = packet['station']
+                batch = packet['batch']
+                if not isinstance(station, str) or not isinstance(packet['messages'], list):
+                    raise ValueError("lote inválido")
+                self.station_seen(station, connected=True)
+                for message in packet['messages']:
+                    try:
+                        await self.handle_message(station, message)
+                    except (ValueError, KeyError, TypeError, IndexError) as e:
+                        print(f"Agregador: mensagem descartada ({station}): {e}", file=sys.stderr)
+                writer.write(encode({'ack': batch}))
+                await writer.drain()
+        except (OSError, ValueError, KeyError, TypeError, asyncio.LimitOverrunError) as e:
+            print(f"Agregador: conexão encerrada ({station or 'desconhecida'}): {e}", file=sys.stderr)
+        except sqlite3.Error as e:
+            # Lote não confirmado: a estação o reenvia ao reconectar
+            print(f"Agregador: falha ao gravar no banco, conexão encerrada "
+                  f"({station or 'desconhecida'}): {e}", file=sys.stderr)
+        finally:
+            self.clients.discard(client)
+            if station is not None:
+                self.station_seen(station, connected=False)
+            writer.close()
+
+    def station_seen(self, station, connected):
+        info = self.stations.setdefault(station, {})
+        info['connected'] = connected
+        info['last_seen'] = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.dirty = True
+
+    async def handle_message(self, station, message):
+        # Levanta ValueError/KeyError/TypeError para mensagens inválidas
+        key = f"{station}/{message['session']}"
+        kind = message['type']
+        if kind == 'begin':
+            if key not in self.sessions:
+                header = message['header']
+                check_header(header)
+                engine = SessionEngine(header.get('zones', ZONES), clock=lambda: 0)
+                engine.start(header['animal_id'], header['duration'], t_ns=0)
+                self.sessions[key] = {'station': station, 'header': header, 'engine': engine,
+                                      'received': 0, 'finished': False}
+        elif kind == 'events':
+            session = self.sessions.get(key)
+            if session is None or session['finished']:
+                return
+            engine = session['engine']
+            if type(message['seq']) is not int or message['seq'] < 0:
+                raise ValueError(f"posição inválida: {message['seq']!r}")
+            check_events(message['events'], len(engine.zones))
+            # Eventos já recebidos (lote reenviado) são ignorados
+            skip = max(0, session['received'] - message['seq'])
+            for t_ns, zone, event in message['events'][skip:]:
+                if event == EVENT_ENTER:
+                    engine.press(zone, t_ns)
+                elif event == EVENT_EXIT:
+                    engine.release(zone, t_ns)
+                elif event == EVENT_STOP:
+                    engine.stop(t_ns)
+            session['received'] = max(session['received'], message['seq'] + len(message['events']))
+            if engine.events:
+                # Âncora para estimar o tempo da sessão entre um lote e outro
+                session['anchor'] = (engine.events[-1][0], time.monotonic_ns())
+        elif kind == 'end':
+            header = message.get('header') or self.sessions.get(key, {}).get('header', {})
+            check_header(header)
+            check_events(message['events'], len(header.get('zones', ZONES)))
+            engine = SessionEngine.from_events(header['animal_id'], header['duration'],
+                                               message['events'], header.get('zones', ZONES))
+            self.sessions[key] = {'station': station, 'header': header, 'engine': engine,
+                                  'received': len(message['events']), 'finished': True}
+            await asyncio.get_running_loop().run_in_executor(
+                self.db_executor, self.save_session, key, header, engine)
+            self.compact(key)
+        else:
+            raise ValueError(f"tipo de mensagem desconhecido: {kind!r}")
+        self.dirty = True
+
+    def save_session(self, key, header, engine):
+        if self.store is None:
+            self.store = ResultsStore(self.db_path)
+        try:
+            self.store.add_session(engine.summary(), header.get('started_at', ''), engine.events,
+                                   protocol=header.get('protocol', ''), group=header.get('group', ''),
+                                   source=f"aggregator:{key}")
+        except sqlite3.Error:
+            # A próxima sessão abre uma conexão nova
+            self.close_store()
+            raise
+
+    def compact(self, key):
+        # Sessão gravada: os eventos são descartados e fica só o resumo
+        session = self.sessions.get(key)
+        if session is None or 'engine' not in session:
+            return
+        self.sessions[key] = {'station': session['station'], 'header': session['header'],
+                              'finished': True, 'view': self.session_view(session)}
+        self.finished.pop(key, None)
+        self.finished[key] = True
+        while len(self.finished) > MAX_FINISHED:
+            oldest = next(iter(self.finished))
+            del self.finished[oldest]
+            del self.sessions[oldest]
+
+    def close_store(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def session_view(self, session):
+        if 'view' in session:
+            return session['view']
+        engine = session['engine']
+        header = session['header']
+        t_ns, received_ns = session.get('anchor', (0, time.monotonic_ns()))
+        if engine.running:
+            t_ns += time.monotonic_ns() - received_ns
+        return {
+            'station': session['station'],
+            'animal_id': header['animal_id'],
+            'started_at': header.get('started_at', ''),
+            'group': header.get('group', ''),
+            'finished': session['finished'] or not engine.running,
+            'elapsed_s': engine.elapsed_ns(t_ns) / NS_PER_S,
+            'active_zone': engine.active_zone,
+            'zones': list(engine.zones),
+            'zone_seconds': engine.zone_seconds(t_ns),
+        }
+
+    def view(self):
+        # Visão combinada: estações e tempo por área de cada sessão
+        sessions = {key: self.session_view(session) for key, session in self.sessions.items()}
+        return {'updated_at': time.strftime('%Y-%m-%d %H:%M:%S'), 'stations': self.stations,
+                'sessions': sessions}
+
+    def write_state(self):
+        temp_path = self.state_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.view(), file, ensure_ascii=False, indent=1)
+        os.replace(temp_path, self.state_path)
+        self.dirty = False
+
+    async def snapshot_loop(self):
+        while True:
+            await asyncio.sleep(SNAPSHOT_INTERVAL)
+            if self.dirty:
+                try:
+                    self.write_state()
+                except OSError as e:
+                    print(f"Agregador: não foi possível gravar {self.state_path}: {e}", file=sys.stderr)
+
+
+def format_view(view):
+    lines = [f"Atualizado em {view['updated_at']}"]
+    for station, info in sorted(view['stations'].items()):
+        state = 'conectada' if info['connected'] else f"desconectada desde {info['last_seen']}"
+        lines.append(f"Estação {station}: {state}")
+    for key, session in sorted(view['sessions'].items()):
+        state = 'finalizada' if session['finished'] else 'ao vivo'
+        times = "  ".join(f"{ZONE_LABELS.get(zone, zone)} {seconds:.1f} s"
+                          for zone, seconds in zip(session['zones'], session['zone_seconds']))
+        lines.append(f"  {key} [{session['animal_id']}] {state}, {session['elapsed_s']:.1f} s: {times}")
+    return "\n".join(lines)
+
+
+async def request_status(address):
+    reader, writer = await open_connection(address)
+    writer.write(encode({'type': 'status'}))
+    await writer.drain()
+    view = json.loads(await reader.readline())
+    writer.close()
+    return view
+
+
+async def serve(address, db_path, state_path):
+    aggregator = Aggregator(db_path, state_path)
+    server = await aggregator.start(address)
+    print(f"Agregador escutando em {address}", file=sys.stderr)
+    # SIGTERM encerra como Ctrl+C: a visão combinada é gravada uma última vez
+    task = asyncio.current_task()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    except NotImplementedError:
+        pass
+    try:
+        async with server:
+            await server.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await aggregator.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agregador de estações do Open Field")
+    parser.add_argument('--listen', default=DEFAULT_ADDRESS,
+                        help=f"host:porta ou unix:/caminho (padrão: {DEFAULT_ADDRESS})")
+    parser.add_argument('--db', default=DB_PATH, help=f"Banco das sessões finalizadas (padrão: {DB_PATH})")
+    parser.add_argument('--state', default=STATE_PATH,
+                        help=f"Arquivo JSON da visão combinada (padrão: {STATE_PATH})")
+    parser.add_argument('--status', metavar='ENDEREÇO',
+                        help="Mostra a visão combinada de um agregador em execução e sai")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.status:
+            print(format_view(asyncio.run(request_status(args.status))))
+        else:
+            asyncio.run(serve(args.listen, args.db, args.state))
+    except (OSError, ValueError) as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+
+from session_engine import ZONES
+
+# Geometria da arena para classificar uma posição em Canto, Lateral ou
+# Centro. A arena é um retângulo (x0, y0)-(x1, y1); a faixa periférica tem
+# largura "border" (fração do lado). Um ponto na faixa periférica dos dois
+# eixos está em um canto, em apenas um eixo está na lateral, e fora dela
+# está no centro. Pontos fora do retângulo contam como periferia.
+
+CORNER = ZONES.index('corner')
+LATERAL = ZONES.index('lateral')
+CENTER = ZONES.index('center')
+
+
+class ArenaGeometry:
+    def __init__(self, x0=0.0, y0=0.0, x1=1.0, y1=1.0, border=0.25):
+        self.x0 = float(min(x0, x1))
+        self.y0 = float(min(y0, y1))
+        self.x1 = float(max(x0, x1))
+        self.y1 = float(max(y0, y1))
+        self.border = float(border)
+
+    @property
+    def width(self):
+        return self.x1 - self.x0
+
+    @property
+    def height(self):
+        return self.y1 - self.y0
+
+    def normalize(self, x, y):
+        # Coordenadas relativas à arena (0 a 1 dentro do retângulo)
+        return (x - self.x0) / self.width, (y - self.y0) / self.height
+
+    def classify(self, x, y):
+        # Versão escalar, para amostras individuais (ex.: traçado ao vivo)
+        u, v = self.normalize(x, y)
+        edge_x = u < self.border or u > 1 - self.border
+        edge_y = v < self.border or v > 1 - self.border
+        if edge_x and edge_y:
+            return CORNER
+        if edge_x or edge_y:
+            return LATERAL
+        return CENTER
+
+    def classify_array(self, x, y):
+        # Versão vetorizada; posições NaN resultam em -1
+        u, v = self.normalize(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        edge_x = (u < self.border) | (u > 1 - self.border)
+        edge_y = (v < self.border) | (v > 1 - self.border)
+        zones = np.full(u.shape, CENTER, dtype=np.int64)
+        zones[edge_x ^ edge_y] = LATERAL
+        zones[edge_x & edge_y] = CORNER
+        zones[np.isnan(u) | np.isnan(v)] = -1
+        return zones
+
+    def to_dict(self):
+        return {'x0': self.x0, 'y0': self.y0, 'x1': self.x1, 'y1': self.y1, 'border': self.border}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def load_geometry(path):
+    with open(path, encoding='utf-8') as file:
+        return ArenaGeometry.from_dict(json.load(file))
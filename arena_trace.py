@@ -0,0 +1,158 @@
+from kivy.graphics import Color, Line, Rectangle
+from kivy.uix.widget import Widget
+
+from arena_geometry import ArenaGeometry
+from session_engine import ZONES
+from trajectory import TrajectoryBuffer
+from zone_input import wall_to_monotonic_ns
+
+# Arena desenhada na tela: o observador acompanha o animal com o mouse ou o
+# dedo. Cada movimento vira uma amostra (t, x, y) no TrajectoryBuffer e a
+# área é deduzida da posição pela ArenaGeometry. O traçado é uma única
+# instrução Line; pontos muito próximos na tela são descartados e, se o
+# traçado passar de MAX_LINE_POINTS, a resolução exibida é reduzida à
+# metade, de modo que o custo de desenho não cresce com a sessão. As
+# amostras guardadas no buffer não são afetadas.
+
+# Distância mínima na tela (pixels) entre dois pontos desenhados
+MIN_PIXEL_STEP = 2.0
+
+# Número máximo de pontos do traçado exibido
+MAX_LINE_POINTS = 4000
+
+ARENA_COLOR = (0.25, 0.25, 0.25, 1)
+BORDER_COLOR = (0.6, 0.6, 0.6, 1)
+TRACE_COLOR = (1, 0.85, 0, 1)
+
+
+class ArenaTraceWidget(Widget):
+    """Arena quadrada para traçar a posição do animal.
+
+    press(zone, t_ns) e release(zone, t_ns) são chamados quando a área
+    deduzida da posição muda e quando o traçado é interrompido.
+    """
+
+    def __init__(self, press, release, geometry=None, **kwargs):
+        super().__init__(**kwargs)
+        self.press = press
+        self.release = release
+        self.geometry = geometry or ArenaGeometry()
+        self.buffer = TrajectoryBuffer()
+        self.enabled = False
+        self.current_zone = None
+        self.line_points = []
+        self.last_point = None
+
+        with self.canvas:
+            Color(*ARENA_COLOR)
+            self.arena_rect = Rectangle()
+            Color(*BORDER_COLOR)
+            self.outline = Line(width=1.5)
+            self.border_lines = Line(width=1)
+            Color(*TRACE_COLOR)
+            self.trace = Line(width=1.2)
+
+        self.bind(pos=self.redraw, size=self.redraw)
+
+    def arena_box(self):
+        # Maior quadrado centralizado no widget: (x, y, lado)
+        side = min(self.width, self.height)
+        return self.x + (self.width - side) / 2, self.y + (self.height - side) / 2, side
+
+    def to_arena(self, x, y):
+        left, bottom, side = self.arena_box()
+        return (x - left) / side, (y - bottom) / side
+
+    def to_screen(self, u, v):
+        left, bottom, side = self.arena_box()
+        return left + u * side, bottom + v * side
+
+    def redraw(self, *args):
+        left, bottom, side = self.arena_box()
+        self.arena_rect.pos = (left, bottom)
+        self.arena_rect.size = (side, side)
+        self.outline.rectangle = (left, bottom, side, side)
+
+        # Limites da periferia (duas linhas verticais e duas horizontais)
+        border = self.geometry.border * side
+        inner = (left + border, bottom + border, left + side - border, bottom + side - border)
+        points = []
+        for x in (inner[0], inner[2]):
+            points += [x, bottom, x, bottom + side, x, bottom]
+        for y in (inner[1], inner[3]):
+            points += [left, y, left + side, y, left, y]
+        self.border_lines.points = points
+
+        self.rebuild_trace()
+
+    def rebuild_trace(self):
+        # Redesenha o traçado a partir do buffer (ex.: após redimensionar)
+        self.line_points = []
+        self.last_point = None
+        _, u, v = self.buffer.arrays()
+        for x, y in zip(u.tolist(), v.tolist()):
+            if x != x:  # NaN: interrupção do traçado; não há como separar em uma Line
+                continue
+            self.add_line_point(*self.to_screen(x, y))
+        self.trace.points = self.line_points
+
+    def add_line_point(self, x, y):
+        if self.last_point is not None:
+            last_x, last_y = self.last_point
+            if abs(x - last_x) < MIN_PIXEL_STEP and abs(y - last_y) < MIN_PIXEL_STEP:
+                return False
+        self.line_points += [x, y]
+        self.last_point = (x, y)
+        if len(self.line_points) > 2 * MAX_LINE_POINTS:
+            # Mantém um ponto a cada dois, preservando o último
+            kept = self.line_points[:-2]
+            self.line_points = [c for i in range(0, len(kept), 4) for c in kept[i:i + 2]]
+            self.line_points += [x, y]
+        return True
+
+    def clear(self):
+        self.buffer.clear()
+        self.current_zone = None
+        self.line_points = []
+        self.last_point = None
+        self.trace.points = []
+
+    def record(self, touch, t_ns):
+        u, v = self.to_arena(*touch.pos)
+        u = min(max(u, 0.0), 1.0)
+        v = min(max(v, 0.0), 1.0)
+        self.buffer.append(t_ns, u, v)
+
+        zone = ZONES[self.geometry.classify(u, v)]
+        if zone != self.current_zone:
+            self.current_zone = zone
+            self.press(zone, t_ns)
+
+        if self.add_line_point(*self.to_screen(u, v)):
+            self.trace.points = self.line_points
+
+    def on_touch_down(self, touch):
+        if not self.enabled or not self.collide_point(*touch.pos):
+            return super().on_touch_down(touch)
+        touch.grab(self)
+        self.record(touch, wall_to_monotonic_ns(touch.time_start))
+        return True
+
+    def on_touch_move(self, touch):
+        if touch.grab_current is not self:
+            return super().on_touch_move(touch)
+        if self.enabled:
+            self.record(touch, wall_to_monotonic_ns(touch.time_update))
+        return True
+
+    def on_touch_up(self, touch):
+        if touch.grab_current is not self:
+            return super().on_touch_up(touch)
+        touch.ungrab(self)
+        t_ns = wall_to_monotonic_ns(touch.time_end if touch.time_end > 0 else touch.time_update)
+        if self.enabled:
+            self.buffer.append_break(t_ns)
+        if self.current_zone is not None:
+            self.release(self.current_zone, t_ns)
+            self.current_zone = None
+        return True
@@ -0,0 +1,124 @@
+import argparse
+import glob
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from exporter import write_csv_rows
+from journal import JOURNAL_DIR, JOURNAL_EXT, read_journal
+from metrics import metrics_from_events, metrics_row
+from results_store import ResultsStore, row_to_summary
+from session_engine import ZONES, report_row, summarize_events
+
+# Análise em lote dos diários de sessão (*.ofj), sem interface gráfica.
+# Calcula as mesmas métricas do relatório do aplicativo (incluindo latência,
+# entradas e transições entre áreas) para cada sessão e grava uma tabela de
+# resultados (CSV), distribuindo o trabalho entre vários processos.
+#
+# Uso:
+#   python batch_analysis.py sessoes/ -o resultados.csv
+#   python batch_analysis.py "estudo_*/**/*.ofj" --workers 8
+#   python batch_analysis.py --db openfield.db --group controle --from 2025-07-01 --to 2025-07-31
+
+
+def collect_paths(inputs):
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, '**', '*' + JOURNAL_EXT)
+            paths.extend(glob.glob(pattern, recursive=True))
+        else:
+            paths.extend(glob.glob(item, recursive=True))
+    return sorted(set(paths))
+
+
+def analyze_session(path):
+    # Executado nos processos de trabalho: devolve (caminho, linha, erro)
+    try:
+        header, events = read_journal(path)
+        zones = header.get('zones', ZONES)
+        summary = summarize_events(header['animal_id'], header['duration'], events, zones)
+        row = report_row(summary, header.get('started_at', ''))
+        row.update(metrics_row(metrics_from_events(events, zones=zones)))
+        return path, row, None
+    except (OSError, ValueError, KeyError, IndexError, TypeError, struct.error) as e:
+        # Diário truncado ou cabeçalho malformado: o erro fica na linha do arquivo
+        return path, None, str(e)
+
+
+def analyze_paths(paths, workers=None):
+    # Gera (caminho, linha, erro) na mesma ordem de paths
+    if not paths:
+        return
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(analyze_session, paths)
+        return
+    chunksize = max(1, len(paths) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(analyze_session, paths, chunksize=chunksize)
+
+
+def analyze_store(db_path, **filters):
+    # Coorte consultada no banco de resultados (índices por animal, data,
+    # protocolo e grupo); os eventos brutos vêm da tabela "events"
+    with ResultsStore(db_path) as store:
+        for session in store.query_sessions(**filters):
+            row = report_row(row_to_summary(session), session['started_at'])
+            row.update(metrics_row(metrics_from_events(store.session_events(session['id']))))
+            yield session['source'] or f"db:{session['id']}", row, None
+
+
+def write_table(results, output):
+    errors = []
+
+    def rows():
+        for path, row, error in results:
+            if error is not None:
+                errors.append((path, error))
+                continue
+            yield {'Arquivo': path, **row}
+    count = write_csv_rows(output, rows())
+    return count, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análise em lote de sessões do Open Field")
+    parser.add_argument('inputs', nargs='*', default=[JOURNAL_DIR],
+                        help="Diretórios ou padrões glob de diários de sessão (*.ofj)")
+    parser.add_argument('-o', '--output', help="Arquivo CSV de saída (padrão: saída padrão)")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Número de processos (padrão: número de CPUs)")
+    parser.add_argument('--db', help="Consulta o banco de resultados em vez dos diários")
+    parser.add_argument('--animal', help="Filtro por ID do animal (com --db)")
+    parser.add_argument('--group', help="Filtro por grupo (com --db)")
+    parser.add_argument('--protocol', help="Filtro por protocolo (com --db)")
+    parser.add_argument('--from', dest='date_from', help="Data inicial AAAA-MM-DD (com --db)")
+    parser.add_argument('--to', dest='date_to', help="Data final AAAA-MM-DD (com --db)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    if args.db:
+        results = analyze_store(args.db, animal_id=args.animal, group=args.group,
+                                protocol=args.protocol, date_from=args.date_from,
+                                date_to=args.date_to)
+    else:
+        results = analyze_paths(collect_paths(args.inputs), args.workers)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8', newline='') as output:
+            count, errors = write_table(results, output)
+    else:
+        count, errors = write_table(results, sys.stdout)
+    elapsed = time.perf_counter() - started
+
+    for path, error in errors:
+        print(f"Erro em {path}: {error}", file=sys.stderr)
+    print(f"{count} sessão(ões) analisada(s) em {elapsed:.2f} s "
+          f"({len(errors)} com erro)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
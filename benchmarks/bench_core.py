@@ -0,0 +1,148 @@
+import os
+
+from timing import measure, measure_once, synthetic_events
+
+from session_engine import ZONES, SessionEngine, format_report, report_row
+from metrics import metrics_from_events, format_metrics, metrics_row
+from journal import JournalWriter
+from results_store import ResultsStore
+from exporter import FORMATS, export_session, export_all_sessions, write_csv, write_jsonl
+
+# Benchmarks sem interface: motor de sessão, relatório, gráfico (Agg),
+# diário e exportação. Cada função recebe um diretório temporário e
+# retorna {nome: resultado de measure()}.
+
+PRESS_PAIRS = 1000
+EXPORT_ROWS = 10000
+STORE_SESSIONS = 300
+
+
+def bench_engine(tmpdir):
+    engine = SessionEngine()
+
+    def setup():
+        # Cada repetição começa em uma sessão nova (start recusa se ainda roda)
+        engine.reset()
+        engine.start('bench', 3600, t_ns=0)
+
+    def press_release():
+        # Pares pressiona/solta alternando as áreas, com instantes crescentes
+        t_ns = engine.events[-1][0]
+        for index in range(PRESS_PAIRS):
+            zone = ZONES[index % len(ZONES)]
+            t_ns += 1000
+            engine.press(zone, t_ns)
+            t_ns += 1000
+            engine.release(zone, t_ns)
+
+    return {'engine.press_release': measure(press_release, repeat=7, setup=setup,
+                                            ops=2 * PRESS_PAIRS)}
+
+
+def report_text(engine):
+    # O mesmo trabalho de generate_report, sem a interface
+    summary = engine.summary()
+    metrics = metrics_from_events(engine.events, engine.elapsed_ns())
+    row = report_row(summary)
+    row.update(metrics_row(metrics))
+    return format_report(summary) + format_metrics(metrics), row
+
+
+def bench_report(tmpdir):
+    engine = SessionEngine.from_events('bench', 600, synthetic_events(600, visits=1000))
+    return {'report.generate': measure(lambda: report_text(engine), number=5, repeat=7)}
+
+
+def bench_chart(tmpdir):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from zone_chart import ZonePie
+
+    state = {}
+
+    def build():
+        state['pie'] = ZonePie()
+        state['canvas'] = FigureCanvasAgg(state['pie'].figure)
+        state['pie'].update((10.0, 20.0, 30.0))
+        state['canvas'].draw()
+
+    results = {'chart.first_render': measure_once(build)}
+    pie, canvas = state['pie'], state['canvas']
+    sizes = [(10.0 + i, 20.0, 30.0 + 2 * i) for i in range(50)]
+    index = [0]
+
+    def update_draw():
+        index[0] = (index[0] + 1) % len(sizes)
+        if pie.update(sizes[index[0]]):
+            canvas.draw()
+
+    results['chart.update_render'] = measure(update_draw, number=5, repeat=5)
+    results['chart.update_unchanged'] = measure(lambda: pie.update(sizes[index[0]]), number=1000)
+    return results
+
+
+def bench_journal(tmpdir):
+    events = synthetic_events(600, visits=5000)
+    counter = [0]
+
+    def write():
+        counter[0] += 1
+        writer = JournalWriter(os.path.join(tmpdir, f'bench_{counter[0]}.ofj'),
+                               {'animal_id': 'bench', 'duration': 600, 'zones': list(ZONES)})
+        for event in events:
+            writer.append(*event)
+        writer.close()
+
+    return {'journal.append_close': measure(write, repeat=5, ops=len(events))}
+
+
+def file_rate(result, path, ops):
+    # Vazão em MB/s, a partir do tamanho do arquivo gravado
+    result['ops_per_s'] = ops * 1e3 / result['median_ms'] if result['median_ms'] else None
+    result['mb_per_s'] = os.path.getsize(path) / 1e6 / (result['median_ms'] / 1e3)
+    return result
+
+
+def bench_export(tmpdir):
+    engine = SessionEngine.from_events('bench', 600, synthetic_events(600, visits=1000))
+    text, row = report_text(engine)
+    header = {'animal_id': 'bench', 'duration': 600, 'zones': list(ZONES)}
+    results = {}
+    for fmt, extension in FORMATS.items():
+        path = os.path.join(tmpdir, 'sessao' + extension)
+        result = measure(lambda: export_session(path, fmt, text, row, engine.events, header),
+                         number=10, repeat=5)
+        results[f'export.session.{extension[1:]}'] = file_rate(result, path, 1)
+
+    rows = [dict(row, **{'ID do Animal': f'A{i}'}) for i in range(EXPORT_ROWS)]
+    for name, writer in (('csv', write_csv), ('jsonl', write_jsonl)):
+        path = os.path.join(tmpdir, 'linhas.' + name)
+        result = measure(lambda: writer(path, rows), repeat=3)
+        results[f'export.rows.{name}'] = file_rate(result, path, EXPORT_ROWS)
+    return results
+
+
+def bench_store_export(tmpdir):
+    db_path = os.path.join(tmpdir, 'bench.db')
+    events = synthetic_events(300, visits=200)
+    summary = SessionEngine.from_events('bench', 300, events).summary()
+    with ResultsStore(db_path) as store:
+        for index in range(STORE_SESSIONS):
+            summary['animal_id'] = f'A{index:04d}'
+            store.add_session(summary, f'2025-07-{1 + index % 28:02d} 10:00:00', events,
+                              group=('controle', 'tratado')[index % 2], source=f'bench_{index}')
+    path = os.path.join(tmpdir, 'todas.csv')
+    result = measure(lambda: export_all_sessions(path, 'CSV', db_path), repeat=3)
+    return {'export.all_sessions.csv': file_rate(result, path, STORE_SESSIONS)}
+
+
+CORE_BENCHMARKS = (bench_engine, bench_report, bench_chart, bench_journal,
+                   bench_export, bench_store_export)
+
+
+def run_core(tmpdir, only=None):
+    results = {}
+    for bench in CORE_BENCHMARKS:
+        if only and not any(name in bench.__name__ for name in only):
+            continue
+        results.update(bench(tmpdir))
+    return results
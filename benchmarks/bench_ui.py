@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import sys
+
+from timing import headless_environment, measure, measure_once, synthetic_events
+
+# Benchmarks da interface Kivy, executados em um processo separado (chamado
+# por run_benchmarks.py) para que uma falha do driver gráfico não derrube a
+# suíte. Sem servidor gráfico, a janela é criada pelo driver "offscreen" do
+# SDL. Deve ser executado em um diretório temporário: o aplicativo grava
+# diários e o banco de resultados no diretório atual.
+#
+#   python bench_ui.py --output ui.json
+#   python bench_ui.py --cold-start inicio.json
+
+PRESS_PAIRS = 200
+
+
+def run_ui():
+    from kivy.core.window import Window
+    from kivy.base import EventLoop
+    import openfield
+    from session_engine import SessionEngine, ZONES
+    from exporter import FORMATS, export_session
+
+    results = {}
+    state = {}
+
+    def build():
+        state['app'] = openfield.OpenFieldApp()
+        Window.add_widget(state['app'])
+        EventLoop.idle()
+
+    results['ui.build'] = measure_once(build)
+    app = state['app']
+    app.animal_id_input.text = 'bench'
+    app.duration_input.text = '3600'
+    app.start_test(None)
+
+    handlers = [(getattr(app, f'on_{zone}_press'), getattr(app, f'on_{zone}_release'),
+                 app.zone_buttons[zone]) for zone in ZONES]
+
+    def press_release():
+        # Mesmo caminho dos botões: on_*_press/on_*_release -> motor -> diário
+        for index in range(PRESS_PAIRS):
+            press, release, button = handlers[index % len(handlers)]
+            press(button)
+            release(button)
+
+    results['ui.press_release'] = measure(press_release, repeat=5, ops=2 * PRESS_PAIRS)
+    app.stop_test(manual_stop=False)
+
+    # Relatório e gráfico sobre uma sessão sintética de 10 minutos
+    sessions = [SessionEngine.from_events('bench', 600, synthetic_events(600, 1000, seed=seed)).events
+                for seed in (1, 2)]
+    app.engine.load_events('bench', 600, sessions[0])
+    results['ui.generate_report'] = measure(lambda: app.generate_report(None), number=3, repeat=5)
+
+    swap = [0]
+
+    def load_other():
+        swap[0] ^= 1
+        app.engine.load_events('bench', 600, sessions[swap[0]])
+
+    results['ui.show_pie_chart'] = measure(app.show_pie_chart, repeat=7, setup=load_other)
+
+    def open_dialog():
+        app.export_report(None)
+        popup = Window.children[0]
+        popup.dismiss(animation=False)
+
+    results['ui.export_dialog'] = measure(open_dialog, repeat=5)
+
+    header = {'animal_id': 'bench', 'duration': 600, 'zones': list(ZONES)}
+    for fmt, extension in FORMATS.items():
+        path = 'bench_export' + extension
+
+        def export():
+            # Mesmo caminho de "Salvar": tarefa na thread de exportação
+            app.export_worker.submit(export_session, path, fmt, app.report_text.text,
+                                     dict(app.test_data), list(app.engine.events), header).result()
+
+        result = measure(export, number=5, repeat=5)
+        result['mb_per_s'] = os.path.getsize(path) / 1e6 / (result['median_ms'] / 1e3)
+        results[f'ui.export_report.{extension[1:]}'] = result
+    app.export_worker.shutdown()
+    return results
+
+
+def run_cold_start(output):
+    # Abre o aplicativo completo e fecha no primeiro quadro desenhado
+    from startup_timing import startup
+    import openfield
+
+    class BenchApp(openfield.OpenFieldTestApp):
+        def on_first_frame(self, window):
+            super().on_first_frame(window)
+            with open(output, 'w', encoding='utf-8') as file:
+                json.dump(startup.as_dict(), file)
+            self.stop()
+
+    BenchApp().run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks da interface (processo filho)")
+    parser.add_argument('--output', help="Arquivo JSON com os resultados")
+    parser.add_argument('--cold-start', help="Mede a inicialização e grava neste arquivo")
+    args = parser.parse_args(argv)
+    headless_environment()
+    if args.cold_start:
+        run_cold_start(args.cold_start)
+        return 0
+    results = run_ui()
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(results, file)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from timing import REPO_DIR, headless_environment
+
+# Suíte de benchmarks do OpenField. Roda sem janela visível no Linux
+# (matplotlib Agg, SDL "offscreen") e grava os resultados em JSON, para
+# comparação entre versões:
+#
+#   python benchmarks/run_benchmarks.py -o base.json
+#   python benchmarks/run_benchmarks.py -o nova.json --compare base.json
+#
+# A comparação usa a mediana de cada medição e termina com código 1 se
+# alguma piorar além da tolerância (padrão: 25%).
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, 'resultados')
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info():
+    return {
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_child(args, cwd, timeout):
+    # Processo filho com o mesmo interpretador; retorna a mensagem de erro ou None
+    try:
+        process = subprocess.run([sys.executable, os.path.join(BENCH_DIR, 'bench_ui.py')] + args,
+                                 cwd=cwd, env=headless_environment(dict(os.environ)),
+                                 capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return f"tempo esgotado ({timeout} s)"
+    if process.returncode != 0:
+        lines = (process.stderr or '').strip().splitlines()
+        return f"código {process.returncode}: {lines[-1] if lines else 'sem mensagem'}"
+    return None
+
+
+def run_ui(tmpdir, timeout):
+    output = os.path.join(tmpdir, 'ui.json')
+    error = run_child(['--output', output], tmpdir, timeout)
+    if error:
+        return {}, error
+    with open(output, encoding='utf-8') as file:
+        return json.load(file), None
+
+
+def run_cold_start(tmpdir, runs, timeout):
+    # Tempo total do processo e marcas do StartupTimer, mediana de "runs" execuções
+    walls = []
+    first_frames = []
+    imports = {}
+    for run in range(runs):
+        output = os.path.join(tmpdir, f'inicio_{run}.json')
+        started = time.perf_counter()
+        error = run_child(['--cold-start', output], tmpdir, timeout)
+        if error:
+            return {}, error
+        walls.append((time.perf_counter() - started) * 1e3)
+        with open(output, encoding='utf-8') as file:
+            data = json.load(file)
+        first_frames.append(data['marks']['primeiro quadro'] * 1e3)
+        for name, seconds in data['imports'].items():
+            imports.setdefault(name, []).append(seconds * 1e3)
+
+    def summary(samples):
+        return {'number': 1, 'repeat': len(samples), 'min_ms': min(samples),
+                'median_ms': statistics.median(samples), 'mean_ms': statistics.fmean(samples),
+                'ops_per_s': None}
+
+    results = {
+        'startup.process': summary(walls),
+        'startup.first_frame': summary(first_frames),
+    }
+    for name, samples in imports.items():
+        results[f'startup.import.{name}'] = summary(samples)
+    return results, None
+
+
+def compare(results, baseline, tolerance):
+    # Imprime a variação da mediana e retorna as medições que pioraram
+    regressions = []
+    print(f"\n{'Medição':<44}{'base (ms)':>12}{'atual (ms)':>12}{'variação':>10}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None or not base['median_ms']:
+            continue
+        ratio = result['median_ms'] / base['median_ms']
+        flag = ''
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = '  <-- piorou'
+        print(f"{name:<44}{base['median_ms']:>12.3f}{result['median_ms']:>12.3f}"
+              f"{(ratio - 1) * 100:>+9.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks do OpenField (sem janela visível)")
+    parser.add_argument('-o', '--output', help="Arquivo JSON de saída (padrão: benchmarks/resultados/)")
+    parser.add_argument('--only', nargs='+', help="Roda apenas os benchmarks cujo nome contém estes textos")
+    parser.add_argument('--no-ui', action='store_true', help="Não roda os benchmarks da interface Kivy")
+    parser.add_argument('--cold-starts', type=int, default=3, help="Execuções da medição de inicialização")
+    parser.add_argument('--timeout', type=float, default=300, help="Limite por processo filho (s)")
+    parser.add_argument('--compare', help="Resultado anterior (JSON) para comparação")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Piora máxima aceita na comparação (padrão: 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    headless_environment()
+    from bench_core import run_core
+
+    def selected(group):
+        return not args.only or any(name in group for name in args.only)
+
+    data = {'environment': environment_info(), 'results': {}, 'skipped': {}}
+    with tempfile.TemporaryDirectory(prefix='openfield_bench_') as tmpdir:
+        print("Benchmarks sem interface...", file=sys.stderr)
+        data['results'].update(run_core(tmpdir, args.only))
+
+        if not args.no_ui and selected('ui'):
+            print("Benchmarks da interface...", file=sys.stderr)
+            results, error = run_ui(tmpdir, args.timeout)
+            data['results'].update(results)
+            if error:
+                data['skipped']['ui'] = error
+        if not args.no_ui and args.cold_starts > 0 and selected('startup'):
+            print("Inicialização do aplicativo...", file=sys.stderr)
+            results, error = run_cold_start(tmpdir, args.cold_starts, args.timeout)
+            data['results'].update(results)
+            if error:
+                data['skipped']['startup'] = error
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"bench_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(data, file, indent=2, ensure_ascii=False)
+
+    for name, result in data['results'].items():
+        rate = f"  {result['ops_per_s']:,.0f} op/s" if result.get('ops_per_s') else ''
+        print(f"{name:<44}{result['median_ms']:>12.3f} ms{rate}")
+    for name, reason in data['skipped'].items():
+        print(f"{name}: não executado ({reason})")
+    print(f"Resultados gravados em {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        regressions = compare(data['results'], baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} medição(ões) piorou(aram) mais de {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
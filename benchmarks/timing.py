@@ -0,0 +1,80 @@
+import os
+import random
+import statistics
+import sys
+import time
+
+# Utilitários comuns dos benchmarks: medição e sessões sintéticas.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from session_engine import NS_PER_S, NO_ZONE, ZONES, EVENT_START, EVENT_ENTER, EVENT_EXIT, EVENT_STOP  # noqa: E402
+
+
+def headless_environment(environ=None):
+    # Variáveis para rodar sem janela visível (Linux sem servidor gráfico)
+    environ = os.environ if environ is None else environ
+    environ.setdefault('MPLBACKEND', 'Agg')
+    environ.setdefault('KIVY_NO_ARGS', '1')
+    environ.setdefault('KIVY_LOG_MODE', 'PYTHON')
+    environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+    if not environ.get('DISPLAY') and not environ.get('WAYLAND_DISPLAY'):
+        environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+    return environ
+
+
+def measure(function, number=1, repeat=5, setup=None, ops=1, warmup=1):
+    """Mede function() em 'repeat' rodadas de 'number' chamadas.
+
+    Os tempos são por chamada; ops é o número de operações feitas por
+    chamada, usado para calcular a vazão (operações por segundo).
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        function()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter_ns() - started) / number)
+    median_ns = statistics.median(samples)
+    return {
+        'number': number,
+        'repeat': repeat,
+        'min_ms': min(samples) / 1e6,
+        'median_ms': median_ns / 1e6,
+        'mean_ms': statistics.fmean(samples) / 1e6,
+        'ops_per_s': ops * 1e9 / median_ns if median_ns else None,
+    }
+
+
+def measure_once(function):
+    # Operações que só fazem sentido uma vez (ex.: primeira construção)
+    started = time.perf_counter_ns()
+    function()
+    elapsed_ms = (time.perf_counter_ns() - started) / 1e6
+    return {'number': 1, 'repeat': 1, 'min_ms': elapsed_ms, 'median_ms': elapsed_ms,
+            'mean_ms': elapsed_ms, 'ops_per_s': None}
+
+
+def synthetic_events(duration_s=600, visits=1000, seed=1, zones=ZONES):
+    # Sessão sintética: visitas alternadas entre áreas, com intervalos sem área
+    rng = random.Random(seed)
+    end_ns = duration_s * NS_PER_S
+    step = end_ns // (visits + 1)
+    events = [(0, NO_ZONE, EVENT_START)]
+    zone = 0
+    for visit in range(visits):
+        t_enter = visit * step + rng.randrange(step // 4)
+        t_exit = t_enter + step // 2 + rng.randrange(step // 4)
+        zone = (zone + 1 + rng.randrange(len(zones) - 1)) % len(zones)
+        events.append((t_enter, zone, EVENT_ENTER))
+        events.append((t_exit, zone, EVENT_EXIT))
+    events.append((end_ns, NO_ZONE, EVENT_STOP))
+    return events
@@ -0,0 +1,59 @@
+import threading
+
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+
+# matplotlib e o backend Kivy são importados apenas no primeiro uso do
+# gráfico (ou pré-carregados em segundo plano por warm_up), para não
+# atrasar a abertura da janela.
+
+NO_DATA_TEXT = "Nenhum tempo registrado para exibir o gráfico."
+
+
+def warm_up():
+    # Pré-carrega matplotlib em uma thread depois que a janela já apareceu
+    def load():
+        import zone_chart  # noqa: F401
+    thread = threading.Thread(target=load, name='chart-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+
+class ZoneChartView(BoxLayout):
+    """Área do gráfico de pizza, construída uma única vez.
+
+    A figura e o FigureCanvasKivyAgg são criados no primeiro uso e
+    reaproveitados; show() só redesenha quando os tempos mudaram.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.pie = None
+        self.figure_canvas = None
+        self.no_data_label = Label(text=NO_DATA_TEXT)
+
+    def _build(self):
+        from kivy_garden.matplotlib.backend_kivyagg import FigureCanvasKivyAgg
+        from zone_chart import ZonePie
+        
+        self.pie = ZonePie()
+        self.figure_canvas = FigureCanvasKivyAgg(self.pie.figure)
+
+    def _show_only(self, widget):
+        if widget.parent is self and len(self.children) == 1:
+            return
+        self.clear_widgets()
+        self.add_widget(widget)
+
+    def show(self, sizes):
+        if not any(size > 0 for size in sizes):
+            self._show_only(self.no_data_label)
+            return
+        if self.pie is None:
+            self._build()
+        if self.pie.update(sizes):
+            self.figure_canvas.draw()
+        self._show_only(self.figure_canvas)
+
+    def clear(self):
+        self.clear_widgets()
@@ -0,0 +1,294 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+
+from results_store import DB_PATH, ResultsStore, ZONE_COLUMNS
+from session_engine import ZONES, ZONE_LABELS
+
+# Agregados por grupo de tratamento para o painel de coorte: média ± EPM do
+# tempo em cada área por grupo e por dia, e estatísticas de box plot por área.
+# Cada sessão ocupa uma linha em arrays NumPy compactos, e as somas e somas de
+# quadrados de cada célula (grupo, dia) são mantidas em execução: uma sessão
+# nova só soma sua contribuição. Tudo é guardado em um arquivo .npz ao lado do
+# banco, identificado pelo conjunto de sessões que contribuíram (quantidade,
+# soma e maior id); ao abrir o painel, apenas as sessões novas são lidas do
+# banco. Se sessões foram removidas ou substituídas, os agregados são
+# recalculados do zero.
+#
+# Uso:
+#   python cohort.py --db openfield.db
+#   python cohort.py --db openfield.db --measure seconds --zone corner
+
+# Medidas disponíveis: porcentagem da duração efetiva ou segundos
+MEASURES = ('percent', 'seconds')
+MEASURE_LABELS = {'percent': '% do tempo', 'seconds': 'segundos'}
+MEASURE_UNITS = {'percent': '%', 'seconds': 's'}
+
+NO_GROUP = 'Sem grupo'
+CACHE_SUFFIX = '_coorte.npz'
+
+# Linhas lidas do banco por vez
+FETCH_ROWS = 10000
+
+COHORT_COLUMNS = ('id', 'group_name', 'started_at', 'effective_duration') + ZONE_COLUMNS
+
+
+def cache_path(db_path):
+    return os.path.splitext(db_path)[0] + CACHE_SUFFIX
+
+
+def mean_sem(count, total, squares):
+    # Média e erro padrão da média a partir de somas em execução; NaN onde
+    # não há sessões (média) ou há menos de duas (EPM)
+    n = np.asarray(count, dtype=np.float64)[..., np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = np.where(n > 0, total / n, np.nan)
+        variance = np.where(n > 1, (squares - n * mean ** 2) / (n - 1), np.nan)
+        sem = np.sqrt(np.maximum(variance, 0) / n)
+    return mean, sem
+
+
+class CohortStats:
+    def __init__(self, zones=ZONES):
+        self.zones = tuple(zones)
+        self.clear()
+
+    def clear(self):
+        size = len(self.zones)
+        self.ids = np.empty(0, dtype=np.int64)
+        self.group_codes = np.empty(0, dtype=np.int32)
+        self.day_codes = np.empty(0, dtype=np.int32)
+        # values[i, m, z]: medida m (MEASURES) da área z na sessão i
+        self.values = np.empty((0, len(MEASURES), size), dtype=np.float32)
+        self.groups = []
+        self.days = []
+        # Somas em execução por célula (grupo, dia)
+        self.counts = np.zeros((0, 0), dtype=np.int64)
+        self.sums = np.zeros((0, 0, len(MEASURES), size))
+        self.squares = np.zeros((0, 0, len(MEASURES), size))
+        # Resultados já calculados para o conjunto atual de sessões
+        self.results = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def key(self):
+        # Identifica o conjunto de sessões que contribuíram para os agregados
+        last_id = int(self.ids.max()) if len(self.ids) else 0
+        return len(self.ids), int(self.ids.sum()), last_id
+
+    def _codes(self, names, values):
+        lookup = {name: code for code, name in enumerate(names)}
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(names)
+                names.append(value)
+            codes[i] = code
+        return codes
+
+    def add(self, rows):
+        # rows: (id, grupo, início, duração efetiva, segundos por área...)
+        rows = list(rows)
+        if not rows:
+            return 0
+        ids, groups, started, effective, *zones = zip(*rows)
+        groups = self._codes(self.groups, [group or NO_GROUP for group in groups])
+        days = self._codes(self.days, [text[:10] for text in started])
+        seconds = np.array(zones, dtype=np.float64).T
+        effective = np.maximum(np.array(effective, dtype=np.float64), 0.001)
+        values = np.stack((seconds / effective[:, np.newaxis] * 100, seconds), axis=1)
+
+        self._grow(len(self.groups), len(self.days))
+        np.add.at(self.counts, (groups, days), 1)
+        np.add.at(self.sums, (groups, days), values)
+        np.add.at(self.squares, (groups, days), values ** 2)
+
+        self.ids = np.concatenate((self.ids, np.array(ids, dtype=np.int64)))
+        self.group_codes = np.concatenate((self.group_codes, groups))
+        self.day_codes = np.concatenate((self.day_codes, days))
+        self.values = np.concatenate((self.values, values.astype(np.float32)))
+        self.results.clear()
+        return len(rows)
+
+    def _grow(self, group_count, day_count):
+        rows, columns = self.counts.shape
+        if (rows, columns) == (group_count, day_count):
+            return
+        pad = ((0, group_count - rows), (0, day_count - columns))
+        self.counts = np.pad(self.counts, pad)
+        self.sums = np.pad(self.sums, pad + ((0, 0), (0, 0)))
+        self.squares = np.pad(self.squares, pad + ((0, 0), (0, 0)))
+
+    def update(self, store):
+        # Sincroniza com o banco; retorna quantas sessões foram somadas
+        cursor = store.connection.cursor()
+        cursor.row_factory = None
+        count, id_sum, last_id = cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(id), 0), COALESCE(MAX(id), 0) FROM sessions").fetchone()
+        if (count, id_sum, last_id) == self.key:
+            return 0
+        known_count, known_sum, known_last = self.key
+        new_count, new_sum = cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(id), 0) FROM sessions WHERE id > ?", (known_last,)).fetchone()
+        if (known_count + new_count, known_sum + new_sum) != (count, id_sum):
+            # Sessões removidas ou substituídas: recomeça do zero
+            self.clear()
+            known_last = 0
+
+        cursor.execute(f"SELECT {', '.join(COHORT_COLUMNS)} FROM sessions WHERE id > ? ORDER BY id",
+                       (known_last,))
+        added = 0
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                break
+            added += self.add(rows)
+        return added
+
+    def save(self, path):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            np.savez(file, zones=np.array(self.zones), ids=self.ids,
+                     group_codes=self.group_codes, day_codes=self.day_codes, values=self.values,
+                     groups=np.array(self.groups, dtype=str), days=np.array(self.days, dtype=str),
+                     counts=self.counts, sums=self.sums, squares=self.squares)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, zones=ZONES):
+        # Agregados gravados por save(); None se o arquivo não existir ou não
+        # puder ser lido
+        try:
+            with np.load(path) as data:
+                if tuple(data['zones'].tolist()) != tuple(zones):
+                    return None
+                stats = cls(zones)
+                for name in ('ids', 'group_codes', 'day_codes', 'values',
+                             'counts', 'sums', 'squares'):
+                    setattr(stats, name, data[name])
+                stats.groups = data['groups'].tolist()
+                stats.days = data['days'].tolist()
+        except (OSError, ValueError, KeyError):
+            return None
+        return stats
+
+    def _cached(self, name, measure, compute):
+        key = (self.key, name, measure)
+        if key not in self.results:
+            self.results[key] = compute(MEASURES.index(measure))
+        return self.results[key]
+
+    def group_summary(self, measure='percent'):
+        # {grupo: (n, médias por área, EPM por área)}
+        def compute(m):
+            counts = self.counts.sum(axis=1)
+            mean, sem = mean_sem(counts, self.sums[:, :, m].sum(axis=1),
+                                 self.squares[:, :, m].sum(axis=1))
+            return {group: (int(counts[g]), mean[g], sem[g]) for g, group in enumerate(self.groups)}
+        return self._cached('groups', measure, compute)
+
+    def day_summary(self, measure='percent'):
+        # (dias em ordem, {grupo: (n por dia, médias [dia, área], EPM [dia, área])})
+        def compute(m):
+            order = np.argsort(self.days) if self.days else np.empty(0, dtype=np.int64)
+            mean, sem = mean_sem(self.counts, self.sums[:, :, m], self.squares[:, :, m])
+            summary = {group: (self.counts[g, order], mean[g, order], sem[g, order])
+                       for g, group in enumerate(self.groups)}
+            return [self.days[d] for d in order], summary
+        return self._cached('days', measure, compute)
+
+    def box_stats(self, measure='percent'):
+        # {grupo: [estatísticas por área]} no formato de Axes.bxp (bigodes
+        # em 1,5 x IQR, limitados aos valores observados)
+        def compute(m):
+            boxes = {}
+            for g, group in enumerate(self.groups):
+                values = self.values[self.group_codes == g, m].astype(np.float64)
+                q1, median, q3 = np.percentile(values, [25, 50, 75], axis=0)
+                iqr = q3 - q1
+                stats = []
+                for z, zone in enumerate(self.zones):
+                    column = values[:, z]
+                    inside = column[(column >= q1[z] - 1.5 * iqr[z]) & (column <= q3[z] + 1.5 * iqr[z])]
+                    stats.append({
+                        'label': ZONE_LABELS.get(zone, zone),
+                        'q1': q1[z], 'med': median[z], 'q3': q3[z],
+                        'whislo': inside.min(), 'whishi': inside.max(),
+                        'mean': column.mean(), 'fliers': np.empty(0),
+                    })
+                boxes[group] = stats
+            return boxes
+        return self._cached('boxes', measure, compute)
+
+
+def open_cohort(store, stats=None, path=None):
+    # Sincroniza os agregados (os já em memória, ou os do arquivo de cache)
+    # com o banco aberto em store; o cache só é regravado quando houve
+    # sessões novas ou removidas
+    path = path or cache_path(store.path)
+    if stats is None:
+        stats = CohortStats.load(path) or CohortStats()
+    if stats.update(store) or not os.path.exists(path):
+        try:
+            stats.save(path)
+        except OSError:
+            pass
+    return stats
+
+
+def format_value(count, mean, sem, unit):
+    if count > 1:
+        return f"{mean:.2f} ± {sem:.2f} {unit}"
+    return f"{mean:.2f} {unit}"
+
+
+def format_cohort(stats, measure='percent'):
+    unit = MEASURE_UNITS[measure]
+    labels = [ZONE_LABELS.get(zone, zone) for zone in stats.zones]
+    width = max([len(group) for group in stats.groups] + [5]) + 2
+    report = f"Média ± EPM ({MEASURE_LABELS[measure]}), {len(stats)} sessão(ões):\n"
+    report += f"  {'Grupo':<{width}}{'n':>6}" + "".join(f"{label:>20}" for label in labels) + "\n"
+    for group, (count, mean, sem) in sorted(stats.group_summary(measure).items()):
+        cells = "".join(f"{format_value(count, m, s, unit):>20}" for m, s in zip(mean, sem))
+        report += f"  {group:<{width}}{count:>6}{cells}\n"
+    return report
+
+
+def format_days(stats, measure='percent', zone='center'):
+    unit = MEASURE_UNITS[measure]
+    z = stats.zones.index(zone)
+    days, summary = stats.day_summary(measure)
+    report = f"{ZONE_LABELS.get(zone, zone)} por dia ({MEASURE_LABELS[measure]}):\n"
+    for group, (counts, mean, sem) in sorted(summary.items()):
+        report += f"  {group}:\n"
+        for day, count, m, s in zip(days, counts, mean[:, z], sem[:, z]):
+            if count:
+                report += f"    {day}  n={count:<5}{format_value(count, m, s, unit)}\n"
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Agregados por grupo do banco de resultados do Open Field")
+    parser.add_argument('--db', default=DB_PATH, help=f"Banco de resultados (padrão: {DB_PATH})")
+    parser.add_argument('--measure', choices=MEASURES, default='percent', help="Medida (padrão: percent)")
+    parser.add_argument('--zone', choices=ZONES, default='center',
+                        help="Área da comparação entre dias (padrão: center)")
+    args = parser.parse_args(argv)
+
+    with ResultsStore(args.db) as store:
+        stats = open_cohort(store)
+    if not len(stats):
+        print("Nenhuma sessão no banco de resultados.", file=sys.stderr)
+        return 1
+    print(format_cohort(stats, args.measure))
+    print(format_days(stats, args.measure, args.zone), end='')
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import numpy as np
+from matplotlib.figure import Figure
+
+from cohort import MEASURE_LABELS
+from session_engine import ZONE_LABELS
+from zone_chart import ZONE_COLORS
+
+# Gráficos do painel de coorte, usando apenas matplotlib (sem pyplot e sem
+# Kivy): média ± EPM por grupo da área escolhida, box plots por área e grupo,
+# e a mesma média ± EPM ao longo dos dias. A figura é criada uma única vez;
+# update() só redesenha quando as sessões, a medida ou a área mudaram.
+
+GROUP_COLORS = ('tab:blue', 'tab:orange', 'tab:purple', 'tab:brown',
+                'tab:pink', 'tab:gray', 'tab:olive', 'tab:cyan')
+
+# Máximo de datas escritas no eixo da comparação entre dias
+MAX_DAY_TICKS = 8
+
+
+class CohortFigure:
+    def __init__(self, figure=None, figsize=(12, 4)):
+        self.figure = figure if figure is not None else Figure(figsize=figsize)
+        self.ax_groups, self.ax_boxes, self.ax_days = self.figure.subplots(1, 3)
+        self.state = None
+
+    def update(self, stats, measure='percent', zone='center'):
+        # Retorna False quando nada mudou desde o último desenho
+        state = (stats.key, measure, zone)
+        if state == self.state:
+            return False
+        self.state = state
+
+        unit = MEASURE_LABELS[measure]
+        label = ZONE_LABELS.get(zone, zone)
+        z = stats.zones.index(zone)
+        groups = sorted(stats.groups)
+        colors = {group: GROUP_COLORS[i % len(GROUP_COLORS)] for i, group in enumerate(groups)}
+        for ax in (self.ax_groups, self.ax_boxes, self.ax_days):
+            ax.clear()
+
+        # Média ± EPM por grupo
+        summary = stats.group_summary(measure)
+        means = [summary[group][1][z] for group in groups]
+        sems = [np.nan_to_num(summary[group][2][z]) for group in groups]
+        positions = np.arange(len(groups))
+        self.ax_groups.bar(positions, means, yerr=sems, capsize=4,
+                           color=[colors[group] for group in groups])
+        self.ax_groups.set_xticks(positions, [f"{group}\n(n={summary[group][0]})" for group in groups])
+        self.ax_groups.set_ylabel(unit)
+        self.ax_groups.set_title(f"{label}: média ± EPM")
+
+        # Box plots por área, grupos lado a lado
+        boxes = stats.box_stats(measure)
+        width = 0.8 / max(len(groups), 1)
+        for i, group in enumerate(groups):
+            offset = (i - (len(groups) - 1) / 2) * width
+            self.ax_boxes.bxp(boxes[group], positions=np.arange(len(stats.zones)) + offset,
+                              widths=width * 0.9, patch_artist=True, showfliers=False,
+                              boxprops={'facecolor': colors[group]}, medianprops={'color': 'black'})
+        self.ax_boxes.set_xticks(np.arange(len(stats.zones)),
+                                 [ZONE_LABELS.get(name, name) for name in stats.zones])
+        for tick, name in zip(self.ax_boxes.get_xticklabels(), stats.zones):
+            tick.set_color(ZONE_COLORS.get(name, 'black'))
+        self.ax_boxes.set_ylabel(unit)
+        self.ax_boxes.set_title("Distribuição por área")
+
+        # Média ± EPM por dia
+        days, by_day = stats.day_summary(measure)
+        x = np.arange(len(days))
+        for group in groups:
+            counts, mean, sem = by_day[group]
+            present = counts > 0
+            self.ax_days.errorbar(x[present], mean[present, z], yerr=np.nan_to_num(sem[present, z]),
+                                  marker='o', capsize=3, color=colors[group], label=group)
+        step = max(1, -(-len(days) // MAX_DAY_TICKS))
+        self.ax_days.set_xticks(x[::step], days[::step], rotation=30, ha='right')
+        self.ax_days.set_ylabel(unit)
+        self.ax_days.set_title(f"{label} por dia")
+        if groups:
+            self.ax_days.legend(fontsize=8)
+
+        self.figure.tight_layout()
+        return True
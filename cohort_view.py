@@ -0,0 +1,70 @@
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.spinner import Spinner
+
+from cohort import MEASURES, MEASURE_LABELS, format_cohort
+from session_engine import ZONES, ZONE_LABELS
+
+# Painel de coorte ("Coorte"): medida e área escolhidas em cima, a tabela de
+# média ± EPM por grupo e os gráficos de cohort_chart embaixo. Como no
+# ZoneChartView, matplotlib e o FigureCanvasKivyAgg só são carregados no
+# primeiro uso, e a figura é reaproveitada entre aberturas.
+
+MEASURE_BY_LABEL = {label: measure for measure, label in MEASURE_LABELS.items()}
+ZONE_BY_LABEL = {label: zone for zone, label in ZONE_LABELS.items()}
+
+
+class CohortDashboard(BoxLayout):
+    def __init__(self, **kwargs):
+        super().__init__(orientation='vertical', spacing=5, **kwargs)
+        self.stats = None
+        self.chart = None
+        self.figure_canvas = None
+
+        controls = BoxLayout(orientation='horizontal', spacing=5, size_hint_y=None, height=40)
+        controls.add_widget(Label(text='Medida:', size_hint_x=0.15))
+        self.measure_spinner = Spinner(text=MEASURE_LABELS['percent'],
+                                       values=[MEASURE_LABELS[measure] for measure in MEASURES],
+                                       size_hint_x=0.35)
+        controls.add_widget(self.measure_spinner)
+        controls.add_widget(Label(text='Área:', size_hint_x=0.15))
+        self.zone_spinner = Spinner(text=ZONE_LABELS['center'],
+                                    values=[ZONE_LABELS[zone] for zone in ZONES], size_hint_x=0.35)
+        controls.add_widget(self.zone_spinner)
+        self.measure_spinner.bind(text=lambda instance, text: self.refresh())
+        self.zone_spinner.bind(text=lambda instance, text: self.refresh())
+        self.add_widget(controls)
+
+        self.table_label = Label(font_name='RobotoMono-Regular', font_size=13, size_hint_y=0.3,
+                                 halign='left', valign='top')
+        self.table_label.bind(size=lambda instance, size: setattr(instance, 'text_size', size))
+        self.add_widget(self.table_label)
+
+        self.chart_area = BoxLayout(size_hint_y=0.7)
+        self.add_widget(self.chart_area)
+
+    def _build(self):
+        from kivy_garden.matplotlib.backend_kivyagg import FigureCanvasKivyAgg
+        from cohort_chart import CohortFigure
+
+        self.chart = CohortFigure()
+        self.figure_canvas = FigureCanvasKivyAgg(self.chart.figure)
+        self.chart_area.add_widget(self.figure_canvas)
+
+    def show(self, stats):
+        self.stats = stats
+        self.refresh()
+
+    def refresh(self):
+        stats = self.stats
+        if stats is None:
+            return
+        if not len(stats):
+            self.table_label.text = "Nenhuma sessão no banco de resultados."
+            return
+        measure = MEASURE_BY_LABEL[self.measure_spinner.text]
+        self.table_label.text = format_cohort(stats, measure)
+        if self.chart is None:
+            self._build()
+        if self.chart.update(stats, measure, ZONE_BY_LABEL[self.zone_spinner.text]):
+            self.figure_canvas.draw()
@@ -0,0 +1,174 @@
+import csv
+import json
+import struct
+import tempfile
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import metrics_from_events, metrics_row
+from results_store import ResultsStore, row_to_summary
+from session_engine import report_row
+
+# Exportação de resultados fora da thread da interface. As funções de
+# escrita não dependem de Kivy; ExportWorker executa-as em uma thread
+# dedicada e entrega o resultado por meio de uma função "dispatch"
+# (na interface, Clock.schedule_once), para que a conclusão seja tratada
+# na thread principal.
+
+# Formatos disponíveis: nome exibido -> extensão
+FORMATS = {
+    'TXT': '.txt',
+    'CSV': '.csv',
+    'JSONL': '.jsonl',
+    'Eventos (binário)': '.ofc',
+}
+
+# Formato colunar dos eventos brutos:
+#   MAGIC | tamanho do cabeçalho (uint32) | cabeçalho JSON (inclui "count")
+#   coluna t_ns (int64 x count) | coluna zona (uint8 x count) | coluna tipo (uint8 x count)
+COLUMNAR_MAGIC = b'OFC1'
+HEADER_LEN = struct.Struct('<I')
+
+
+def write_text(path, text):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    return path
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        return write_csv_rows(file, rows)
+
+
+def write_csv_rows(file, rows):
+    # rows pode ser um iterador. As linhas podem ter colunas diferentes (ex.:
+    # ocupação por minuto em sessões de durações diferentes): elas passam por
+    # um arquivo temporário, sem ficar na memória, e o cabeçalho reúne as
+    # colunas de todas, na ordem em que aparecem
+    count = 0
+    fieldnames = {}
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as spool:
+        for row in rows:
+            fieldnames.update(dict.fromkeys(row))
+            spool.write(json.dumps(row, ensure_ascii=False))
+            spool.write('\n')
+            count += 1
+        if not count:
+            return 0
+        spool.seek(0)
+        writer = csv.DictWriter(file, fieldnames=list(fieldnames))
+        writer.writeheader()
+        for line in spool:
+            writer.writerow(json.loads(line))
+    return count
+
+
+def write_jsonl(path, rows):
+    count = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        for row in rows:
+            file.write(json.dumps(row, ensure_ascii=False))
+            file.write('\n')
+            count += 1
+    return count
+
+
+def write_events_columnar(path, events, header=None):
+    header = dict(header or {})
+    header['count'] = len(events)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    with open(path, 'wb') as file:
+        file.write(COLUMNAR_MAGIC + HEADER_LEN.pack(len(header_bytes)) + header_bytes)
+        file.write(array('q', (t_ns for t_ns, _, _ in events)).tobytes())
+        file.write(bytes(zone for _, zone, _ in events))
+        file.write(bytes(kind for _, _, kind in events))
+    return path
+
+
+def read_events_columnar(path):
+    # Retorna (cabeçalho, t_ns, zonas, tipos) como array/bytes
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:4] != COLUMNAR_MAGIC:
+        raise ValueError(f"Arquivo não é uma exportação colunar de eventos: {path}")
+    (header_len,) = HEADER_LEN.unpack_from(data, 4)
+    offset = 4 + HEADER_LEN.size
+    header = json.loads(data[offset:offset + header_len].decode('utf-8'))
+    offset += header_len
+    count = header['count']
+    t_ns = array('q')
+    t_ns.frombytes(data[offset:offset + 8 * count])
+    offset += 8 * count
+    zones = data[offset:offset + count]
+    kinds = data[offset + count:offset + 2 * count]
+    return header, t_ns, zones, kinds
+
+
+def export_session(path, fmt, report_text, row, events, header=None):
+    # Exporta a sessão atual no formato escolhido (ver FORMATS)
+    if fmt == 'TXT':
+        write_text(path, report_text)
+    elif fmt == 'CSV':
+        write_csv(path, [row])
+    elif fmt == 'JSONL':
+        write_jsonl(path, [row])
+    elif fmt == 'Eventos (binário)':
+        write_events_columnar(path, events, header)
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+    return path
+
+
+def iter_store_rows(db_path, **filters):
+    # Uma linha por sessão do banco, lendo os eventos de uma sessão por vez.
+    # A conexão é aberta na própria thread que consome o iterador.
+    with ResultsStore(db_path) as store:
+        for session in store.iter_sessions(**filters):
+            row = {'Sessão': session['id']}
+            row.update(report_row(row_to_summary(session), session['started_at']))
+            row['Grupo'] = session['group_name']
+            row['Protocolo'] = session['protocol']
+            row.update(metrics_row(metrics_from_events(store.session_events(session['id']))))
+            yield row
+
+
+def export_all_sessions(path, fmt, db_path, **filters):
+    # Exportação em massa: as sessões são lidas e gravadas em fluxo,
+    # sem carregar o banco inteiro na memória
+    rows = iter_store_rows(db_path, **filters)
+    if fmt == 'JSONL':
+        return write_jsonl(path, rows)
+    if fmt == 'CSV':
+        return write_csv(path, rows)
+    raise ValueError(f"Exportação de todas as sessões não suporta o formato {fmt}")
+
+
+class ExportWorker:
+    """Executa exportações em uma thread dedicada.
+
+    dispatch(callback) deve agendar callback() na thread da interface; por
+    padrão o callback é chamado diretamente na thread de exportação.
+    """
+
+    def __init__(self, dispatch=None):
+        self.dispatch = dispatch or (lambda callback: callback())
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='export')
+
+    def submit(self, function, *args, on_done=None, on_error=None, **kwargs):
+        future = self.executor.submit(function, *args, **kwargs)
+
+        def done(future):
+            error = future.exception()
+            if error is not None:
+                if on_error is not None:
+                    self.dispatch(lambda: on_error(error))
+            elif on_done is not None:
+                result = future.result()
+                self.dispatch(lambda: on_done(result))
+
+        future.add_done_callback(done)
+        return future
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
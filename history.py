@@ -0,0 +1,139 @@
+import datetime
+
+import numpy as np
+
+from results_store import ZONE_COLUMNS
+from session_engine import ZONES, ZONE_LABELS
+
+# Índice compacto do histórico de sessões do banco de resultados. Cada sessão
+# ocupa uma posição em arrays NumPy (id, início em segundos, código do animal,
+# duração efetiva e tempo em cada área: ~36 bytes por sessão), e os nomes dos
+# animais são guardados uma única vez. Os filtros por animal e data são
+# vetorizados e devolvem posições; o texto de uma linha só é montado quando
+# ela aparece na lista, e os eventos só são lidos ao abrir a sessão.
+
+# Linhas lidas do banco por vez
+FETCH_ROWS = 10000
+
+INDEX_COLUMNS = ('id', 'animal_id', 'started_at', 'effective_duration') + ZONE_COLUMNS
+
+
+def parse_day(text):
+    # 'AAAA-MM-DD' -> segundos desde 1970 (meia-noite); None se vazio
+    text = (text or '').strip()
+    if not text:
+        return None
+    return int(np.datetime64(datetime.date.fromisoformat(text), 's').astype(np.int64))
+
+
+class SessionIndex:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.started = np.empty(0, dtype=np.int64)
+        self.animals = np.empty(0, dtype=np.int32)
+        self.effective = np.empty(0, dtype=np.float32)
+        self.zone_seconds = np.empty((0, len(ZONES)), dtype=np.float32)
+        self.animal_names = []
+        self.animal_codes = {}
+        # Posições em ordem de exibição (mais recentes primeiro)
+        self.order = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def last_id(self):
+        return int(self.ids.max()) if len(self.ids) else 0
+
+    @property
+    def key(self):
+        # Identifica o conjunto de sessões do índice (como em CohortStats)
+        return len(self.ids), int(self.ids.sum()), self.last_id
+
+    def animal_code(self, name):
+        code = self.animal_codes.get(name)
+        if code is None:
+            code = self.animal_codes[name] = len(self.animal_names)
+            self.animal_names.append(name)
+        return code
+
+    def update(self, store):
+        # Acrescenta as sessões gravadas desde a última leitura (id crescente);
+        # retorna quantas entraram ou saíram do índice
+        cursor = store.connection.cursor()
+        cursor.row_factory = None
+        count, id_sum, last_id = cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(id), 0), COALESCE(MAX(id), 0) FROM sessions").fetchone()
+        if (count, id_sum, last_id) == self.key:
+            return 0
+        known_count, known_sum, known_last = self.key
+        new_count, new_sum = cursor.execute(
+            "SELECT COUNT(*), COALESCE(SUM(id), 0) FROM sessions WHERE id > ?", (known_last,)).fetchone()
+        removed = 0
+        if (known_count + new_count, known_sum + new_sum) != (count, id_sum):
+            # Sessões removidas ou substituídas: recomeça do zero
+            removed = known_count
+            self.clear()
+            known_last = 0
+
+        cursor.execute(f"SELECT {', '.join(INDEX_COLUMNS)} FROM sessions WHERE id > ? ORDER BY id",
+                       (known_last,))
+        chunks = []
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                break
+            ids, animals, started, effective, *zones = zip(*rows)
+            chunks.append((
+                np.array(ids, dtype=np.int64),
+                np.array(started, dtype='datetime64[s]').astype(np.int64),
+                np.array([self.animal_code(name) for name in animals], dtype=np.int32),
+                np.array(effective, dtype=np.float32),
+                np.array(zones, dtype=np.float32).T,
+            ))
+        if not chunks:
+            return removed
+        ids, started, animals, effective, zone_seconds = zip(*chunks)
+        self.ids = np.concatenate((self.ids, *ids))
+        self.started = np.concatenate((self.started, *started))
+        self.animals = np.concatenate((self.animals, *animals))
+        self.effective = np.concatenate((self.effective, *effective))
+        self.zone_seconds = np.concatenate((self.zone_seconds, *zone_seconds))
+        # Mais recentes primeiro; empates de data pelo id
+        self.order = np.lexsort((-self.ids, -self.started))
+        return removed + sum(len(chunk) for chunk in ids)
+
+    def filter(self, animal='', date_from=None, date_to=None):
+        # Posições (em ordem de exibição) das sessões que atendem aos filtros.
+        # animal: trecho do ID, sem diferenciar maiúsculas; datas AAAA-MM-DD
+        # inclusivas
+        mask = np.ones(len(self.order), dtype=bool)
+        started = self.started[self.order]
+        animal = animal.strip().lower()
+        if animal:
+            codes = [code for code, name in enumerate(self.animal_names) if animal in name.lower()]
+            mask &= np.isin(self.animals[self.order], codes)
+        first = parse_day(date_from)
+        if first is not None:
+            mask &= started >= first
+        last = parse_day(date_to)
+        if last is not None:
+            mask &= started < last + 86400
+        return self.order[mask]
+
+    def session_id(self, position):
+        return int(self.ids[position])
+
+    def started_text(self, position):
+        return str(np.datetime64(int(self.started[position]), 's')).replace('T', ' ')
+
+    def row_text(self, position):
+        # Resumo de uma linha da lista
+        effective = float(self.effective[position]) or 0.001
+        parts = [f"{self.started_text(position)}   {self.animal_names[self.animals[position]]}"]
+        for zone, seconds in zip(ZONES, self.zone_seconds[position].tolist()):
+            parts.append(f"{ZONE_LABELS[zone]} {seconds:.1f} s ({seconds / effective * 100:.0f}%)")
+        return "   ".join(parts)
@@ -0,0 +1,199 @@
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.properties import NumericProperty
+from kivy.uix.behaviors import ButtonBehavior
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.label import Label
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.datamodel import RecycleDataModelBehavior
+from kivy.uix.recycleview.layout import RecycleLayoutManagerBehavior
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.textinput import TextInput
+from kivy.uix.widget import Widget
+
+from history import SessionIndex
+
+# Painel do histórico de sessões ("Histórico"). A lista é um RecycleView com
+# linhas de altura fixa: só as linhas visíveis viram widgets, e os dados de
+# cada linha (um dict pequeno) são montados a partir do SessionIndex apenas
+# quando a linha aparece. O RecycleBoxLayout padrão guarda opções de layout
+# para cada item da lista (e o RecycleDataModel copia a lista inteira), por
+# isso o modelo e o layout abaixo trabalham direto sobre as posições
+# filtradas. Ao tocar uma linha, on_open(id da sessão, início) é chamado.
+
+ROW_HEIGHT = 36
+
+# Espera após a digitação antes de refiltrar, em segundos
+FILTER_DELAY = 0.25
+
+
+class FilteredRows:
+    # Sequência somente leitura com as linhas do filtro atual
+    def __init__(self, index, positions):
+        self.index = index
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, i):
+        position = int(self.positions[i])
+        return {'text': self.index.row_text(position), 'position': position}
+
+
+class SessionRowsModel(RecycleDataModelBehavior, EventDispatcher):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.data = ()
+
+    def set_rows(self, rows):
+        self.data = rows
+        self.dispatch('on_data_changed')
+
+
+class FixedRowLayout(RecycleLayoutManagerBehavior, Widget):
+    # Posição de cada linha calculada pelo índice (altura fixa), sem opções
+    # guardadas por item
+    row_height = NumericProperty(ROW_HEIGHT)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.count = 0
+        self.view_opts = self
+
+    def __getitem__(self, index):
+        # Usado pelo adaptador do RecycleView para saber a classe da linha
+        return {'viewclass': self.viewclass}
+
+    def attach_recycleview(self, rv):
+        super().attach_recycleview(rv)
+        if rv:
+            self.fbind('row_height', rv.refresh_from_layout)
+            self.fbind('width', rv.refresh_from_layout)
+
+    def detach_recycleview(self):
+        rv = self.recycleview
+        if rv:
+            self.funbind('row_height', rv.refresh_from_layout)
+            self.funbind('width', rv.refresh_from_layout)
+        super().detach_recycleview()
+
+    def clear_layout(self):
+        super().clear_layout()
+        self.clear_widgets()
+
+    def compute_sizes_from_data(self, data, flags):
+        # Linhas novas: as views atuais voltam ao cache e são reaproveitadas
+        self.clear_layout()
+        self.count = len(data)
+
+    def compute_layout(self, data, flags):
+        self.height = self.count * self.row_height
+
+    def compute_visible_views(self, data, viewport):
+        x, y, width, height = viewport
+        first = int((self.height - y - height) // self.row_height)
+        last = int((self.height - y) // self.row_height)
+        return range(max(first, 0), min(last + 1, self.count))
+
+    def set_visible_views(self, indices, data, viewport):
+        new, remaining, old = self.recycleview.view_adapter.set_visible_views(indices, data, self)
+        for index, widget in old:
+            self.remove_widget(widget)
+        for index, widget in new + remaining:
+            self.refresh_view_layout(index, {
+                'size': (self.width, self.row_height),
+                'pos': (self.x, self.top - (index + 1) * self.row_height),
+            }, widget, viewport)
+        for index, widget in new:
+            if widget.parent is None:
+                self.add_widget(widget)
+
+    def get_view_index_at(self, pos):
+        index = int((self.height - pos[1]) // self.row_height)
+        return index if 0 <= index < self.count else None
+
+    def goto_view(self, index):
+        rv = self.recycleview
+        scrollable = self.height - rv.height
+        if scrollable > 0:
+            rv.scroll_y = 1 - min(max(index * self.row_height / scrollable, 0), 1)
+
+
+class SessionRow(RecycleDataViewBehavior, ButtonBehavior, Label):
+    def __init__(self, **kwargs):
+        super().__init__(halign='left', valign='middle', shorten=True, **kwargs)
+        self.position = None
+        self.rv = None
+        self.bind(size=self.on_row_size)
+
+    def on_row_size(self, instance, size):
+        self.text_size = (size[0] - 20, size[1])
+
+    def refresh_view_attrs(self, rv, index, data):
+        self.rv = rv
+        self.position = data['position']
+        self.text = data['text']
+
+    def on_release(self):
+        if self.rv is not None:
+            self.rv.open_position(self.position)
+
+
+class SessionList(RecycleView):
+    def __init__(self, on_open, **kwargs):
+        super().__init__(data_model=SessionRowsModel(), **kwargs)
+        self.on_open = on_open
+        self.layout_manager_widget = FixedRowLayout(size_hint=(1, None))
+        self.layout_manager_widget.viewclass = SessionRow
+        self.add_widget(self.layout_manager_widget)
+
+    def open_position(self, position):
+        self.on_open(position)
+
+
+class HistoryPanel(BoxLayout):
+    def __init__(self, on_open, **kwargs):
+        super().__init__(orientation='vertical', spacing=5, **kwargs)
+        self.on_open = on_open
+        self.index = SessionIndex()
+        self.filter_trigger = Clock.create_trigger(self.apply_filter, FILTER_DELAY)
+
+        filters = BoxLayout(orientation='horizontal', spacing=5, size_hint_y=None, height=40)
+        filters.add_widget(Label(text='ID do Animal:', size_hint_x=0.15))
+        self.animal_input = TextInput(multiline=False, size_hint_x=0.25)
+        filters.add_widget(self.animal_input)
+        filters.add_widget(Label(text='De (AAAA-MM-DD):', size_hint_x=0.15))
+        self.date_from_input = TextInput(multiline=False, size_hint_x=0.15)
+        filters.add_widget(self.date_from_input)
+        filters.add_widget(Label(text='Até:', size_hint_x=0.1))
+        self.date_to_input = TextInput(multiline=False, size_hint_x=0.15)
+        filters.add_widget(self.date_to_input)
+        for text_input in (self.animal_input, self.date_from_input, self.date_to_input):
+            text_input.bind(text=lambda instance, text: self.filter_trigger())
+        self.add_widget(filters)
+
+        self.count_label = Label(size_hint_y=None, height=30)
+        self.add_widget(self.count_label)
+
+        self.session_list = SessionList(self.open_position)
+        self.add_widget(self.session_list)
+
+    def refresh(self, store):
+        # Lê apenas as sessões gravadas desde a última abertura do painel
+        if self.index.update(store) or not self.session_list.data:
+            self.apply_filter()
+
+    def apply_filter(self, dt=None):
+        try:
+            positions = self.index.filter(self.animal_input.text, self.date_from_input.text,
+                                          self.date_to_input.text)
+        except ValueError:
+            self.count_label.text = "Data inválida (use AAAA-MM-DD)."
+            return
+        self.session_list.data_model.set_rows(FilteredRows(self.index, positions))
+        self.session_list.scroll_y = 1
+        self.count_label.text = f"{len(positions)} de {len(self.index)} sessão(ões)"
+
+    def open_position(self, position):
+        self.on_open(self.index.session_id(position), self.index.started_text(position))
@@ -0,0 +1,202 @@
+import json
+import os
+import re
+import struct
+import threading
+import time
+
+from session_engine import EVENT_STOP, NO_ZONE, ZONES
+
+# Diário binário de eventos da sessão (somente anexação).
+#
+# Formato do arquivo:
+#   MAGIC (4 bytes) | tamanho do cabeçalho (uint32) | cabeçalho JSON (UTF-8)
+#   registros de largura fixa: timestamp_ns (int64), zona (uint8),
+#   tipo de evento (uint8) e 6 bytes de preenchimento (16 bytes no total)
+#
+# O timestamp é relativo ao início da sessão (relógio monotônico). Uma sessão
+# só está completa quando o último registro é EVENT_STOP; caso contrário ela
+# é considerada interrompida e pode ser recuperada.
+
+MAGIC = b'OFJ1'
+HEADER_LEN = struct.Struct('<I')
+RECORD = struct.Struct('<qBB6x')
+JOURNAL_EXT = '.ofj'
+
+# Diretório padrão dos diários de sessão
+JOURNAL_DIR = 'sessoes'
+
+
+class JournalWriter:
+    """Grava os eventos de uma sessão em segundo plano.
+
+    append() apenas copia o registro para um buffer em memória; uma thread
+    dedicada descarrega o buffer no disco a cada flush_interval segundos e
+    chama os.fsync a cada fsync_interval segundos, de modo que a gravação
+    nunca bloqueia o tratamento de um botão.
+    """
+
+    def __init__(self, path, header, flush_interval=0.5, fsync_interval=2.0):
+        self.path = path
+        self.header = header
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self._buffer = bytearray()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self._last_fsync = time.monotonic()
+
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        self._file = open(path, 'xb')
+        self._file.write(MAGIC + HEADER_LEN.pack(len(header_bytes)) + header_bytes)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self._thread = threading.Thread(target=self._run, name='journal-writer', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def create(cls, animal_id, duration, directory=JOURNAL_DIR, zones=ZONES,
+               extra_header=None, **kwargs):
+        os.makedirs(directory, exist_ok=True)
+        started_at = time.strftime('%Y-%m-%d %H:%M:%S')
+        safe_id = re.sub(r'[^\w.-]+', '_', animal_id) or 'animal'
+        stem = os.path.join(directory, f"{safe_id}_{time.strftime('%Y%m%d_%H%M%S')}")
+        path = stem + JOURNAL_EXT
+        suffix = 1
+        while os.path.exists(path):
+            path = f"{stem}_{suffix}{JOURNAL_EXT}"
+            suffix += 1
+        header = {
+            'animal_id': animal_id,
+            'duration': duration,
+            'zones': list(zones),
+            'started_at': started_at,
+        }
+        if extra_header:
+            header.update(extra_header)
+        return cls(path, header, **kwargs)
+
+    def append(self, t_ns, zone, kind):
+        # Assinatura compatível com os listeners do SessionEngine
+        with self._lock:
+            self._buffer += RECORD.pack(t_ns, zone, kind)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._flush(force_fsync=False)
+
+    def _flush(self, force_fsync):
+        with self._lock:
+            data = bytes(self._buffer)
+            self._buffer.clear()
+        if data:
+            self._file.write(data)
+            self._file.flush()
+        now = time.monotonic()
+        if force_fsync or (data and now - self._last_fsync >= self.fsync_interval):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self._flush(force_fsync=True)
+        self._file.close()
+
+
+def write_journal(path, header, events):
+    # Grava um diário completo de uma vez (sessões geradas fora da interface,
+    # ex.: rastreamento de vídeo)
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    with open(path, 'xb') as file:
+        file.write(MAGIC + HEADER_LEN.pack(len(header_bytes)) + header_bytes)
+        file.write(b''.join(RECORD.pack(*event) for event in events))
+        file.flush()
+        os.fsync(file.fileno())
+    return path
+
+
+def read_journal(path):
+    # Retorna (cabeçalho, eventos). Um registro final incompleto (gravação
+    # interrompida no meio) é descartado.
+    header, events, _ = _read(path)
+    return header, events
+
+
+def read_journal_raw(path):
+    # Retorna (cabeçalho, bytes dos registros completos), para leitura
+    # vetorizada (ex.: numpy.frombuffer)
+    header, data, offset, end = _read_bytes(path)
+    return header, data[offset:end]
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as file:
+        data = file.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"Arquivo não é um diário de sessão: {path}")
+    offset = 4 + HEADER_LEN.size
+    # Gravação interrompida antes do fim do cabeçalho: não há o que recuperar
+    if len(data) < offset:
+        raise ValueError(f"Cabeçalho do diário incompleto: {path}")
+    (header_len,) = HEADER_LEN.unpack_from(data, 4)
+    if offset + header_len > len(data):
+        raise ValueError(f"Cabeçalho do diário incompleto: {path}")
+    header = json.loads(data[offset:offset + header_len].decode('utf-8'))
+    if not isinstance(header, dict):
+        raise ValueError(f"Cabeçalho do diário inválido: {path}")
+    offset += header_len
+    end = offset + (len(data) - offset) // RECORD.size * RECORD.size
+    return header, data, offset, end
+
+
+def _read(path):
+    header, data, offset, end = _read_bytes(path)
+    events = list(RECORD.iter_unpack(data[offset:end]))
+    return header, events, offset
+
+
+def is_finished(events):
+    return bool(events) and events[-1][2] == EVENT_STOP
+
+
+def find_unfinished(directory=JOURNAL_DIR):
+    if not os.path.isdir(directory):
+        return []
+    unfinished = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(JOURNAL_EXT):
+            continue
+        path = os.path.join(directory, name)
+        try:
+            _, events = read_journal(path)
+        except (OSError, ValueError):
+            continue
+        if not is_finished(events):
+            unfinished.append(path)
+    return unfinished
+
+
+def recover_journal(path):
+    # Fecha uma sessão interrompida: anexa um EVENT_STOP no instante do
+    # último evento gravado e devolve (cabeçalho, eventos) já completos.
+    header, events, offset = _read(path)
+    if is_finished(events):
+        return header, events
+    last_ns = events[-1][0] if events else 0
+    stop_event = (last_ns, NO_ZONE, EVENT_STOP)
+    with open(path, 'r+b') as file:
+        # Descarta um eventual registro parcial antes de anexar
+        file.truncate(offset + len(events) * RECORD.size)
+        file.seek(0, os.SEEK_END)
+        file.write(RECORD.pack(*stop_event))
+        file.flush()
+        os.fsync(file.fileno())
+    events.append(stop_event)
+    return header, events
@@ -0,0 +1,211 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from exporter import write_csv
+from journal import JOURNAL_EXT
+from results_store import DB_PATH, ResultsStore
+from session_engine import ZONES, ZONE_LABELS
+
+# Importação de relatórios TXT antigos ("--- Relatório do Teste Open Field
+# ---", gerados por "Exportar Relatório") para o banco de resultados. As
+# árvores de diretórios são percorridas com os.scandir; cada arquivo é lido
+# linha a linha apenas até o fim da seção de áreas, em um pool de processos.
+# Arquivos corrompidos ou incompletos são relatados sem interromper a
+# importação, e arquivos já importados (mesmo caminho e mesma data de
+# modificação) são ignorados. Relatórios de sessões que já estão no banco
+# também: os que têm um diário (.ofj) ao lado, gravados pelo próprio
+# aplicativo, e os de mesmo animal e mesma data de uma sessão existente.
+#
+# Uso:
+#   python legacy_import.py relatorios_antigos/ --db openfield.db
+#   python legacy_import.py arquivo_2005/ arquivo_2006/ --workers 8 --errors erros.csv
+
+REPORT_TITLE = "--- Relatório do Teste Open Field ---"
+REPORT_EXT = '.txt'
+
+# Linhas antes do título que ainda aceitamos (ex.: "Arena: 3" no modo multiarena)
+MAX_PREAMBLE_LINES = 5
+
+# Sessões gravadas no banco por transação
+INSERT_BATCH = 1000
+
+ZONE_BY_LABEL = {label: zone for zone, label in ZONE_LABELS.items()}
+
+
+def scan_reports(inputs):
+    # Gera (caminho, mtime_ns) de cada relatório .txt das árvores indicadas
+    stack = []
+    for item in inputs:
+        if os.path.isdir(item):
+            stack.append(item)
+        elif item.lower().endswith(REPORT_EXT):
+            yield os.path.abspath(item), os.stat(item).st_mtime_ns
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(REPORT_EXT):
+                        yield os.path.abspath(entry.path), entry.stat().st_mtime_ns
+        except OSError:
+            continue
+
+
+def _number(text, suffix):
+    text = text.strip()
+    if not text.endswith(suffix):
+        raise ValueError(f"valor inesperado: {text!r}")
+    return text[:-len(suffix)].strip()
+
+
+def parse_lines(lines):
+    # Interpreta as linhas de um relatório; para de ler após a seção de áreas
+    record = {}
+    zone_values = {}
+    title_seen = False
+    in_zones = False
+    for number, line in enumerate(lines, start=1):
+        line = line.rstrip('\r\n')
+        if not title_seen:
+            if line.strip() == REPORT_TITLE:
+                title_seen = True
+            elif number > MAX_PREAMBLE_LINES:
+                break
+            continue
+        if in_zones:
+            label, sep, value = line.strip().partition(':')
+            if not sep or label not in ZONE_BY_LABEL:
+                break
+            seconds, _, percent = value.partition('(')
+            zone_values[ZONE_BY_LABEL[label]] = (float(_number(seconds, 'segundos')),
+                                                 float(_number(percent, '%)')))
+            continue
+        key, sep, value = line.partition(':')
+        if not sep:
+            continue
+        value = value.strip()
+        if key == "ID do Animal":
+            record['animal_id'] = value
+        elif key == "Data/Hora":
+            try:
+                time.strptime(value, '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                raise ValueError(f"Data/Hora inválida: {value!r}")
+            record['started_at'] = value
+        elif key == "Duração Programada do Teste":
+            duration = float(_number(value, 'segundos'))
+            record['duration'] = int(duration) if duration.is_integer() else duration
+        elif key == "Duração Efetiva do Teste":
+            record['effective_duration'] = float(_number(value, 'segundos'))
+        elif key == "Tempo Acumulado nas Áreas":
+            in_zones = True
+
+    if not title_seen:
+        raise ValueError("não é um relatório do Open Field")
+    missing = [name for name in ('animal_id', 'started_at', 'duration', 'effective_duration')
+               if name not in record]
+    missing += [ZONE_LABELS[zone] for zone in ZONES if zone not in zone_values]
+    if missing:
+        raise ValueError("relatório incompleto, faltando: " + ", ".join(missing))
+    record['zones'] = ZONES
+    record['zone_seconds'] = [zone_values[zone][0] for zone in ZONES]
+    record['zone_percent'] = [zone_values[zone][1] for zone in ZONES]
+    return record
+
+
+def parse_report(path):
+    # Relatórios antigos podem ter sido gravados em Latin-1
+    for encoding in ('utf-8', 'latin-1'):
+        try:
+            with open(path, encoding=encoding) as file:
+                return parse_lines(file)
+        except UnicodeDecodeError:
+            continue
+
+
+def parse_file(item):
+    # Executado nos processos de trabalho: devolve (caminho, mtime_ns, registro, erro)
+    path, mtime_ns = item
+    try:
+        return path, mtime_ns, parse_report(path), None
+    except (OSError, ValueError) as e:
+        return path, mtime_ns, None, str(e)
+
+
+def parse_files(items, workers=None):
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(parse_file, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Blocos grandes: cada tarefa é curta e dominada pela leitura do arquivo
+        yield from executor.map(parse_file, items, chunksize=256)
+
+
+def ingest(inputs, db_path=DB_PATH, workers=None, progress=None):
+    # Retorna (importados, ignorados, [(caminho, erro)])
+    with ResultsStore(db_path) as store:
+        known = store.ingested_files()
+        pending = []
+        skipped = 0
+        for path, mtime_ns in scan_reports(inputs):
+            # O relatório de um diário (ex.: modo multiarena) repete a sessão do diário
+            if known.get(path) == mtime_ns or os.path.exists(os.path.splitext(path)[0] + JOURNAL_EXT):
+                skipped += 1
+            else:
+                pending.append((path, mtime_ns))
+
+        imported = 0
+        errors = []
+        batch = []
+        for path, mtime_ns, record, error in parse_files(pending, workers):
+            if error is not None:
+                errors.append((path, error))
+                continue
+            batch.append((record, record['started_at'], path, mtime_ns))
+            if len(batch) >= INSERT_BATCH:
+                count = store.ingest_sessions(batch)
+                imported += count
+                skipped += len(batch) - count
+                batch = []
+                if progress is not None:
+                    progress(imported, len(pending))
+        if batch:
+            count = store.ingest_sessions(batch)
+            imported += count
+            skipped += len(batch) - count
+    return imported, skipped, sorted(errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importação de relatórios TXT antigos do Open Field")
+    parser.add_argument('inputs', nargs='+', help="Diretórios (percorridos recursivamente) ou arquivos .txt")
+    parser.add_argument('--db', default=DB_PATH, help=f"Banco de resultados (padrão: {DB_PATH})")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Número de processos (padrão: número de CPUs)")
+    parser.add_argument('--errors', help="Arquivo CSV com os relatórios que não puderam ser importados")
+    args = parser.parse_args(argv)
+
+    def progress(done, total):
+        print(f"  {done}/{total} relatório(s) importado(s)...", file=sys.stderr)
+
+    started = time.perf_counter()
+    imported, skipped, errors = ingest(args.inputs, args.db, args.workers, progress)
+    elapsed = time.perf_counter() - started
+
+    for path, error in errors:
+        print(f"Erro em {path}: {error}", file=sys.stderr)
+    if args.errors:
+        write_csv(args.errors, ({'Arquivo': path, 'Erro': error} for path, error in errors))
+    print(f"{imported} relatório(s) importado(s), {skipped} já importado(s), "
+          f"{len(errors)} com erro, em {elapsed:.2f} s", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import numpy as np
+
+from journal import read_journal_raw
+from session_engine import (NS_PER_S, ZONES, ZONE_LABELS, EVENT_ENTER, EVENT_EXIT,
+                            EVENT_STOP)
+
+# Métricas comportamentais calculadas a partir da sequência de eventos da
+# sessão, apenas com operações vetorizadas do NumPy (sem laços por evento):
+# latência até a primeira entrada em cada área, número de entradas,
+# matriz de transições entre áreas e ocupação por intervalo de tempo.
+
+# Registro do diário (ver journal.RECORD) como dtype do NumPy
+JOURNAL_DTYPE = np.dtype([('t_ns', '<i8'), ('zone', 'u1'), ('kind', 'u1'), ('pad', 'V6')])
+
+# Intervalo padrão da ocupação por tempo (1 minuto)
+BIN_SECONDS = 60
+
+
+def events_to_arrays(events):
+    # Lista de tuplas (t_ns, zona, tipo) -> três vetores
+    if len(events) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    table = np.asarray(events, dtype=np.int64)
+    return table[:, 0], table[:, 1], table[:, 2]
+
+
+def load_journal_arrays(path):
+    # Lê o diário diretamente para vetores, sem desempacotar registro a registro
+    header, data = read_journal_raw(path)
+    records = np.frombuffer(data, dtype=JOURNAL_DTYPE)
+    return header, records['t_ns'], records['zone'].astype(np.int64), records['kind'].astype(np.int64)
+
+
+def visit_intervals(t_ns, zone, kind, end_ns):
+    # Visitas às áreas como (início, fim, área). O motor garante que cada
+    # entrada é seguida da saída correspondente; uma visita ainda aberta
+    # (sessão em andamento) termina em end_ns.
+    starts = t_ns[kind == EVENT_ENTER]
+    zones = zone[kind == EVENT_ENTER]
+    ends = t_ns[kind == EVENT_EXIT]
+    if len(ends) < len(starts):
+        ends = np.append(ends, end_ns)
+    return starts, ends, zones
+
+
+def occupancy_at(starts, durations, times):
+    # Tempo acumulado nas visitas até cada instante de times. As visitas
+    # estão ordenadas e não se sobrepõem, então basta uma busca binária.
+    if len(starts) == 0:
+        return np.zeros(len(times), dtype=np.float64)
+    cumulative = np.concatenate(([0], np.cumsum(durations)))
+    count = np.searchsorted(starts, times, side='right')
+    last = np.maximum(count - 1, 0)
+    partial = np.clip(times - starts[last], 0, durations[last])
+    partial = np.where(count > 0, partial, 0)
+    return cumulative[last] + partial
+
+
+def compute_metrics(t_ns, zone, kind, end_ns=None, zones=ZONES, bin_seconds=BIN_SECONDS):
+    t_ns = np.asarray(t_ns, dtype=np.int64)
+    zone = np.asarray(zone, dtype=np.int64)
+    kind = np.asarray(kind, dtype=np.int64)
+    n_zones = len(zones)
+
+    if end_ns is None:
+        stops = t_ns[kind == EVENT_STOP]
+        end_ns = int(stops[0]) if len(stops) else (int(t_ns[-1]) if len(t_ns) else 0)
+
+    starts, ends, visit_zones = visit_intervals(t_ns, zone, kind, end_ns)
+    durations = ends - starts
+
+    entries = np.bincount(visit_zones, minlength=n_zones)
+    zone_ns = np.bincount(visit_zones, weights=durations, minlength=n_zones)
+
+    # Latência até a primeira entrada (NaN quando o animal não entrou na área)
+    latency_s = np.full(n_zones, np.nan)
+    seen, first = np.unique(visit_zones, return_index=True)
+    latency_s[seen] = starts[first] / NS_PER_S
+
+    # Transições entre visitas consecutivas (linha: de, coluna: para). A
+    # diagonal conta reentradas na mesma área após um intervalo sem marcação.
+    pairs = visit_zones[:-1] * n_zones + visit_zones[1:]
+    transitions = np.bincount(pairs, minlength=n_zones * n_zones).reshape(n_zones, n_zones)
+
+    # Ocupação por intervalo de tempo
+    bin_ns = int(bin_seconds * NS_PER_S)
+    n_bins = max(1, -(-end_ns // bin_ns))
+    edges = np.minimum(np.arange(n_bins + 1, dtype=np.int64) * bin_ns, end_ns)
+    occupancy_s = np.zeros((n_bins, n_zones))
+    for index in range(n_zones):
+        mask = visit_zones == index
+        cumulative = occupancy_at(starts[mask], durations[mask], edges)
+        occupancy_s[:, index] = np.diff(cumulative) / NS_PER_S
+
+    return {
+        'zones': tuple(zones),
+        'end_s': end_ns / NS_PER_S,
+        'zone_seconds': zone_ns / NS_PER_S,
+        'entries': entries,
+        'latency_s': latency_s,
+        'transitions': transitions,
+        'bin_seconds': bin_seconds,
+        'occupancy_s': occupancy_s,
+    }
+
+
+def metrics_from_events(events, end_ns=None, zones=ZONES, bin_seconds=BIN_SECONDS):
+    t_ns, zone, kind = events_to_arrays(events)
+    return compute_metrics(t_ns, zone, kind, end_ns, zones, bin_seconds)
+
+
+def format_metrics(metrics):
+    labels = [ZONE_LABELS.get(zone, zone) for zone in metrics['zones']]
+    width = max(8, max(len(label) for label in labels) + 1)
+
+    report = "Métricas Comportamentais:\n"
+    for label, latency in zip(labels, metrics['latency_s']):
+        value = "sem entrada" if np.isnan(latency) else f"{latency:.2f} segundos"
+        report += f"  Latência até a primeira entrada ({label}): {value}\n"
+    report += "  Número de Entradas: " + ", ".join(
+        f"{label} {count}" for label, count in zip(labels, metrics['entries'])) + "\n\n"
+
+    report += "Transições entre Áreas (linha: de, coluna: para):\n"
+    report += " " * (width + 2) + "".join(label.rjust(width) for label in labels) + "\n"
+    for label, row in zip(labels, metrics['transitions']):
+        report += "  " + label.ljust(width) + "".join(str(count).rjust(width) for count in row) + "\n"
+    report += "\n"
+
+    report += f"Ocupação por Intervalo de {metrics['bin_seconds']:g} s (segundos):\n"
+    report += "  " + "#".ljust(width) + "".join(label.rjust(width) for label in labels) + "\n"
+    for number, row in enumerate(metrics['occupancy_s'], start=1):
+        report += "  " + str(number).ljust(width) + "".join(f"{value:.2f}".rjust(width) for value in row) + "\n"
+    report += "\n"
+    return report
+
+
+def metrics_row(metrics):
+    # Colunas planas para exportação em tabela
+    row = {}
+    labels = [ZONE_LABELS.get(zone, zone) for zone in metrics['zones']]
+    for label, latency, count in zip(labels, metrics['latency_s'], metrics['entries']):
+        row[f"Latência {label} (s)"] = None if np.isnan(latency) else float(latency)
+        row[f"Entradas {label}"] = int(count)
+    for source, row_counts in zip(labels, metrics['transitions']):
+        for target, count in zip(labels, row_counts):
+            row[f"Transições {source}->{target}"] = int(count)
+    # Uma coluna por intervalo e área; o número de intervalos varia com a
+    # duração da sessão (ver exporter.write_csv)
+    unit = "min" if metrics['bin_seconds'] == 60 else "intervalo"
+    for number, values in enumerate(metrics['occupancy_s'], start=1):
+        for label, value in zip(labels, values):
+            row[f"Ocupação {unit} {number} {label} (s)"] = float(value)
+    return row
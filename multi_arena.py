@@ -0,0 +1,277 @@
+import os
+import sqlite3
+
+from kivy.clock import Clock
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.gridlayout import GridLayout
+from kivy.uix.label import Label
+from kivy.uix.button import Button
+from kivy.uix.textinput import TextInput
+from kivy.uix.popup import Popup
+
+from session_engine import SessionEngine, ZONES, ZONE_LABELS, format_report, now_ns
+from journal import JournalWriter, read_journal, find_unfinished, recover_journal
+from zone_input import touch_event_ns
+from metrics import metrics_from_events, format_metrics
+from results_store import ResultsStore
+from station_client import station_client_from_env, session_name
+
+# Modo multiarena: várias caixas de campo aberto pontuadas ao mesmo tempo.
+# Cada painel tem seu próprio animal, duração, botões de área, motor e
+# diário; todos são atualizados por um único evento do Clock.
+
+ZONE_COLORS = {
+    'corner': (0.8, 0, 0, 1),      # Vermelho
+    'lateral': (0.5, 0.8, 1, 1),   # Azul claro
+    'center': (0, 0.6, 0, 1),      # Verde floresta
+}
+PRESSED_COLOR = (0.3, 0.3, 0.3, 1)  # Cinza escuro
+
+
+class ArenaPanel(BoxLayout):
+    def __init__(self, number, **kwargs):
+        super().__init__(orientation='vertical', spacing=5, padding=5, **kwargs)
+        self.number = number
+        self.engine = SessionEngine()
+        self.journal = None
+        self.station_listener = None
+        self.report_path = None
+
+        self.add_widget(Label(text=f'Arena {number}', size_hint_y=0.1, bold=True))
+
+        config_layout = GridLayout(cols=2, spacing=5, size_hint_y=0.35)
+        config_layout.add_widget(Label(text='ID do Animal:'))
+        self.animal_id_input = TextInput(multiline=False)
+        config_layout.add_widget(self.animal_id_input)
+        config_layout.add_widget(Label(text='Duração (s):'))
+        self.duration_input = TextInput(text='300', multiline=False)
+        config_layout.add_widget(self.duration_input)
+        config_layout.add_widget(Label(text='Grupo:'))
+        self.group_input = TextInput(multiline=False)
+        config_layout.add_widget(self.group_input)
+        config_layout.add_widget(Label(text='Protocolo:'))
+        self.protocol_input = TextInput(multiline=False)
+        config_layout.add_widget(self.protocol_input)
+        self.add_widget(config_layout)
+
+        control_layout = BoxLayout(orientation='horizontal', spacing=5, size_hint_y=0.13)
+        self.timer_label = Label(text='00:00', font_size=20)
+        self.start_button = Button(text='Iniciar', background_color=(0, 0.8, 0, 1))
+        self.start_button.bind(on_press=self.start_test)
+        self.stop_button = Button(text='Parar', disabled=True, background_color=(0.8, 0, 0, 1))
+        self.stop_button.bind(on_press=self.stop_test)
+        control_layout.add_widget(self.timer_label)
+        control_layout.add_widget(self.start_button)
+        control_layout.add_widget(self.stop_button)
+        self.add_widget(control_layout)
+
+        zone_layout = GridLayout(cols=len(ZONES), spacing=5, size_hint_y=0.27)
+        self.zone_buttons = {}
+        for zone in ZONES:
+            button = Button(text=ZONE_LABELS[zone], disabled=True, background_color=ZONE_COLORS[zone])
+            button.bind(on_press=lambda instance, zone=zone: self.press_zone(zone, instance))
+            button.bind(on_release=lambda instance, zone=zone: self.release_zone(zone, instance))
+            self.zone_buttons[zone] = button
+            zone_layout.add_widget(button)
+        self.add_widget(zone_layout)
+
+        self.times_label = Label(size_hint_y=0.15)
+        self.add_widget(self.times_label)
+        self.update_times_label()
+
+    def start_test(self, instance):
+        if self.engine.running:
+            return False
+
+        animal_id = self.animal_id_input.text.strip()
+        if not animal_id:
+            self.show_popup("Erro", f"Arena {self.number}: insira o ID do Animal.")
+            return False
+        try:
+            duration = int(self.duration_input.text)
+            if duration <= 0:
+                raise ValueError
+        except ValueError:
+            self.show_popup("Erro", f"Arena {self.number}: insira uma duração de teste válida.")
+            return False
+
+        try:
+            self.journal = JournalWriter.create(animal_id, duration, extra_header={
+                'arena': self.number,
+                'group': self.group_input.text.strip(),
+                'protocol': self.protocol_input.text.strip(),
+            })
+        except OSError as e:
+            self.show_popup("Erro", f"Não foi possível criar o diário da sessão: {str(e)}")
+            return False
+        self.engine.add_listener(self.journal.append)
+        client = self.parent_hub().station_client
+        if client is not None:
+            self.station_listener = client.begin_session(session_name(self.journal.path),
+                                                         self.journal.header)
+            self.engine.add_listener(self.station_listener)
+        self.engine.start(animal_id, duration)
+
+        self.start_button.disabled = True
+        self.stop_button.disabled = False
+        for button in self.zone_buttons.values():
+            button.disabled = False
+        self.sync_zone_buttons()
+        self.update_times_label()
+        self.parent_hub().ensure_ticking()
+        return True
+
+    def parent_hub(self):
+        widget = self.parent
+        while widget is not None and not isinstance(widget, MultiArenaApp):
+            widget = widget.parent
+        return widget
+
+    def stop_test(self, instance=None):
+        if self.journal is None:
+            return
+        self.engine.stop()
+        self.finish()
+
+    def finish(self):
+        # Fecha o diário, recalcula a partir do disco e grava o relatório da arena
+        self.engine.remove_listener(self.journal.append)
+        if self.station_listener is not None:
+            self.engine.remove_listener(self.station_listener)
+            self.station_listener = None
+        self.journal.close()
+        path = self.journal.path
+        self.journal = None
+        header, events = read_journal(path)
+        self.engine.load_events(header['animal_id'], header['duration'], events)
+
+        try:
+            self.parent_hub().get_results_store().add_session(
+                self.engine.summary(), header['started_at'], self.engine.events,
+                protocol=header.get('protocol', ''), group=header.get('group', ''),
+                source=path)
+        except sqlite3.Error as e:
+            self.show_popup("Erro no Banco de Resultados", f"Arena {self.number}: {str(e)}")
+        client = self.parent_hub().station_client
+        if client is not None:
+            client.end_session(session_name(path), header, self.engine.events)
+
+        self.report_path = os.path.splitext(path)[0] + '.txt'
+        try:
+            with open(self.report_path, 'w', encoding='utf-8') as file:
+                file.write(f"Arena: {self.number}\n")
+                file.write(format_report(self.engine.summary(), header['started_at']))
+                file.write(format_metrics(metrics_from_events(self.engine.events)))
+        except OSError as e:
+            self.show_popup("Erro na Exportação", f"Arena {self.number}: {str(e)}")
+
+        self.start_button.disabled = False
+        self.stop_button.disabled = True
+        for button in self.zone_buttons.values():
+            button.disabled = True
+        self.sync_zone_buttons()
+        self.update_times_label()
+        self.timer_label.text = '00:00'
+
+    def tick(self, t_ns):
+        # Chamado pelo evento compartilhado do Clock
+        if self.journal is None:
+            return False
+        if not self.engine.tick(t_ns):
+            self.finish()
+            return False
+        remaining_time = self.engine.remaining_s(t_ns)
+        self.timer_label.text = f"{int(remaining_time // 60):02d}:{int(remaining_time % 60):02d}"
+        if self.engine.active_zone is not None:
+            self.update_times_label(t_ns)
+        return True
+
+    def press_zone(self, zone, instance=None):
+        t_ns = touch_event_ns(getattr(instance, 'last_touch', None))
+        if self.engine.press(zone, t_ns):
+            self.update_times_label()
+            self.sync_zone_buttons()
+
+    def release_zone(self, zone, instance=None):
+        t_ns = touch_event_ns(getattr(instance, 'last_touch', None), released=True)
+        if self.engine.release(zone, t_ns):
+            self.update_times_label()
+            self.sync_zone_buttons()
+
+    def sync_zone_buttons(self):
+        active_zone = self.engine.active_zone
+        for index, zone in enumerate(ZONES):
+            pressed = index == active_zone
+            self.zone_buttons[zone].background_color = PRESSED_COLOR if pressed else ZONE_COLORS[zone]
+
+    def update_times_label(self, t_ns=None):
+        seconds = self.engine.zone_seconds(t_ns)
+        self.times_label.text = "  ".join(
+            f"{ZONE_LABELS[zone]}: {value:.1f} s" for zone, value in zip(ZONES, seconds))
+
+    def show_popup(self, title, message):
+        content = BoxLayout(orientation='vertical', spacing=10)
+        content.add_widget(Label(text=message))
+
+        close_btn = Button(text="OK", size_hint_y=None, height=50)
+        content.add_widget(close_btn)
+
+        popup = Popup(title=title, content=content, size_hint=(0.6, 0.4))
+        close_btn.bind(on_press=popup.dismiss)
+        popup.open()
+
+
+class MultiArenaApp(BoxLayout):
+    """Janela com N arenas independentes e um único evento do Clock."""
+
+    def __init__(self, arena_count, **kwargs):
+        super().__init__(orientation='vertical', padding=10, spacing=10, **kwargs)
+        self.timer_event = None
+        self.results_store = None
+        self.station_client = station_client_from_env()
+
+        cols = 2 if arena_count <= 4 else 4
+        grid = GridLayout(cols=cols, spacing=10)
+        self.panels = [ArenaPanel(number + 1) for number in range(arena_count)]
+        for panel in self.panels:
+            grid.add_widget(panel)
+        self.add_widget(grid)
+
+    def get_results_store(self):
+        if self.results_store is None:
+            self.results_store = ResultsStore()
+        return self.results_store
+
+    def ensure_ticking(self):
+        if self.timer_event is None:
+            self.timer_event = Clock.schedule_interval(self.tick, 0.2)
+
+    def tick(self, dt):
+        # Um único instante para todas as arenas neste quadro
+        t_ns = now_ns()
+        running = False
+        for panel in self.panels:
+            if panel.tick(t_ns):
+                running = True
+        if not running:
+            self.timer_event = None
+            return False
+        return True
+
+    def recover_sessions(self, dt=None):
+        # Fecha diários interrompidos e grava as sessões no banco de resultados
+        recovered = 0
+        for path in find_unfinished():
+            try:
+                header, events = recover_journal(path)
+                engine = SessionEngine.from_events(header['animal_id'], header['duration'], events)
+                self.get_results_store().add_session(
+                    engine.summary(), header['started_at'], engine.events,
+                    protocol=header.get('protocol', ''), group=header.get('group', ''),
+                    source=path)
+                recovered += 1
+            except (OSError, ValueError, sqlite3.Error):
+                continue
+        if recovered:
+            self.panels[0].show_popup("Sessões Recuperadas",
+                                      f"{recovered} sessão(ões) interrompida(s) recuperada(s).")
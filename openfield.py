@@ -1,24 +1,56 @@
-import kivy
-from kivy.app import App
-from kivy.uix.boxlayout import BoxLayout
-from kivy.uix.gridlayout import GridLayout
-from kivy.uix.label import Label
-from kivy.uix.button import Button
-from kivy.uix.textinput import TextInput
-from kivy.uix.popup import Popup
-from kivy.uix.scrollview import ScrollView
-from kivy.clock import Clock
-from kivy.core.window import Window
-from kivy.uix.filechooser import FileChooserListView
-from kivy_garden.matplotlib.backend_kivyagg import FigureCanvasKivyAgg
-import matplotlib.pyplot as plt
+from startup_timing import startup
+
+with startup.measure('kivy'):
+    import kivy
+    from kivy.app import App
+    from kivy.clock import Clock
+    from kivy.logger import Logger
+with startup.measure('kivy.uix'):
+    from kivy.uix.boxlayout import BoxLayout
+    from kivy.uix.gridlayout import GridLayout
+    from kivy.uix.label import Label
+    from kivy.uix.button import Button
+    from kivy.uix.textinput import TextInput
+    from kivy.uix.popup import Popup
+    from kivy.uix.togglebutton import ToggleButton
+    from kivy.uix.spinner import Spinner
+with startup.measure('kivy.core.window'):
+    from kivy.core.window import Window, Keyboard
 import time
 import os
+import sqlite3
+
+with startup.measure('openfield (módulos locais)'):
+    from session_engine import SessionEngine, ZONES, NS_PER_S, format_report, report_row, now_ns
+    from zone_input import KeyZoneInput, LatencyStats, load_key_bindings, touch_event_ns
+    from journal import JOURNAL_DIR, JournalWriter, read_journal, find_unfinished, recover_journal
+    from metrics import metrics_from_events, format_metrics, metrics_row
+    from results_store import ResultsStore, row_to_summary
+    from exporter import ExportWorker, FORMATS as EXPORT_FORMATS, export_session, export_all_sessions
+    from chart_view import ZoneChartView, warm_up as warm_up_chart
+    from arena_trace import ArenaTraceWidget
+    from trajectory import trajectory_metrics, format_trajectory, trajectory_row
+    from profiler import profiler
+    from profiler_overlay import ProfilerOverlay, frame_monitor
+    from replay_view import ReplayBar
+    from history_view import HistoryPanel
+    from cohort import open_cohort
+    from cohort_view import CohortDashboard
+    from station_client import station_client_from_env, session_name
 
 # Definindo o tamanho mínimo da janela
 Window.minimum_width = 1200
 Window.minimum_height = 700
 
+# Número de arenas simultâneas (OPENFIELD_ARENAS=8 para o modo multiarena)
+ARENA_COUNT = int(os.environ.get('OPENFIELD_ARENAS', '1'))
+
+# Intervalo do gráfico ao vivo, em atualizações do timer (5 x 0.2 s = 1 s)
+LIVE_CHART_TICKS = 5
+
+# Medições de desempenho da sessão, gravadas ao lado do diário ao parar o teste
+PROFILE_SUFFIX = '_desempenho.json'
+
 class OpenFieldApp(BoxLayout):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -28,32 +60,52 @@ class OpenFieldApp(BoxLayout):
         
         # Variáveis de controle do teste
         self.test_running = False
-        self.start_time = None
-        self.remaining_time = 0
         self.test_duration = 300  # Duração padrão em segundos
         self.animal_id = ""
         
-        # Variáveis para armazenar o tempo acumulado em cada área
-        self.corner_time = 0.0
-        self.lateral_time = 0.0
-        self.center_time = 0.0
+        # Motor de sessão: toda a contabilidade de tempo por área fica nele
+        self.engine = SessionEngine()
         
-        # Variáveis para controlar se um botão de área está atualmente pressionado
-        self.corner_button_pressed = False
-        self.lateral_button_pressed = False
-        self.center_button_pressed = False
+        # Diário binário da sessão atual (fonte de verdade do relatório)
+        self.journal = None
         
-        # Variáveis para registrar o tempo de início da pressão do botão
-        self.corner_press_time = None
-        self.lateral_press_time = None
-        self.center_press_time = None
+        # Banco de resultados (aberto no primeiro uso)
+        self.results_store = None
+        
+        # Envio opcional dos eventos e sessões ao agregador (OPENFIELD_AGGREGATOR)
+        self.station_client = station_client_from_env()
+        self.station_listener = None
+        
+        # Exportações rodam em uma thread; a conclusão volta à interface pelo Clock
+        self.export_worker = ExportWorker(
+            dispatch=lambda callback: Clock.schedule_once(lambda dt: callback(), 0))
         
         self.test_data = {}  # Para armazenar os resultados do teste atual
         
+        # Cabeçalho do diário da sessão exibida (data de início, grupo, protocolo)
+        self.session_header = {}
+        
         # Evento do Clock para atualizar o timer
         self.timer_event = None
         
+        # Gráfico ao vivo: redesenha a cada LIVE_CHART_TICKS atualizações do timer
+        self.live_chart_ticks = 0
+        
+        # Entrada por teclado/pedal, tratada no nível da janela
+        self.key_input = KeyZoneInput(self.load_key_codes(),
+                                      lambda zone, t_ns: self.press_zone(zone, t_ns, source='key'),
+                                      lambda zone, t_ns: self.release_zone(zone, t_ns, source='key'))
+        # Toques e teclas separados: o instante da tecla é tomado na entrada do
+        # tratador, então sua latência mede só o tratamento
+        self.input_latency = {'touch': LatencyStats(), 'key': LatencyStats()}
+        
+        # Painel de desempenho (F12)
+        self.profiler_overlay = ProfilerOverlay()
+        self.overlay_key = Keyboard.keycodes['f12']
+        
         self.create_widgets()
+        
+        Window.bind(on_key_down=self.on_window_key_down, on_key_up=self.on_window_key_up)
     
     def create_widgets(self):
         # Coluna da esquerda - Aplicação de Teste
@@ -64,19 +116,29 @@ class OpenFieldApp(BoxLayout):
         config_layout.add_widget(Label(text='Configurações do Teste', size_hint_y=0.2, bold=True))
         
         # ID do Animal
-        id_layout = BoxLayout(orientation='horizontal', size_hint_y=0.4)
+        id_layout = BoxLayout(orientation='horizontal', size_hint_y=0.2)
         id_layout.add_widget(Label(text='ID do Animal:', size_hint_x=0.4))
         self.animal_id_input = TextInput(multiline=False, size_hint_x=0.6)
         id_layout.add_widget(self.animal_id_input)
         config_layout.add_widget(id_layout)
         
         # Duração do Teste
-        duration_layout = BoxLayout(orientation='horizontal', size_hint_y=0.4)
+        duration_layout = BoxLayout(orientation='horizontal', size_hint_y=0.2)
         duration_layout.add_widget(Label(text='Duração (segundos):', size_hint_x=0.4))
         self.duration_input = TextInput(text='300', multiline=False, size_hint_x=0.6)
         duration_layout.add_widget(self.duration_input)
         config_layout.add_widget(duration_layout)
         
+        # Grupo e Protocolo (usados nas consultas ao banco de resultados)
+        group_layout = BoxLayout(orientation='horizontal', size_hint_y=0.2)
+        group_layout.add_widget(Label(text='Grupo:', size_hint_x=0.2))
+        self.group_input = TextInput(multiline=False, size_hint_x=0.3)
+        group_layout.add_widget(self.group_input)
+        group_layout.add_widget(Label(text='Protocolo:', size_hint_x=0.2))
+        self.protocol_input = TextInput(multiline=False, size_hint_x=0.3)
+        group_layout.add_widget(self.protocol_input)
+        config_layout.add_widget(group_layout)
+        
         left_column.add_widget(config_layout)
         
         # Frame de Controle do Teste
@@ -88,26 +150,39 @@ class OpenFieldApp(BoxLayout):
         
         # Botões de controle
         buttons_layout = BoxLayout(orientation='horizontal', spacing=10, size_hint_y=0.5)
-        self.start_button = Button(text='Iniciar Teste', size_hint_x=0.5)
+        self.start_button = Button(text='Iniciar Teste', size_hint_x=0.35)
         self.start_button.bind(on_press=self.start_test)
         self.start_button.background_color = (0, 0.8, 0, 1)  # Verde
         
-        self.stop_button = Button(text='Parar Teste', size_hint_x=0.5, disabled=True)
+        self.stop_button = Button(text='Parar Teste', size_hint_x=0.35, disabled=True)
         self.stop_button.bind(on_press=self.stop_test)
         self.stop_button.background_color = (0.8, 0, 0, 1)  # Vermelho
         
+        self.replay_button = Button(text='Revisar Sessão', size_hint_x=0.3)
+        self.replay_button.bind(on_press=self.open_replay)
+        
         buttons_layout.add_widget(self.start_button)
         buttons_layout.add_widget(self.stop_button)
+        buttons_layout.add_widget(self.replay_button)
         control_layout.add_widget(buttons_layout)
         
         left_column.add_widget(control_layout)
         
         # Frame de Marcação de Áreas
         area_layout = BoxLayout(orientation='vertical', spacing=10, size_hint_y=0.4)
-        area_layout.add_widget(Label(text='Marcação de Áreas (Pressione e Segure)', size_hint_y=0.15, bold=True))
+        area_header = BoxLayout(orientation='horizontal', size_hint_y=0.15)
+        area_header.add_widget(Label(text='Marcação de Áreas (Pressione e Segure)', size_hint_x=0.7, bold=True))
+        self.trace_mode_btn = ToggleButton(text='Traçar Posição', size_hint_x=0.3)
+        self.trace_mode_btn.bind(state=self.on_trace_mode)
+        area_header.add_widget(self.trace_mode_btn)
+        area_layout.add_widget(area_header)
+        
+        # Entrada das áreas: botões ou arena para traçar a posição
+        self.input_area = BoxLayout(orientation='vertical', spacing=10, size_hint_y=0.6)
+        self.zone_buttons_box = BoxLayout(orientation='vertical', spacing=10)
         
         # Botões das áreas
-        area_buttons_layout = GridLayout(cols=2, spacing=10, size_hint_y=0.4)
+        area_buttons_layout = GridLayout(cols=2, spacing=10, size_hint_y=0.67)
         
         self.corner_btn = Button(text='Canto', disabled=True)
         self.corner_btn.background_color = (0.8, 0, 0, 1)  # Vermelho
@@ -121,14 +196,38 @@ class OpenFieldApp(BoxLayout):
         
         area_buttons_layout.add_widget(self.corner_btn)
         area_buttons_layout.add_widget(self.lateral_btn)
-        area_layout.add_widget(area_buttons_layout)
+        self.zone_buttons_box.add_widget(area_buttons_layout)
         
         # Botão do centro (ocupa toda a largura)
-        self.center_btn = Button(text='Centro', disabled=True, size_hint_y=0.2)
+        self.center_btn = Button(text='Centro', disabled=True, size_hint_y=0.33)
         self.center_btn.background_color = (0, 0.6, 0, 1)  # Verde floresta
         self.center_btn.bind(on_press=self.on_center_press)
         self.center_btn.bind(on_release=self.on_center_release)
-        area_layout.add_widget(self.center_btn)
+        self.zone_buttons_box.add_widget(self.center_btn)
+        
+        # Arena de traçado: a área é deduzida da posição do cursor/dedo
+        self.arena_trace = ArenaTraceWidget(self.press_zone, self.release_zone)
+        
+        # Controles da revisão de sessões gravadas (criados no primeiro uso)
+        self.replay_bar = None
+        
+        # Histórico de sessões do banco de resultados (criado no primeiro uso)
+        self.history_popup = None
+        self.history_panel = None
+        
+        # Agregados por grupo e painel de coorte (criados no primeiro uso)
+        self.cohort_stats = None
+        self.cohort_popup = None
+        self.cohort_dashboard = None
+        
+        self.input_area.add_widget(self.zone_buttons_box)
+        area_layout.add_widget(self.input_area)
+        
+        self.zone_buttons = {
+            'corner': self.corner_btn,
+            'lateral': self.lateral_btn,
+            'center': self.center_btn,
+        }
         
         # Labels para exibir os tempos
         times_layout = BoxLayout(orientation='vertical', spacing=5, size_hint_y=0.25)
@@ -160,21 +259,36 @@ class OpenFieldApp(BoxLayout):
         generate_report_btn = Button(text='Gerar/Atualizar Relatório')
         generate_report_btn.bind(on_press=self.generate_report)
         
-        export_report_btn = Button(text='Exportar Relatório (TXT)')
+        export_report_btn = Button(text='Exportar Relatório')
         export_report_btn.bind(on_press=self.export_report)
         
+        latency_btn = Button(text='Latência de Entrada', size_hint_x=0.6)
+        latency_btn.bind(on_press=self.show_input_latency)
+        
+        self.history_button = Button(text='Histórico', size_hint_x=0.5)
+        self.history_button.bind(on_press=self.open_history)
+        
         report_buttons_layout.add_widget(generate_report_btn)
         report_buttons_layout.add_widget(export_report_btn)
+        report_buttons_layout.add_widget(latency_btn)
+        report_buttons_layout.add_widget(self.history_button)
         report_layout.add_widget(report_buttons_layout)
         
         right_column.add_widget(report_layout)
         
         # Frame do Gráfico
         chart_layout = BoxLayout(orientation='vertical', spacing=10, size_hint_y=0.5)
-        chart_layout.add_widget(Label(text='Distribuição de Tempo por Área', size_hint_y=0.1, bold=True))
-        
-        # Área do gráfico
-        self.chart_container = BoxLayout(orientation='vertical', size_hint_y=0.9)
+        chart_header = BoxLayout(orientation='horizontal', size_hint_y=0.1)
+        chart_header.add_widget(Label(text='Distribuição de Tempo por Área', size_hint_x=0.5, bold=True))
+        self.live_chart_btn = ToggleButton(text='Ao Vivo', size_hint_x=0.25)
+        chart_header.add_widget(self.live_chart_btn)
+        self.cohort_button = Button(text='Coorte', size_hint_x=0.25)
+        self.cohort_button.bind(on_press=self.open_cohort_view)
+        chart_header.add_widget(self.cohort_button)
+        chart_layout.add_widget(chart_header)
+        
+        # Área do gráfico (figura criada uma vez e reaproveitada)
+        self.chart_container = ZoneChartView(orientation='vertical', size_hint_y=0.9)
         chart_layout.add_widget(self.chart_container)
         
         right_column.add_widget(chart_layout)
@@ -201,36 +315,51 @@ class OpenFieldApp(BoxLayout):
             self.show_popup("Erro", "Por favor, insira uma duração de teste válida.")
             return
         
-        # Inicializa o teste
+        # Abre o diário da sessão antes de iniciar, para registrar o início
+        try:
+            self.journal = JournalWriter.create(animal_id, duration, extra_header={
+                'group': self.group_input.text.strip(),
+                'protocol': self.protocol_input.text.strip(),
+            })
+        except OSError as e:
+            self.show_popup("Erro", f"Não foi possível criar o diário da sessão: {str(e)}")
+            return
+        self.engine.add_listener(self.journal.append)
+        if self.station_client is not None:
+            self.station_listener = self.station_client.begin_session(
+                session_name(self.journal.path), self.journal.header)
+            self.engine.add_listener(self.station_listener)
+        
+        # Inicializa o teste (o motor zera os tempos e estados das áreas)
         self.test_running = True
-        self.start_time = time.time()
-        self.remaining_time = duration
         self.test_duration = duration
         self.animal_id = animal_id
-        
-        # Reset dos tempos e estados
-        self.corner_time = 0.0
-        self.lateral_time = 0.0
-        self.center_time = 0.0
-        self.corner_button_pressed = False
-        self.lateral_button_pressed = False
-        self.center_button_pressed = False
-        self.corner_press_time = None
-        self.lateral_press_time = None
-        self.center_press_time = None
         self.test_data = {}
+        self.session_header = self.journal.header
+        self.engine.start(animal_id, duration)
+        self.key_input.reset()
+        for stats in self.input_latency.values():
+            stats.clear()
+        self.arena_trace.clear()
+        self.arena_trace.enabled = True
+        self.trace_mode_btn.disabled = True
+        self.replay_button.disabled = True
+        self.history_button.disabled = True
+        profiler.clear()
+        frame_monitor.start(self)
         
         self.update_area_time_labels()
+        self.sync_zone_buttons()
         
         # Atualiza os botões
         self.start_button.disabled = True
         self.stop_button.disabled = False
-        self.corner_btn.disabled = False
-        self.lateral_btn.disabled = False
-        self.center_btn.disabled = False
+        for button in self.zone_buttons.values():
+            button.disabled = False
         
         # Limpa o gráfico anterior
-        self.chart_container.clear_widgets()
+        self.chart_container.clear()
+        self.live_chart_ticks = 0
         
         # Inicia o timer
         self.timer_event = Clock.schedule_interval(self.update_timer, 0.2)
@@ -241,6 +370,16 @@ class OpenFieldApp(BoxLayout):
         
         self.test_running = False
         
+        # Encerra a sessão; qualquer tempo ativo é contabilizado até este instante
+        self.engine.stop()
+        journal_path = self.journal.path if self.journal is not None else None
+        self.close_journal()
+        self.arena_trace.enabled = False
+        self.trace_mode_btn.disabled = False
+        self.replay_button.disabled = False
+        self.history_button.disabled = False
+        frame_monitor.stop(self)
+        
         # Para o timer
         if self.timer_event:
             self.timer_event.cancel()
@@ -248,109 +387,373 @@ class OpenFieldApp(BoxLayout):
         # Atualiza os botões
         self.start_button.disabled = False
         self.stop_button.disabled = True
-        self.corner_btn.disabled = True
-        self.lateral_btn.disabled = True
-        self.center_btn.disabled = True
-        
-        # Garante que qualquer tempo ativo seja contabilizado
-        if self.corner_button_pressed:
-            self.on_corner_release(None)
-        if self.lateral_button_pressed:
-            self.on_lateral_release(None)
-        if self.center_button_pressed:
-            self.on_center_release(None)
+        for button in self.zone_buttons.values():
+            button.disabled = True
         
+        self.sync_zone_buttons()
         self.update_area_time_labels()
         self.generate_report(None)
         
+        if journal_path is not None:
+            self.save_profile(journal_path)
+        
         if manual_stop:
             self.show_popup("Teste Finalizado", f"Teste para {self.animal_id} finalizado!")
     
+    def save_profile(self, journal_path):
+        # Latências das chamadas e quadros perdidos durante a sessão
+        path = os.path.splitext(journal_path)[0] + PROFILE_SUFFIX
+        try:
+            profiler.save(path, animal_id=self.animal_id, journal=journal_path)
+        except OSError as e:
+            Logger.warning(f"OpenField: não foi possível gravar {path}: {e}")
+    
+    def close_journal(self):
+        if self.journal is None:
+            return
+        self.engine.remove_listener(self.journal.append)
+        if self.station_listener is not None:
+            self.engine.remove_listener(self.station_listener)
+            self.station_listener = None
+        self.journal.close()
+        path = self.journal.path
+        self.journal = None
+        
+        # O relatório final é calculado a partir do que foi gravado em disco
+        header, events = read_journal(path)
+        self.engine.load_events(header['animal_id'], header['duration'], events)
+        self.save_session(path, header)
+    
+    def get_results_store(self):
+        if self.results_store is None:
+            self.results_store = ResultsStore()
+        return self.results_store
+    
+    def save_session(self, path, header):
+        # Grava o resumo e os eventos da sessão no banco de resultados
+        try:
+            self.get_results_store().add_session(
+                self.engine.summary(), header['started_at'], self.engine.events,
+                protocol=header.get('protocol', ''), group=header.get('group', ''),
+                source=path)
+        except sqlite3.Error as e:
+            self.show_popup("Erro no Banco de Resultados",
+                            f"Não foi possível gravar a sessão: {str(e)}")
+        if self.station_client is not None:
+            self.station_client.end_session(session_name(path), header, self.engine.events)
+    
+    def recover_sessions(self, dt=None):
+        # Recupera sessões interrompidas (ex.: queda do aplicativo) e exibe a
+        # mais recente no relatório
+        recovered = []
+        for path in find_unfinished():
+            try:
+                recovered.append((path, recover_journal(path)))
+            except (OSError, ValueError):
+                continue
+        if not recovered:
+            return
+        
+        for path, (header, events) in recovered:
+            self.engine.load_events(header['animal_id'], header['duration'], events)
+            self.save_session(path, header)
+        
+        path, (header, events) = recovered[-1]
+        self.session_header = header
+        self.arena_trace.clear()
+        self.animal_id = header['animal_id']
+        self.test_duration = header['duration']
+        self.engine.load_events(self.animal_id, self.test_duration, events)
+        self.update_area_time_labels()
+        self.generate_report(None)
+        self.show_popup("Sessão Recuperada",
+                        f"{len(recovered)} sessão(ões) interrompida(s) recuperada(s).\n"
+                        f"Exibindo: {self.animal_id} ({header['started_at']})")
+    
+    @profiler.timed('update_timer')
     def update_timer(self, dt):
         if self.test_running:
-            elapsed_total_time = time.time() - self.start_time
-            self.remaining_time = self.test_duration - elapsed_total_time
-            
-            # Atualiza os tempos das áreas em tempo real
-            if self.corner_button_pressed and self.corner_press_time:
-                current_press_duration = time.time() - self.corner_press_time
-                self.corner_time_label.text = f"Tempo no Canto: {self.corner_time + current_press_duration:.2f} s"
+            t_ns = self.engine.clock()
             
-            if self.lateral_button_pressed and self.lateral_press_time:
-                current_press_duration = time.time() - self.lateral_press_time
-                self.lateral_time_label.text = f"Tempo na Lateral: {self.lateral_time + current_press_duration:.2f} s"
-            
-            if self.center_button_pressed and self.center_press_time:
-                current_press_duration = time.time() - self.center_press_time
-                self.center_time_label.text = f"Tempo no Centro: {self.center_time + current_press_duration:.2f} s"
-            
-            if self.remaining_time <= 0:
-                self.remaining_time = 0
+            # O motor encerra a sessão ao atingir a duração programada
+            if not self.engine.tick(t_ns):
                 self.timer_label.text = "Tempo Restante: 00:00"
                 self.stop_test(manual_stop=False)
                 return False
             
-            mins = int(self.remaining_time // 60)
-            secs = int(self.remaining_time % 60)
-            self.timer_label.text = f"Tempo Restante: {mins:02d}:{secs:02d}"
+            # Atualiza os tempos das áreas em tempo real
+            if self.engine.active_zone is not None:
+                self.update_area_time_labels(t_ns)
+            
+            if self.live_chart_btn.state == 'down':
+                self.live_chart_ticks += 1
+                if self.live_chart_ticks >= LIVE_CHART_TICKS:
+                    self.live_chart_ticks = 0
+                    self.show_pie_chart(t_ns)
+            
+            self.show_remaining_time(self.engine.remaining_s(t_ns))
         
         return True
     
+    def show_remaining_time(self, remaining_time):
+        mins = int(remaining_time // 60)
+        secs = int(remaining_time % 60)
+        self.timer_label.text = f"Tempo Restante: {mins:02d}:{secs:02d}"
+    
+    def on_trace_mode(self, instance, state):
+        # Alterna entre os botões das áreas e a arena de traçado
+        self.show_input_widget(self.arena_trace if state == 'down' else self.zone_buttons_box)
+    
+    def show_input_widget(self, widget):
+        self.input_area.clear_widgets()
+        self.input_area.add_widget(widget)
+    
+    def open_replay(self, instance):
+        # Escolha do diário a revisar (o seletor de arquivos só é carregado aqui)
+        if self.test_running:
+            return
+        if not os.path.isdir(JOURNAL_DIR):
+            self.show_popup("Revisão", "Nenhuma sessão gravada para revisar.")
+            return
+        from kivy.uix.filechooser import FileChooserListView
+        
+        content = BoxLayout(orientation='vertical', spacing=10)
+        chooser = FileChooserListView(path=os.path.abspath(JOURNAL_DIR), filters=['*.ofj'])
+        content.add_widget(chooser)
+        
+        buttons_layout = BoxLayout(orientation='horizontal', spacing=10, size_hint_y=None, height=50)
+        open_btn = Button(text="Abrir")
+        cancel_btn = Button(text="Cancelar")
+        buttons_layout.add_widget(open_btn)
+        buttons_layout.add_widget(cancel_btn)
+        content.add_widget(buttons_layout)
+        
+        popup = Popup(title="Revisar Sessão", content=content, size_hint=(0.8, 0.8))
+        
+        def open_selected(instance):
+            if not chooser.selection:
+                return
+            popup.dismiss()
+            self.start_replay(chooser.selection[0])
+        
+        open_btn.bind(on_press=open_selected)
+        cancel_btn.bind(on_press=popup.dismiss)
+        popup.open()
+    
+    def start_replay(self, path):
+        if self.replay_bar is None:
+            self.replay_bar = ReplayBar(self.on_replay_load, self.show_replay_position, self.close_replay,
+                                        lambda message: self.show_popup("Erro", message))
+        try:
+            self.replay_bar.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            self.show_popup("Erro", f"Não foi possível abrir a sessão: {str(e)}")
+            return
+        self.start_button.disabled = True
+        self.trace_mode_btn.disabled = True
+        self.show_input_widget(self.replay_bar)
+    
+    def on_replay_load(self, path, header, events):
+        # O relatório mostra a sessão revisada completa; o traço da arena é da
+        # última sessão ao vivo e não entra nele
+        self.arena_trace.clear()
+        self.session_header = header
+        self.animal_id = header['animal_id']
+        self.test_duration = header['duration']
+        self.engine.load_events(self.animal_id, self.test_duration, events)
+        self.generate_report(None)
+    
+    def show_replay_position(self, timeline, t_ns, final):
+        # Mesmos rótulos, timer e gráfico do teste ao vivo, na posição revisada
+        seconds = timeline.zone_seconds(t_ns)
+        self.show_area_times(seconds)
+        self.sync_zone_buttons(timeline.active_zone(t_ns))
+        self.show_remaining_time(max(0, self.test_duration - t_ns / NS_PER_S))
+        
+        if final:
+            self.live_chart_ticks = 0
+            self.chart_container.show(seconds)
+        elif self.live_chart_btn.state == 'down':
+            self.live_chart_ticks += 1
+            if self.live_chart_ticks >= LIVE_CHART_TICKS:
+                self.live_chart_ticks = 0
+                self.chart_container.show(seconds)
+    
+    def close_replay(self):
+        self.show_input_widget(self.arena_trace if self.trace_mode_btn.state == 'down'
+                               else self.zone_buttons_box)
+        self.start_button.disabled = False
+        self.trace_mode_btn.disabled = False
+        self.timer_label.text = "Tempo Restante: 00:00"
+        self.update_area_time_labels()
+        self.sync_zone_buttons()
+        self.show_pie_chart()
+    
+    def open_history(self, instance):
+        # Lista das sessões gravadas; o painel é mantido entre aberturas e só
+        # lê do banco as sessões novas
+        if self.test_running:
+            return
+        try:
+            store = self.get_results_store()
+            if self.history_popup is None:
+                self.history_panel = HistoryPanel(self.show_history_session)
+                content = BoxLayout(orientation='vertical', spacing=10)
+                content.add_widget(self.history_panel)
+                close_btn = Button(text="Fechar", size_hint_y=None, height=50)
+                content.add_widget(close_btn)
+                self.history_popup = Popup(title="Histórico de Sessões", content=content,
+                                           size_hint=(0.9, 0.9))
+                close_btn.bind(on_press=self.history_popup.dismiss)
+            self.history_panel.refresh(store)
+        except sqlite3.Error as e:
+            self.show_popup("Erro no Banco de Resultados",
+                            f"Não foi possível ler o histórico: {str(e)}")
+            return
+        self.history_popup.open()
+    
+    def show_history_session(self, session_id, started_text):
+        # Relatório e gráfico da sessão escolhida; os eventos só são lidos aqui
+        store = self.get_results_store()
+        try:
+            row = store.session(session_id)
+            events = store.session_events(session_id) if row is not None else []
+        except sqlite3.Error as e:
+            self.show_popup("Erro no Banco de Resultados",
+                            f"Não foi possível abrir a sessão: {str(e)}")
+            return
+        if row is None:
+            self.show_popup("Histórico", "A sessão não está mais no banco de resultados.")
+            return
+        self.history_popup.dismiss()
+        if self.replay_bar is not None and self.replay_bar.parent is not None:
+            self.replay_bar.close()
+        
+        summary = row_to_summary(row)
+        self.session_header = {'started_at': row['started_at'], 'group': row['group_name'],
+                               'protocol': row['protocol']}
+        self.arena_trace.clear()
+        self.animal_id = summary['animal_id']
+        self.test_duration = summary['duration']
+        report = format_report(summary, started_text)
+        self.test_data = report_row(summary, started_text)
+        
+        # Sessões importadas de relatórios antigos não têm eventos
+        if events:
+            self.engine.load_events(self.animal_id, self.test_duration, events)
+            metrics = metrics_from_events(events, int(summary['effective_duration'] * NS_PER_S))
+            report += format_metrics(metrics)
+            self.test_data.update(metrics_row(metrics))
+        self.report_text.text = report
+        self.show_area_times(summary['zone_seconds'])
+        self.chart_container.show(summary['zone_seconds'])
+    
+    def open_cohort_view(self, instance):
+        # Médias por grupo, box plots e comparação entre dias; só as sessões
+        # gravadas desde a última abertura são lidas e somadas aos agregados
+        try:
+            self.cohort_stats = open_cohort(self.get_results_store(), self.cohort_stats)
+        except sqlite3.Error as e:
+            self.show_popup("Erro no Banco de Resultados",
+                            f"Não foi possível ler as sessões: {str(e)}")
+            return
+        if self.cohort_popup is None:
+            self.cohort_dashboard = CohortDashboard()
+            content = BoxLayout(orientation='vertical', spacing=10)
+            content.add_widget(self.cohort_dashboard)
+            close_btn = Button(text="Fechar", size_hint_y=None, height=50)
+            content.add_widget(close_btn)
+            self.cohort_popup = Popup(title="Coorte", content=content, size_hint=(0.95, 0.95))
+            close_btn.bind(on_press=self.cohort_popup.dismiss)
+        self.cohort_popup.open()
+        self.cohort_dashboard.show(self.cohort_stats)
+    
+    def load_key_codes(self):
+        # Converte os nomes de tecla configurados em códigos do Kivy
+        key_codes = {}
+        for name, zone in load_key_bindings().items():
+            if zone not in ZONES:
+                Logger.warning(f"OpenField: área desconhecida '{zone}' para a tecla '{name}'")
+                continue
+            code = Keyboard.keycodes.get(name.lower())
+            if code is None and len(name) == 1:
+                code = ord(name.lower())
+            if code is None:
+                Logger.warning(f"OpenField: tecla desconhecida '{name}'")
+                continue
+            key_codes[code] = zone
+        return key_codes
+    
+    def on_window_key_down(self, window, key, scancode=None, codepoint=None, modifiers=None):
+        # O instante é capturado antes de qualquer outro processamento
+        t_ns = now_ns()
+        if key == self.overlay_key:
+            self.profiler_overlay.toggle()
+            return True
+        if not self.test_running or any(text_input.focus for text_input in (
+                self.animal_id_input, self.duration_input, self.group_input, self.protocol_input)):
+            return False
+        return self.key_input.key_down(key, t_ns)
+    
+    def on_window_key_up(self, window, key, scancode=None):
+        t_ns = now_ns()
+        if not self.test_running:
+            return False
+        return self.key_input.key_up(key, t_ns)
+    
     def on_corner_press(self, instance):
-        if self.test_running and not self.corner_button_pressed:
-            self.stop_other_buttons('corner')
-            self.corner_button_pressed = True
-            self.corner_press_time = time.time()
-            self.highlight_button(self.corner_btn, True)
+        self.press_zone('corner', self.button_event_ns(instance))
     
     def on_corner_release(self, instance):
-        if self.test_running and self.corner_button_pressed:
-            elapsed = time.time() - self.corner_press_time
-            self.corner_time += elapsed
-            self.corner_button_pressed = False
-            self.corner_press_time = None
-            self.update_area_time_labels()
-            self.highlight_button(self.corner_btn, False)
+        self.release_zone('corner', self.button_event_ns(instance, released=True))
     
     def on_lateral_press(self, instance):
-        if self.test_running and not self.lateral_button_pressed:
-            self.stop_other_buttons('lateral')
-            self.lateral_button_pressed = True
-            self.lateral_press_time = time.time()
-            self.highlight_button(self.lateral_btn, True)
+        self.press_zone('lateral', self.button_event_ns(instance))
     
     def on_lateral_release(self, instance):
-        if self.test_running and self.lateral_button_pressed:
-            elapsed = time.time() - self.lateral_press_time
-            self.lateral_time += elapsed
-            self.lateral_button_pressed = False
-            self.lateral_press_time = None
-            self.update_area_time_labels()
-            self.highlight_button(self.lateral_btn, False)
+        self.release_zone('lateral', self.button_event_ns(instance, released=True))
     
     def on_center_press(self, instance):
-        if self.test_running and not self.center_button_pressed:
-            self.stop_other_buttons('center')
-            self.center_button_pressed = True
-            self.center_press_time = time.time()
-            self.highlight_button(self.center_btn, True)
+        self.press_zone('center', self.button_event_ns(instance))
     
     def on_center_release(self, instance):
-        if self.test_running and self.center_button_pressed:
-            elapsed = time.time() - self.center_press_time
-            self.center_time += elapsed
-            self.center_button_pressed = False
-            self.center_press_time = None
+        self.release_zone('center', self.button_event_ns(instance, released=True))
+    
+    def button_event_ns(self, instance, released=False):
+        # Usa o instante do toque/clique, não o da execução do tratador
+        return touch_event_ns(getattr(instance, 'last_touch', None), released)
+    
+    @profiler.timed('press_zone')
+    def press_zone(self, zone, t_ns=None, source='touch'):
+        # O motor encerra automaticamente a área que estava ativa
+        if t_ns is None:
+            t_ns = now_ns()
+        if self.engine.press(zone, t_ns):
+            self.record_input_latency(t_ns, source)
             self.update_area_time_labels()
-            self.highlight_button(self.center_btn, False)
+            self.sync_zone_buttons()
+    
+    @profiler.timed('release_zone')
+    def release_zone(self, zone, t_ns=None, source='touch'):
+        if t_ns is None:
+            t_ns = now_ns()
+        if self.engine.release(zone, t_ns):
+            self.record_input_latency(t_ns, source)
+            self.update_area_time_labels()
+            self.sync_zone_buttons()
+    
+    def record_input_latency(self, t_ns, source='touch'):
+        # Atraso entre o evento de entrada e o registro no motor: mostra se
+        # travamentos da interface afastam o tratamento do instante marcado
+        latency_ns = now_ns() - t_ns
+        self.input_latency[source].add(latency_ns)
+        profiler.record('entrada->registro' if source == 'touch' else 'tecla (tratador)', latency_ns)
     
-    def stop_other_buttons(self, current_button):
-        if current_button != 'corner' and self.corner_button_pressed:
-            self.on_corner_release(None)
-        if current_button != 'lateral' and self.lateral_button_pressed:
-            self.on_lateral_release(None)
-        if current_button != 'center' and self.center_button_pressed:
-            self.on_center_release(None)
+    def sync_zone_buttons(self, active_zone=None):
+        if active_zone is None:
+            active_zone = self.engine.active_zone
+        for index, zone in enumerate(ZONES):
+            self.highlight_button(self.zone_buttons[zone], index == active_zone)
     
     def highlight_button(self, button, is_pressed):
         if is_pressed:
@@ -364,124 +767,65 @@ class OpenFieldApp(BoxLayout):
             elif button == self.center_btn:
                 button.background_color = (0, 0.6, 0, 1)  # Verde floresta
     
-    def update_area_time_labels(self):
-        self.corner_time_label.text = f"Tempo no Canto: {self.corner_time:.2f} s"
-        self.lateral_time_label.text = f"Tempo na Lateral: {self.lateral_time:.2f} s"
-        self.center_time_label.text = f"Tempo no Centro: {self.center_time:.2f} s"
+    def update_area_time_labels(self, t_ns=None):
+        self.show_area_times(self.engine.zone_seconds(t_ns))
     
+    def show_area_times(self, seconds):
+        corner_time, lateral_time, center_time = seconds
+        self.corner_time_label.text = f"Tempo no Canto: {corner_time:.2f} s"
+        self.lateral_time_label.text = f"Tempo na Lateral: {lateral_time:.2f} s"
+        self.center_time_label.text = f"Tempo no Centro: {center_time:.2f} s"
+    
+    @profiler.timed('generate_report')
     def generate_report(self, instance):
-        if not self.start_time:
+        if not self.engine.started:
             self.show_popup("Aviso", "Inicie um teste primeiro para gerar o relatório.")
             return
         
-        # Calcula a duração efetiva do teste
-        if self.test_running:
-            effective_duration = time.time() - self.start_time
-        else:
-            effective_duration = self.test_duration - self.remaining_time
-        
-        if effective_duration <= 0:
-            effective_duration = 0.001
-        
-        # Calcula as porcentagens
-        corner_percent = (self.corner_time / effective_duration) * 100
-        lateral_percent = (self.lateral_time / effective_duration) * 100
-        center_percent = (self.center_time / effective_duration) * 100
-        
-        # Formata o relatório
-        report = f"--- Relatório do Teste Open Field ---\n\n"
-        report += f"ID do Animal: {self.animal_id}\n"
-        report += f"Data/Hora: {time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-        report += f"Duração Programada do Teste: {self.test_duration} segundos\n"
-        report += f"Duração Efetiva do Teste: {effective_duration:.2f} segundos\n\n"
-        report += f"Tempo Acumulado nas Áreas:\n"
-        report += f"  Canto: {self.corner_time:.2f} segundos ({corner_percent:.2f}%)\n"
-        report += f"  Lateral: {self.lateral_time:.2f} segundos ({lateral_percent:.2f}%)\n"
-        report += f"  Centro: {self.center_time:.2f} segundos ({center_percent:.2f}%)\n\n"
+        # Calcula a duração efetiva e as porcentagens a partir do motor
+        t_ns = self.engine.clock() if self.engine.running else None
+        summary = self.engine.summary(t_ns)
         
-        self.report_text.text = report
+        # Latência, entradas, transições e ocupação por minuto
+        metrics = metrics_from_events(self.engine.events, self.engine.elapsed_ns(t_ns))
+        started_at = self.session_header.get('started_at')
+        report = format_report(summary, started_at) + format_metrics(metrics)
         
         # Armazena os dados para o gráfico
-        self.test_data = {
-            "ID do Animal": self.animal_id,
-            "Data/Hora": time.strftime("%Y-%m-%d %H:%M:%S"),
-            "Duração Programada (s)": self.test_duration,
-            "Duração Efetiva (s)": effective_duration,
-            "Tempo no Canto (s)": self.corner_time,
-            "Porcentagem no Canto (%)": corner_percent,
-            "Tempo na Lateral (s)": self.lateral_time,
-            "Porcentagem na Lateral (%)": lateral_percent,
-            "Tempo no Centro (s)": self.center_time,
-            "Porcentagem no Centro (%)": center_percent,
-        }
+        self.test_data = report_row(summary, started_at)
+        self.test_data.update(metrics_row(metrics))
+        
+        # Distância e velocidade, quando a posição foi traçada na arena
+        if self.arena_trace.buffer.total_samples:
+            trajectory = trajectory_metrics(self.arena_trace.buffer, summary['effective_duration'])
+            report += format_trajectory(trajectory)
+            self.test_data.update(trajectory_row(trajectory))
+        self.report_text.text = report
         
         # Gera o gráfico
         self.show_pie_chart()
     
-    def show_pie_chart(self):
-        # Limpa o container do gráfico
-        self.chart_container.clear_widgets()
-        
-        labels = ['Canto', 'Lateral', 'Centro']
-        sizes = [self.corner_time, self.lateral_time, self.center_time]
-        colors = ['red', 'skyblue', 'forestgreen']
-        
-        # Remove áreas com tempo zero
-        filtered_labels = []
-        filtered_sizes = []
-        filtered_colors = []
-        
-        for i, size in enumerate(sizes):
-            if size > 0:
-                filtered_sizes.append(size)
-                filtered_labels.append(labels[i])
-                filtered_colors.append(colors[i])
-        
-        if not filtered_sizes:
-            no_data_label = Label(text="Nenhum tempo registrado para exibir o gráfico.")
-            self.chart_container.add_widget(no_data_label)
-            return
-        
-        # Cria o gráfico
-        fig = plt.figure(figsize=(6, 4))
-        ax = fig.add_subplot(111)
-        
-        wedges, texts, autotexts = ax.pie(
-            filtered_sizes, 
-            labels=filtered_labels, 
-            colors=filtered_colors,
-            autopct='%1.1f%%', 
-            startangle=90, 
-            pctdistance=0.85
-        )
-        
-        # Ajusta o texto
-        for autotext in autotexts:
-            autotext.set_color('black')
-            autotext.set_fontsize(10)
-        for text in texts:
-            text.set_fontsize(10)
-        
-        ax.axis('equal')
-        ax.set_title("Distribuição de Tempo por Área")
-        
-        # Adiciona o gráfico ao container
-        canvas = FigureCanvasKivyAgg(fig)
-        self.chart_container.add_widget(canvas)
-        
-        plt.close(fig)  # Fecha a figura para liberar memória
+    @profiler.timed('show_pie_chart')
+    def show_pie_chart(self, t_ns=None):
+        # Atualiza o gráfico existente; só redesenha se os tempos mudaram
+        self.chart_container.show(self.engine.zone_seconds(t_ns))
     
     def export_report(self, instance):
-        if not self.test_data:
-            self.show_popup("Nenhum Dado", "Nenhum relatório foi gerado para exportar.")
-            return
-        
-        # Cria um popup para escolher o local do arquivo
+        # Cria um popup para escolher o local e o formato do arquivo
         content = BoxLayout(orientation='vertical', spacing=10)
         
-        # Input para o nome do arquivo
+        def default_filename(fmt):
+            return f"relatorio_{self.animal_id}_{time.strftime('%Y%m%d_%H%M%S')}{EXPORT_FORMATS[fmt]}"
+        
+        # Formato e nome do arquivo
+        format_layout = BoxLayout(orientation='horizontal', spacing=10, size_hint_y=None, height=40)
+        format_layout.add_widget(Label(text="Formato:", size_hint_x=0.3))
+        format_spinner = Spinner(text='TXT', values=list(EXPORT_FORMATS), size_hint_x=0.7)
+        format_layout.add_widget(format_spinner)
+        content.add_widget(format_layout)
+        
         filename_input = TextInput(
-            text=f"relatorio_{self.animal_id}_{time.strftime('%Y%m%d_%H%M%S')}.txt",
+            text=default_filename('TXT'),
             multiline=False,
             size_hint_y=None,
             height=40
@@ -489,37 +833,70 @@ class OpenFieldApp(BoxLayout):
         content.add_widget(Label(text="Nome do arquivo:", size_hint_y=None, height=30))
         content.add_widget(filename_input)
         
+        def on_format(spinner, fmt):
+            stem = os.path.splitext(filename_input.text.strip())[0]
+            filename_input.text = stem + EXPORT_FORMATS[fmt] if stem else default_filename(fmt)
+        format_spinner.bind(text=on_format)
+        
         # Botões
         buttons_layout = BoxLayout(orientation='horizontal', spacing=10, size_hint_y=None, height=50)
         
         save_btn = Button(text="Salvar")
+        save_all_btn = Button(text="Exportar Todas as Sessões")
         cancel_btn = Button(text="Cancelar")
         
         buttons_layout.add_widget(save_btn)
+        buttons_layout.add_widget(save_all_btn)
         buttons_layout.add_widget(cancel_btn)
         content.add_widget(buttons_layout)
         
-        popup = Popup(title="Exportar Relatório", content=content, size_hint=(0.8, 0.4))
+        popup = Popup(title="Exportar Relatório", content=content, size_hint=(0.8, 0.5))
         
         def save_file(instance):
-            try:
-                filename = filename_input.text.strip()
-                if not filename:
-                    filename = f"relatorio_{self.animal_id}_{time.strftime('%Y%m%d_%H%M%S')}.txt"
-                
-                with open(filename, 'w', encoding='utf-8') as file:
-                    file.write(self.report_text.text)
-                
-                popup.dismiss()
-                self.show_popup("Exportação Concluída", f"Relatório exportado com sucesso para: {filename}")
-            except Exception as e:
-                self.show_popup("Erro na Exportação", f"Ocorreu um erro ao exportar o relatório: {str(e)}")
+            if not self.test_data:
+                self.show_popup("Nenhum Dado", "Nenhum relatório foi gerado para exportar.")
+                return
+            fmt = format_spinner.text
+            filename = filename_input.text.strip() or default_filename(fmt)
+            # Data, grupo e protocolo permitem parear a exportação (reliability.py)
+            header = {'animal_id': self.animal_id, 'duration': self.test_duration, 'zones': list(ZONES),
+                      **{key: self.session_header[key] for key in ('started_at', 'group', 'protocol')
+                         if key in self.session_header}}
+            
+            # A gravação ocorre em segundo plano; a conclusão volta pelo Clock
+            self.export_worker.submit(
+                export_session, filename, fmt, self.report_text.text, dict(self.test_data),
+                list(self.engine.events), header,
+                on_done=lambda path: self.show_popup(
+                    "Exportação Concluída", f"Relatório exportado com sucesso para: {path}"),
+                on_error=lambda e: self.show_popup(
+                    "Erro na Exportação", f"Ocorreu um erro ao exportar o relatório: {str(e)}"))
+            popup.dismiss()
+        
+        def save_all(instance):
+            fmt = format_spinner.text if format_spinner.text in ('CSV', 'JSONL') else 'CSV'
+            filename = f"todas_sessoes_{time.strftime('%Y%m%d_%H%M%S')}{EXPORT_FORMATS[fmt]}"
+            self.export_worker.submit(
+                export_all_sessions, filename, fmt, self.get_results_store().path,
+                on_done=lambda count: self.show_popup(
+                    "Exportação Concluída", f"{count} sessão(ões) exportada(s) para: {filename}"),
+                on_error=lambda e: self.show_popup(
+                    "Erro na Exportação", f"Ocorreu um erro ao exportar as sessões: {str(e)}"))
+            popup.dismiss()
         
         save_btn.bind(on_press=save_file)
+        save_all_btn.bind(on_press=save_all)
         cancel_btn.bind(on_press=popup.dismiss)
         
         popup.open()
     
+    def show_input_latency(self, instance):
+        self.show_popup("Latência Entrada -> Registro",
+                        "Toque/clique (instante do evento -> registro):\n"
+                        + self.input_latency['touch'].report()
+                        + "\n\nTeclado/pedal (apenas o tratador; o instante é tomado na sua entrada):\n"
+                        + self.input_latency['key'].report())
+    
     def show_popup(self, title, message):
         content = BoxLayout(orientation='vertical', spacing=10)
         content.add_widget(Label(text=message))
@@ -534,7 +911,33 @@ class OpenFieldApp(BoxLayout):
 
 class OpenFieldTestApp(App):
     def build(self):
-        return OpenFieldApp()
+        startup.mark('build')
+        if ARENA_COUNT > 1:
+            from multi_arena import MultiArenaApp
+            root = MultiArenaApp(ARENA_COUNT)
+        else:
+            root = OpenFieldApp()
+        Window.bind(on_flip=self.on_first_frame)
+        Clock.schedule_once(root.recover_sessions, 0)
+        return root
+    
+    def on_stop(self):
+        # Última tentativa de entregar ao agregador o que ainda está na fila
+        if self.root.station_client is not None:
+            self.root.station_client.close()
+    
+    def on_first_frame(self, window):
+        Window.unbind(on_flip=self.on_first_frame)
+        startup.mark('primeiro quadro')
+        
+        # O gráfico só aparece após um teste; carrega matplotlib em segundo plano
+        warm_up_chart()
+        
+        for line in startup.report().splitlines():
+            Logger.info(f"Startup: {line}")
+        report_path = os.environ.get('OPENFIELD_STARTUP_REPORT')
+        if report_path:
+            startup.save(report_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,181 @@
+import functools
+import json
+import time
+
+# Instrumentação dos caminhos críticos da interface (timer, relatório,
+# gráfico e marcação das áreas). Cada chamada é medida com perf_counter_ns
+# e contada em um histograma de buckets logarítmicos de tamanho fixo, de
+# modo que registrar custa poucas operações inteiras e não aloca memória.
+# Os percentis são aproximados pela resolução dos buckets (~19%).
+
+now_ns = time.perf_counter_ns
+
+# Subdivisões de cada potência de 2 (2 bits -> 4 buckets por oitava)
+SUB_BITS = 2
+SUB_BUCKETS = 1 << SUB_BITS
+BUCKET_COUNT = 64 * SUB_BUCKETS
+
+
+def bucket_index(value):
+    bits = value.bit_length()
+    if bits <= SUB_BITS + 1:
+        return value
+    return (bits - SUB_BITS) * SUB_BUCKETS + ((value >> (bits - SUB_BITS - 1)) & (SUB_BUCKETS - 1))
+
+
+def bucket_upper(index):
+    # Maior valor que cai no bucket (usado como estimativa do percentil)
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((SUB_BUCKETS + index % SUB_BUCKETS + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    __slots__ = ('counts', 'count', 'total_ns', 'max_ns')
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.clear()
+
+    def clear(self):
+        for index in range(BUCKET_COUNT):
+            self.counts[index] = 0
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, value_ns):
+        if value_ns < 0:
+            value_ns = 0
+        self.counts[bucket_index(value_ns)] += 1
+        self.count += 1
+        self.total_ns += value_ns
+        if value_ns > self.max_ns:
+            self.max_ns = value_ns
+
+    def percentile(self, q):
+        if not self.count:
+            return 0
+        target = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= target:
+                return min(bucket_upper(index), self.max_ns)
+        return self.max_ns
+
+    def mean_ns(self):
+        return self.total_ns / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': self.mean_ns() / 1e6,
+            'p50_ms': self.percentile(50) / 1e6,
+            'p99_ms': self.percentile(99) / 1e6,
+            'max_ms': self.max_ns / 1e6,
+        }
+
+
+class FrameStats:
+    """Intervalos entre quadros e quadros perdidos.
+
+    Um intervalo maior que 1,5 x o orçamento do quadro conta como quadros
+    perdidos (quantos quadros inteiros deixaram de ser desenhados).
+    """
+
+    def __init__(self, budget_s=1 / 60):
+        self.budget_ns = int(budget_s * 1e9)
+        self.intervals = LatencyHistogram()
+        self.clear()
+
+    def clear(self):
+        self.intervals.clear()
+        self.last_ns = None
+        self.frames = 0
+        self.dropped = 0
+
+    def frame(self, t_ns=None):
+        if t_ns is None:
+            t_ns = now_ns()
+        if self.last_ns is not None:
+            interval = t_ns - self.last_ns
+            self.intervals.add(interval)
+            if interval * 2 > self.budget_ns * 3:
+                self.dropped += round(interval / self.budget_ns) - 1
+        self.last_ns = t_ns
+        self.frames += 1
+
+    def pause(self):
+        # O próximo quadro não é comparado com o último (ex.: monitor parado)
+        self.last_ns = None
+
+    def as_dict(self):
+        stats = self.intervals.as_dict()
+        stats.update({'frames': self.frames, 'dropped': self.dropped,
+                      'budget_ms': self.budget_ns / 1e6})
+        return stats
+
+
+class Profiler:
+    def __init__(self):
+        self.histograms = {}
+        self.frames = FrameStats()
+
+    def histogram(self, name):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def record(self, name, value_ns):
+        self.histogram(name).add(value_ns)
+
+    def timed(self, name=None):
+        # Decorador: mede o tempo de cada chamada da função
+        def decorate(function):
+            histogram = self.histogram(name or function.__name__)
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                started = now_ns()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.add(now_ns() - started)
+            return wrapper
+        return decorate
+
+    def clear(self):
+        for histogram in self.histograms.values():
+            histogram.clear()
+        self.frames.clear()
+
+    def as_dict(self):
+        return {
+            'calls': {name: histogram.as_dict()
+                      for name, histogram in self.histograms.items() if histogram.count},
+            'frames': self.frames.as_dict(),
+        }
+
+    def report(self):
+        lines = [f"{'Chamada':<24}{'n':>7}{'p50 (ms)':>10}{'p99 (ms)':>10}{'máx (ms)':>10}"]
+        for name, stats in self.as_dict()['calls'].items():
+            lines.append(f"{name:<24}{stats['count']:>7}{stats['p50_ms']:>10.2f}"
+                         f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}")
+        frames = self.frames.as_dict()
+        lines.append(f"Quadros: {frames['frames']} (p99 {frames['p99_ms']:.1f} ms), "
+                     f"perdidos: {frames['dropped']}")
+        return "\n".join(lines)
+
+    def save(self, path, **extra):
+        data = dict(extra)
+        data.update(self.as_dict())
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, indent=2, ensure_ascii=False)
+        return path
+
+
+# Instância única usada pela interface
+profiler = Profiler()
@@ -0,0 +1,76 @@
+from kivy.clock import Clock
+from kivy.core.window import Window
+from kivy.graphics import Color, Rectangle
+from kivy.uix.label import Label
+
+from profiler import profiler
+
+# Painel sobreposto com os percentis das chamadas instrumentadas e os
+# quadros perdidos (F12 na janela principal). O monitor de quadros só roda
+# durante o teste ou com o painel visível.
+
+REFRESH_INTERVAL = 0.5
+
+
+class FrameMonitor:
+    def __init__(self, stats=None):
+        self.stats = stats or profiler.frames
+        self.event = None
+        self.users = set()
+
+    def start(self, user):
+        self.users.add(user)
+        if self.event is None:
+            self.stats.pause()
+            self.event = Clock.schedule_interval(self.on_frame, 0)
+
+    def stop(self, user):
+        self.users.discard(user)
+        if not self.users and self.event is not None:
+            self.event.cancel()
+            self.event = None
+
+    def on_frame(self, dt):
+        self.stats.frame()
+
+
+frame_monitor = FrameMonitor()
+
+
+class ProfilerOverlay(Label):
+    def __init__(self, **kwargs):
+        kwargs.setdefault('font_name', 'RobotoMono-Regular')
+        kwargs.setdefault('font_size', 13)
+        super().__init__(halign='left', valign='top', size_hint=(None, None), **kwargs)
+        self.refresh_event = None
+        with self.canvas.before:
+            Color(0, 0, 0, 0.75)
+            self.background = Rectangle()
+        self.bind(texture_size=self.on_texture_size, pos=self.update_background)
+
+    @property
+    def visible(self):
+        return self.parent is not None
+
+    def on_texture_size(self, instance, size):
+        self.size = (size[0] + 16, size[1] + 16)
+        self.pos = (Window.width - self.width - 10, Window.height - self.height - 10)
+        self.update_background()
+
+    def update_background(self, *args):
+        self.background.pos = self.pos
+        self.background.size = self.size
+
+    def refresh(self, dt=None):
+        self.text = profiler.report()
+
+    def toggle(self):
+        if self.visible:
+            self.refresh_event.cancel()
+            Window.remove_widget(self)
+            frame_monitor.stop(self)
+        else:
+            frame_monitor.start(self)
+            self.refresh()
+            Window.add_widget(self)
+            self.refresh_event = Clock.schedule_interval(self.refresh, REFRESH_INTERVAL)
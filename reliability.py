@@ -0,0 +1,321 @@
+import argparse
+import csv
+import glob
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from exporter import read_events_columnar, write_csv
+from journal import JOURNAL_EXT
+from metrics import load_journal_arrays, visit_intervals
+from session_engine import NS_PER_S, ZONES, ZONE_LABELS, EVENT_STOP
+
+# Concordância entre observadores: duas gravações da mesma sessão (diários
+# .ofj ou exportações .ofc) são amostradas em uma linha do tempo comum com
+# a resolução escolhida. Em cada amostra o estado é a área marcada ou
+# "Nenhuma". A partir das amostras calculam-se a concordância por intervalo,
+# o kappa de Cohen e matrizes de confusão (geral e por área), apenas com
+# operações vetorizadas. Coortes inteiras de pares são processadas em
+# paralelo.
+#
+# Uso:
+#   python reliability.py observador_a.ofj observador_b.ofj
+#   python reliability.py --dirs sessoes_ana/ sessoes_bruno/ -o concordancia.csv
+#   python reliability.py --pairs pares.csv --resolution 0.5
+
+# Resolução padrão da linha do tempo comum, em segundos
+DEFAULT_RESOLUTION = 0.1
+
+# Janela da concordância por intervalo, em segundos
+WINDOW_SECONDS = 60
+
+NO_ZONE_LABEL = "Nenhuma"
+
+# Erros de uma gravação truncada ou malformada, relatados por arquivo
+READ_ERRORS = (OSError, ValueError, KeyError, IndexError, TypeError, struct.error)
+
+
+def load_recording(path):
+    # Cabeçalho e vetores (t_ns, zona, tipo) de um diário ou exportação colunar
+    if path.endswith('.ofc'):
+        header, t_ns, zones, kinds = read_events_columnar(path)
+        return (header, np.asarray(t_ns, dtype=np.int64),
+                np.frombuffer(zones, dtype=np.uint8).astype(np.int64),
+                np.frombuffer(kinds, dtype=np.uint8).astype(np.int64))
+    return load_journal_arrays(path)
+
+
+def end_time(t_ns, kind):
+    stops = t_ns[kind == EVENT_STOP]
+    if len(stops):
+        return int(stops[0])
+    return int(t_ns[-1]) if len(t_ns) else 0
+
+
+def state_series(t_ns, zone, kind, times, n_zones):
+    # Área marcada em cada instante de times; n_zones quando nenhuma
+    starts, ends, visit_zones = visit_intervals(t_ns, zone, kind, end_time(t_ns, kind))
+    index = np.searchsorted(starts, times, side='right') - 1
+    states = np.full(len(times), n_zones, dtype=np.int64)
+    inside = index >= 0
+    inside[inside] = times[inside] < ends[index[inside]]
+    states[inside] = visit_zones[index[inside]]
+    return states
+
+
+def confusion_matrix(a, b, n_categories):
+    # Linha: observador A, coluna: observador B
+    pairs = a * n_categories + b
+    return np.bincount(pairs, minlength=n_categories * n_categories).reshape(n_categories, n_categories)
+
+
+def cohen_kappa(matrix):
+    total = matrix.sum()
+    if total == 0:
+        return float('nan')
+    observed = np.trace(matrix) / total
+    expected = (matrix.sum(axis=1) * matrix.sum(axis=0)).sum() / total ** 2
+    if expected == 1:
+        return 1.0 if observed == 1 else float('nan')
+    return float((observed - expected) / (1 - expected))
+
+
+def zone_matrices(matrix, n_zones):
+    # Matriz 2x2 por área (área / outra), derivada da matriz geral
+    total = matrix.sum()
+    both = np.diag(matrix)[:n_zones]
+    only_a = matrix.sum(axis=1)[:n_zones] - both
+    only_b = matrix.sum(axis=0)[:n_zones] - both
+    neither = total - both - only_a - only_b
+    return np.stack([np.stack([both, only_a], axis=1),
+                     np.stack([only_b, neither], axis=1)], axis=1)
+
+
+def window_agreement(a, b, samples_per_window):
+    # Fração de amostras concordantes em cada janela (a última pode ser menor)
+    equal = (a == b).astype(np.float64)
+    n_windows = max(1, -(-len(equal) // samples_per_window))
+    edges = np.arange(0, n_windows * samples_per_window, samples_per_window)
+    sums = np.add.reduceat(equal, edges) if len(equal) else np.zeros(1)
+    counts = np.diff(np.append(edges, len(equal)))
+    return sums / np.maximum(counts, 1)
+
+
+def compare_recordings(recording_a, recording_b, resolution=DEFAULT_RESOLUTION,
+                       window_seconds=WINDOW_SECONDS):
+    header_a, t_a, zone_a, kind_a = recording_a
+    header_b, t_b, zone_b, kind_b = recording_b
+    zones = tuple(header_a.get('zones', ZONES))
+    if tuple(header_b.get('zones', ZONES)) != zones:
+        raise ValueError("As gravações usam áreas diferentes")
+    n_zones = len(zones)
+
+    # Linha do tempo comum: centros dos intervalos até o fim da gravação mais curta
+    step_ns = int(resolution * NS_PER_S)
+    if step_ns <= 0:
+        raise ValueError("A resolução deve ser positiva")
+    end_ns = min(end_time(t_a, kind_a), end_time(t_b, kind_b))
+    times = np.arange(step_ns // 2, end_ns, step_ns, dtype=np.int64)
+
+    a = state_series(t_a, zone_a, kind_a, times, n_zones)
+    b = state_series(t_b, zone_b, kind_b, times, n_zones)
+    matrix = confusion_matrix(a, b, n_zones + 1)
+    per_zone = zone_matrices(matrix, n_zones)
+
+    return {
+        'animal_a': header_a.get('animal_id', ''),
+        'animal_b': header_b.get('animal_id', ''),
+        'zones': zones,
+        'resolution_s': resolution,
+        'duration_s': end_ns / NS_PER_S,
+        'samples': len(times),
+        'agreement': float((a == b).mean()) if len(times) else float('nan'),
+        'kappa': cohen_kappa(matrix),
+        'confusion': matrix,
+        'zone_matrices': per_zone,
+        'zone_kappa': [cohen_kappa(zone_matrix) for zone_matrix in per_zone],
+        'window_seconds': window_seconds,
+        'window_agreement': window_agreement(a, b, max(1, int(round(window_seconds / resolution)))),
+    }
+
+
+def compare_sessions(path_a, path_b, resolution=DEFAULT_RESOLUTION, window_seconds=WINDOW_SECONDS):
+    return compare_recordings(load_recording(path_a), load_recording(path_b),
+                              resolution, window_seconds)
+
+
+def format_reliability(result):
+    labels = [ZONE_LABELS.get(zone, zone) for zone in result['zones']] + [NO_ZONE_LABEL]
+    width = max(9, max(len(label) for label in labels) + 1)
+
+    report = "--- Concordância entre Observadores ---\n"
+    report += f"Animal: {result['animal_a']} / {result['animal_b']}\n"
+    report += (f"Duração comparada: {result['duration_s']:.2f} s "
+               f"({result['samples']} amostras de {result['resolution_s']:g} s)\n")
+    report += f"Concordância: {result['agreement'] * 100:.2f}%\n"
+    report += f"Kappa de Cohen: {result['kappa']:.3f}\n\n"
+
+    report += "Matriz de Confusão (amostras; linha: observador A, coluna: observador B):\n"
+    report += " " * (width + 2) + "".join(label.rjust(width) for label in labels) + "\n"
+    for label, row in zip(labels, result['confusion']):
+        report += "  " + label.ljust(width) + "".join(str(count).rjust(width) for count in row) + "\n"
+    report += "\n"
+
+    report += "Por Área (ambos / só A / só B / nenhum; kappa):\n"
+    for label, matrix, kappa in zip(labels, result['zone_matrices'], result['zone_kappa']):
+        (both, only_a), (only_b, neither) = matrix
+        report += f"  {label.ljust(width)}{both} / {only_a} / {only_b} / {neither}; {kappa:.3f}\n"
+    report += "\n"
+
+    report += f"Concordância por Intervalo de {result['window_seconds']:g} s:\n"
+    for number, value in enumerate(result['window_agreement'], start=1):
+        report += f"  {str(number).ljust(width)}{value * 100:.1f}%\n"
+    return report
+
+
+def reliability_row(result):
+    labels = [ZONE_LABELS.get(zone, zone) for zone in result['zones']]
+    row = {
+        "ID do Animal (A)": result['animal_a'],
+        "ID do Animal (B)": result['animal_b'],
+        "Duração Comparada (s)": result['duration_s'],
+        "Resolução (s)": result['resolution_s'],
+        "Concordância (%)": result['agreement'] * 100,
+        "Kappa": result['kappa'],
+    }
+    for label, kappa in zip(labels, result['zone_kappa']):
+        row[f"Kappa {label}"] = kappa
+    row["Concordância Mínima por Intervalo (%)"] = float(result['window_agreement'].min()) * 100
+    return row
+
+
+def _session_key(path):
+    # Animal e data da sessão, usados para parear diretórios de observadores
+    header = load_recording(path)[0]
+    if not isinstance(header, dict):
+        raise ValueError(f"Cabeçalho inválido: {path}")
+    return str(header.get('animal_id', '')), str(header.get('started_at', ''))[:10]
+
+
+def pair_directories(dir_a, dir_b):
+    # Pareia as gravações de dois diretórios pelo animal e pela data. Chaves
+    # repetidas ou sem par e gravações ilegíveis são devolvidas como erros.
+    errors = []
+
+    def index(directory):
+        paths = []
+        for extension in (JOURNAL_EXT, '.ofc'):
+            paths += glob.glob(os.path.join(directory, '**', '*' + extension), recursive=True)
+        keys = {}
+        for path in sorted(paths):
+            try:
+                key = _session_key(path)
+            except READ_ERRORS as e:
+                errors.append((path, str(e)))
+                continue
+            keys.setdefault(key, []).append(path)
+        return keys
+
+    keys_a = index(dir_a)
+    keys_b = index(dir_b)
+    pairs = []
+    for key in sorted(set(keys_a) | set(keys_b)):
+        paths_a = keys_a.get(key, [])
+        paths_b = keys_b.get(key, [])
+        if len(paths_a) == 1 and len(paths_b) == 1:
+            pairs.append((paths_a[0], paths_b[0]))
+        else:
+            errors.append((f"{key[0]} {key[1]}",
+                           f"{len(paths_a)} gravação(ões) em {dir_a}, {len(paths_b)} em {dir_b}"))
+    return pairs, sorted(errors)
+
+
+def read_pairs(path):
+    # CSV com duas colunas: gravação do observador A e do observador B
+    with open(path, encoding='utf-8', newline='') as file:
+        return [(row[0], row[1]) for row in csv.reader(file) if len(row) >= 2 and row[0].strip()]
+
+
+def compare_pair(pair, resolution=DEFAULT_RESOLUTION, window_seconds=WINDOW_SECONDS):
+    # Executado nos processos de trabalho: devolve (par, resultado, erro)
+    try:
+        return pair, compare_sessions(pair[0], pair[1], resolution, window_seconds), None
+    except READ_ERRORS as e:
+        return pair, None, str(e)
+
+
+def compare_pairs(pairs, resolution=DEFAULT_RESOLUTION, window_seconds=WINDOW_SECONDS, workers=None):
+    if not pairs:
+        return
+    workers = workers or os.cpu_count() or 1
+    resolutions = [resolution] * len(pairs)
+    windows = [window_seconds] * len(pairs)
+    if workers == 1:
+        yield from map(compare_pair, pairs, resolutions, windows)
+        return
+    chunksize = max(1, len(pairs) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(compare_pair, pairs, resolutions, windows, chunksize=chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concordância entre observadores do Open Field")
+    parser.add_argument('recordings', nargs='*', help="Duas gravações da mesma sessão (.ofj ou .ofc)")
+    parser.add_argument('--dirs', nargs=2, metavar=('DIR_A', 'DIR_B'),
+                        help="Diretórios dos dois observadores (pareados por animal e data)")
+    parser.add_argument('--pairs', help="CSV com os pares de gravações (observador A, observador B)")
+    parser.add_argument('-r', '--resolution', type=float, default=DEFAULT_RESOLUTION,
+                        help=f"Resolução da linha do tempo em segundos (padrão: {DEFAULT_RESOLUTION})")
+    parser.add_argument('--window', type=float, default=WINDOW_SECONDS,
+                        help=f"Janela da concordância por intervalo em segundos (padrão: {WINDOW_SECONDS})")
+    parser.add_argument('-o', '--output', help="Arquivo CSV com uma linha por par")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Número de processos (padrão: número de CPUs)")
+    args = parser.parse_args(argv)
+
+    errors = []
+    if args.dirs:
+        pairs, errors = pair_directories(*args.dirs)
+    elif args.pairs:
+        pairs = read_pairs(args.pairs)
+    elif len(args.recordings) == 2:
+        pairs = [tuple(args.recordings)]
+    else:
+        parser.error("informe duas gravações, --dirs ou --pairs")
+
+    started = time.perf_counter()
+    results = []
+    rows = []
+    for (path_a, path_b), result, error in compare_pairs(pairs, args.resolution, args.window,
+                                                         args.workers):
+        if error is not None:
+            errors.append((f"{path_a} x {path_b}", error))
+            continue
+        results.append(result)
+        rows.append({'Arquivo A': path_a, 'Arquivo B': path_b, **reliability_row(result)})
+    elapsed = time.perf_counter() - started
+
+    if len(pairs) == 1 and results and not args.output:
+        print(format_reliability(results[0]), end='')
+    elif args.output:
+        write_csv(args.output, rows)
+    elif rows:
+        writer = csv.DictWriter(sys.stdout, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+    for name, error in errors:
+        print(f"Erro em {name}: {error}", file=sys.stderr)
+    if results:
+        kappas = np.array([result['kappa'] for result in results])
+        print(f"{len(results)} par(es) comparado(s) em {elapsed:.2f} s; kappa médio "
+              f"{np.nanmean(kappas):.3f} (mín. {np.nanmin(kappas):.3f})", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
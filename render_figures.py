@@ -0,0 +1,300 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+from batch_analysis import collect_paths
+from cohort import NO_GROUP
+from journal import JOURNAL_DIR, read_journal
+from metrics import format_metrics, metrics_from_events
+from results_store import ResultsStore, row_to_summary
+from session_engine import NS_PER_S, ZONES, format_report, summarize_events
+from zone_chart import ZonePie
+
+# Geração, sem interface gráfica, das figuras das sessões para publicações e
+# cadernos de laboratório: o gráfico de pizza de cada sessão (PNG, SVG e/ou
+# PDF, com as mesmas cores e rótulos do aplicativo) e um PDF de várias
+# páginas por grupo, com o gráfico e o relatório de cada sessão. O trabalho é
+# distribuído entre processos; cada processo cria suas figuras (Agg) uma
+# única vez e só atualiza as fatias e os textos entre uma sessão e outra.
+#
+# Um manifesto no diretório de saída guarda a impressão digital dos dados de
+# cada figura (data de modificação e tamanho do diário, ou os valores da
+# sessão no banco); figuras cujos dados não mudaram não são geradas de novo.
+#
+# Uso:
+#   python render_figures.py sessoes/ -o figuras/ --formats png,svg
+#   python render_figures.py --db openfield.db --group controle -o figuras/ --formats pdf
+
+FORMATS = ('png', 'svg', 'pdf')
+MANIFEST_NAME = 'manifesto_figuras.json'
+COHORT_PREFIX = 'coorte_'
+
+# Mude ao alterar a aparência das figuras, para que todas sejam refeitas
+RENDER_VERSION = 1
+
+PNG_DPI = 150
+
+# Erros de uma sessão ilegível (diário truncado ou malformado, banco
+# corrompido): a sessão entra na lista de erros e as demais continuam
+LOAD_ERRORS = (OSError, ValueError, KeyError, IndexError, TypeError, struct.error, sqlite3.Error)
+PAGE_SIZE = (8.27, 11.69)  # A4, em polegadas
+
+
+def safe_name(text):
+    return re.sub(r'[^\w.-]+', '_', text).strip('_') or 'sessao'
+
+
+def fingerprint(*values):
+    data = json.dumps([RENDER_VERSION, *values], ensure_ascii=False, default=str)
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def journal_sources(paths):
+    # (fonte, nome de saída, impressão digital) de cada diário
+    for path in paths:
+        stat = os.stat(path)
+        yield ('journal', path), safe_name(os.path.splitext(os.path.basename(path))[0]), \
+            (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def store_sources(db_path, **filters):
+    with ResultsStore(db_path) as store:
+        for row in store.query_sessions(**filters):
+            name = safe_name(f"{row['animal_id']}_{row['started_at']}_{row['id']}")
+            yield ('db', db_path, row['id']), name, tuple(row)
+
+
+# Executado nos processos de trabalho
+
+_stores = {}
+_figures = {}
+
+
+def load_session(source):
+    # (resumo, eventos, data, grupo) de um diário ou de uma sessão do banco
+    if source[0] == 'journal':
+        header, events = read_journal(source[1])
+        zones = header.get('zones', ZONES)
+        summary = summarize_events(header['animal_id'], header['duration'], events, zones)
+        return summary, events, header.get('started_at', ''), header.get('group', '')
+    _, db_path, session_id = source
+    store = _stores.get(db_path)
+    if store is None:
+        store = _stores[db_path] = ResultsStore(db_path)
+    row = store.session(session_id)
+    if row is None:
+        raise ValueError(f"sessão {session_id} não encontrada no banco")
+    return row_to_summary(row), store.session_events(session_id), row['started_at'], row['group_name']
+
+
+def session_report(summary, events, started_at):
+    report = format_report(summary, started_at)
+    if events:
+        report += format_metrics(metrics_from_events(events, int(summary['effective_duration'] * NS_PER_S)))
+    return report
+
+
+def chart_figure():
+    # Figura do gráfico avulso, criada uma vez por processo
+    if 'chart' not in _figures:
+        pie = ZonePie()
+        FigureCanvasAgg(pie.figure)
+        _figures['chart'] = pie, pie.figure.suptitle('', fontsize=9)
+    return _figures['chart']
+
+
+def page_figure():
+    # Página A4 do PDF da coorte: gráfico em cima, relatório embaixo
+    if 'page' not in _figures:
+        figure = Figure(figsize=PAGE_SIZE)
+        FigureCanvasAgg(figure)
+        pie = ZonePie(ax=figure.add_axes([0.1, 0.52, 0.8, 0.4]))
+        title = figure.suptitle('', fontsize=12)
+        text = figure.text(0.08, 0.48, '', family='monospace', fontsize=8, va='top')
+        _figures['page'] = pie, title, text
+    return _figures['page']
+
+
+def render_session(task):
+    # Devolve (nome, {grupo, animal, data}, erro)
+    source, name, out_dir, formats = task
+    try:
+        summary, events, started_at, group = load_session(source)
+        pie, suptitle = chart_figure()
+        pie.update(summary['zone_seconds'])
+        suptitle.set_text(f"{summary['animal_id']} - {started_at}")
+        for fmt in formats:
+            pie.figure.savefig(os.path.join(out_dir, f"{name}.{fmt}"), format=fmt, dpi=PNG_DPI)
+        return name, {'group': group or NO_GROUP, 'animal_id': summary['animal_id'],
+                      'started_at': started_at}, None
+    except LOAD_ERRORS as e:
+        return name, None, str(e)
+
+
+def render_cohort(task):
+    # PDF de várias páginas de um grupo; devolve (caminho, erro)
+    path, group, sources = task
+    try:
+        pie, title, text = page_figure()
+        temp_path = path + '.tmp'
+        with PdfPages(temp_path, metadata={'Title': f"Open Field - {group}"}) as pdf:
+            for source in sources:
+                summary, events, started_at, _ = load_session(source)
+                pie.update(summary['zone_seconds'])
+                title.set_text(f"{group}: {summary['animal_id']} - {started_at}")
+                text.set_text(session_report(summary, events, started_at))
+                pdf.savefig(pie.figure)
+        os.replace(temp_path, path)
+        return path, None
+    except LOAD_ERRORS as e:
+        return path, str(e)
+
+
+def run_tasks(function, tasks, workers):
+    if not tasks:
+        return
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from map(function, tasks)
+        return
+    chunksize = max(1, len(tasks) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        yield from executor.map(function, tasks, chunksize=chunksize)
+
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {'sessions': {}, 'cohorts': {}}
+
+
+def save_manifest(out_dir, manifest):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def render(sources, out_dir, formats=('png',), cohorts=True, workers=None, force=False):
+    # Retorna (figuras geradas, ignoradas, PDFs de coorte gerados, [(nome, erro)])
+    os.makedirs(out_dir, exist_ok=True)
+    formats = tuple(formats)
+    previous = {'sessions': {}, 'cohorts': {}} if force else load_manifest(out_dir)
+    # Entradas de execuções anteriores (outros filtros) são mantidas
+    manifest = {'sessions': dict(previous['sessions']), 'cohorts': dict(previous['cohorts'])}
+
+    tasks = []
+    known = {}
+    skipped = 0
+    for source, name, values in sources:
+        # Diários de mesmo nome em diretórios diferentes
+        base, suffix = name, 1
+        while name in known:
+            name = f"{base}_{suffix}"
+            suffix += 1
+        digest = fingerprint(formats, values)
+        known[name] = source, digest
+        entry = previous['sessions'].get(name)
+        if (entry is not None and entry['hash'] == digest
+                and all(os.path.exists(os.path.join(out_dir, f"{name}.{fmt}")) for fmt in formats)):
+            skipped += 1
+        else:
+            manifest['sessions'].pop(name, None)
+            tasks.append((source, name, out_dir, formats))
+
+    errors = []
+    rendered = 0
+    for name, info, error in run_tasks(render_session, tasks, workers):
+        if error is not None:
+            errors.append((name, error))
+            continue
+        manifest['sessions'][name] = {'hash': known[name][1], **info}
+        rendered += 1
+
+    cohort_count = 0
+    if cohorts:
+        members = {}
+        # Só as sessões desta execução entram nos PDFs
+        for name in known:
+            entry = manifest['sessions'].get(name)
+            if entry is not None:
+                members.setdefault(entry['group'], []).append(name)
+        cohort_tasks = []
+        groups = {}
+        for group, names in sorted(members.items()):
+            # Páginas em ordem de data e animal
+            names.sort(key=lambda name: (manifest['sessions'][name]['started_at'],
+                                         manifest['sessions'][name]['animal_id'], name))
+            digest = fingerprint([(name, manifest['sessions'][name]['hash']) for name in names])
+            path = os.path.join(out_dir, f"{COHORT_PREFIX}{safe_name(group)}.pdf")
+            manifest['cohorts'][group] = digest
+            if previous['cohorts'].get(group) != digest or not os.path.exists(path):
+                cohort_tasks.append((path, group, [known[name][0] for name in names]))
+                groups[path] = group
+        for path, error in run_tasks(render_cohort, cohort_tasks, workers):
+            if error is not None:
+                errors.append((path, error))
+                del manifest['cohorts'][groups[path]]
+            else:
+                cohort_count += 1
+
+    save_manifest(out_dir, manifest)
+    return rendered, skipped, cohort_count, sorted(errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Figuras das sessões do Open Field, sem interface gráfica")
+    parser.add_argument('inputs', nargs='*', default=[JOURNAL_DIR],
+                        help="Diretórios ou padrões glob de diários de sessão (*.ofj)")
+    parser.add_argument('-o', '--output', default='figuras', help="Diretório de saída (padrão: figuras)")
+    parser.add_argument('--formats', default='png',
+                        help=f"Formatos separados por vírgula: {', '.join(FORMATS)} (padrão: png)")
+    parser.add_argument('--no-cohort', action='store_true', help="Não gera os PDFs por grupo")
+    parser.add_argument('--force', action='store_true', help="Gera tudo de novo, ignorando o manifesto")
+    parser.add_argument('-w', '--workers', type=int, default=None,
+                        help="Número de processos (padrão: número de CPUs)")
+    parser.add_argument('--db', help="Usa as sessões do banco de resultados em vez dos diários")
+    parser.add_argument('--animal', help="Filtro por ID do animal (com --db)")
+    parser.add_argument('--group', help="Filtro por grupo (com --db)")
+    parser.add_argument('--protocol', help="Filtro por protocolo (com --db)")
+    parser.add_argument('--from', dest='date_from', help="Data inicial AAAA-MM-DD (com --db)")
+    parser.add_argument('--to', dest='date_to', help="Data final AAAA-MM-DD (com --db)")
+    args = parser.parse_args(argv)
+
+    formats = [fmt.strip().lower() for fmt in args.formats.split(',') if fmt.strip()]
+    invalid = [fmt for fmt in formats if fmt not in FORMATS]
+    if invalid or not formats:
+        parser.error(f"formato inválido: {', '.join(invalid) or args.formats}")
+
+    started = time.perf_counter()
+    if args.db:
+        sources = store_sources(args.db, animal_id=args.animal, group=args.group,
+                                protocol=args.protocol, date_from=args.date_from, date_to=args.date_to)
+    else:
+        sources = journal_sources(collect_paths(args.inputs))
+    rendered, skipped, cohorts, errors = render(sources, args.output, formats, not args.no_cohort,
+                                                args.workers, args.force)
+    elapsed = time.perf_counter() - started
+
+    for name, error in errors:
+        print(f"Erro em {name}: {error}", file=sys.stderr)
+    print(f"{rendered} sessão(ões) desenhada(s), {skipped} sem alteração, "
+          f"{cohorts} PDF(s) de coorte, em {elapsed:.2f} s ({len(errors)} com erro)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
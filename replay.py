@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+
+from journal import JOURNAL_DIR, JOURNAL_EXT
+from metrics import events_to_arrays, visit_intervals
+from session_engine import NS_PER_S, ZONES, EVENT_STOP
+
+# Revisão de sessões gravadas. EventTimeline indexa as visitas da sessão
+# (início, fim, área) e guarda somas acumuladas do tempo por área, de modo
+# que o estado em qualquer instante (tempo em cada área e área ativa) sai de
+# uma única busca binária, sem reprocessar os eventos. ReplayPlayer avança a
+# posição da revisão de acordo com a velocidade escolhida.
+
+# Velocidades oferecidas na revisão
+SPEEDS = (1, 2, 5, 10, 25, 50, 100)
+
+
+class EventTimeline:
+    def __init__(self, events, zones=ZONES):
+        self.zones = tuple(zones)
+        t_ns, zone, kind = events_to_arrays(events)
+        stops = t_ns[kind == EVENT_STOP]
+        if len(stops):
+            self.end_ns = int(stops[0])
+        else:
+            self.end_ns = int(t_ns[-1]) if len(t_ns) else 0
+
+        self.starts, self.ends, self.visit_zones = visit_intervals(t_ns, zone, kind, self.end_ns)
+        self.durations = self.ends - self.starts
+
+        # cumulative[k, z]: tempo na área z somado nas visitas anteriores à k-ésima
+        count = len(self.starts)
+        self.cumulative = np.zeros((count + 1, len(self.zones)), dtype=np.int64)
+        self.cumulative[np.arange(1, count + 1), self.visit_zones] = self.durations
+        np.cumsum(self.cumulative, axis=0, out=self.cumulative)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def clamp(self, t_ns):
+        return min(max(int(t_ns), 0), self.end_ns)
+
+    def visit_at(self, t_ns):
+        # Índice da última visita iniciada até t_ns (-1 se nenhuma)
+        return int(np.searchsorted(self.starts, t_ns, side='right')) - 1
+
+    def zone_ns(self, t_ns):
+        index = self.visit_at(t_ns)
+        totals = self.cumulative[index + 1].copy()
+        if index >= 0:
+            # A visita atual pode estar em andamento em t_ns
+            overshoot = self.ends[index] - t_ns
+            if overshoot > 0:
+                totals[self.visit_zones[index]] -= overshoot
+        return totals
+
+    def zone_seconds(self, t_ns):
+        return (self.zone_ns(t_ns) / NS_PER_S).tolist()
+
+    def active_zone(self, t_ns):
+        index = self.visit_at(t_ns)
+        if index >= 0 and t_ns < self.ends[index]:
+            return int(self.visit_zones[index])
+        return None
+
+
+class ReplayPlayer:
+    def __init__(self, timeline, speed=1):
+        self.timeline = timeline
+        self.speed = speed
+        self.position_ns = 0
+        self.playing = False
+
+    @property
+    def finished(self):
+        return self.position_ns >= self.timeline.end_ns
+
+    def play(self):
+        if self.finished:
+            self.position_ns = 0
+        self.playing = True
+
+    def pause(self):
+        self.playing = False
+
+    def seek(self, t_ns):
+        self.position_ns = self.timeline.clamp(t_ns)
+        return self.position_ns
+
+    def advance(self, real_ns):
+        # Avança real_ns de tempo real multiplicado pela velocidade
+        if self.playing:
+            self.seek(self.position_ns + real_ns * self.speed)
+            if self.finished:
+                self.playing = False
+        return self.position_ns
+
+
+def journal_paths(directory=JOURNAL_DIR):
+    # Diários de um diretório, em ordem de nome (animal e data)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.endswith(JOURNAL_EXT))
@@ -0,0 +1,154 @@
+import os
+
+from kivy.clock import Clock
+from kivy.uix.boxlayout import BoxLayout
+from kivy.uix.button import Button
+from kivy.uix.label import Label
+from kivy.uix.slider import Slider
+from kivy.uix.spinner import Spinner
+
+from journal import read_journal
+from replay import SPEEDS, EventTimeline, ReplayPlayer, journal_paths
+from session_engine import NS_PER_S, ZONES
+
+# Barra de controle da revisão de sessões (reproduzir/pausar, velocidade,
+# posição e navegação entre os diários do mesmo diretório). A barra não
+# desenha os tempos: a cada nova posição chama on_position(timeline, t_ns,
+# final), e a interface atualiza rótulos, timer e gráfico como no teste ao
+# vivo. final indica posição estável (pausa, busca ou fim da sessão).
+
+# Atualizações da posição por segundo durante a reprodução
+REPLAY_FPS = 30
+
+
+def format_clock(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 60:02d}:{seconds % 60:02d}"
+
+
+class ReplayBar(BoxLayout):
+    def __init__(self, on_load, on_position, on_close, on_error, **kwargs):
+        super().__init__(orientation='vertical', spacing=5, **kwargs)
+        self.on_load = on_load
+        self.on_position = on_position
+        self.on_close = on_close
+        self.on_error = on_error
+        self.paths = []
+        self.path = None
+        self.timeline = None
+        self.player = None
+        self.play_event = None
+        self.updating_slider = False
+
+        self.session_label = Label(size_hint_y=0.25)
+        self.add_widget(self.session_label)
+
+        position_layout = BoxLayout(orientation='horizontal', spacing=5, size_hint_y=0.25)
+        self.slider = Slider(min=0, max=1, value=0, size_hint_x=0.75)
+        self.slider.bind(value=self.on_slider)
+        self.position_label = Label(text='00:00 / 00:00', size_hint_x=0.25)
+        position_layout.add_widget(self.slider)
+        position_layout.add_widget(self.position_label)
+        self.add_widget(position_layout)
+
+        controls = BoxLayout(orientation='horizontal', spacing=5, size_hint_y=0.25)
+        self.play_btn = Button(text='Reproduzir')
+        self.play_btn.bind(on_press=self.toggle_play)
+        self.speed_spinner = Spinner(text='1x', values=[f'{speed}x' for speed in SPEEDS], size_hint_x=0.6)
+        self.speed_spinner.bind(text=self.on_speed)
+        controls.add_widget(self.play_btn)
+        controls.add_widget(self.speed_spinner)
+        self.add_widget(controls)
+
+        navigation = BoxLayout(orientation='horizontal', spacing=5, size_hint_y=0.25)
+        previous_btn = Button(text='Sessão Anterior')
+        previous_btn.bind(on_press=lambda instance: self.step(-1))
+        next_btn = Button(text='Próxima Sessão')
+        next_btn.bind(on_press=lambda instance: self.step(1))
+        close_btn = Button(text='Sair da Revisão')
+        close_btn.bind(on_press=lambda instance: self.close())
+        navigation.add_widget(previous_btn)
+        navigation.add_widget(next_btn)
+        navigation.add_widget(close_btn)
+        self.add_widget(navigation)
+
+    def load(self, path):
+        # Carrega o diário e posiciona a revisão no início da sessão
+        # Um diário inválido não altera a sessão em revisão
+        header, events = read_journal(path)
+        label = f"{header['animal_id']} - {header.get('started_at', '')} ({os.path.basename(path)})"
+        timeline = EventTimeline(events, header.get('zones', ZONES))
+        self.pause()
+        self.path = path
+        self.paths = journal_paths(os.path.dirname(path) or '.')
+        self.timeline = timeline
+        self.player = ReplayPlayer(self.timeline, self.player.speed if self.player else 1)
+        self.session_label.text = label
+        self.updating_slider = True
+        self.slider.max = max(self.timeline.end_ns / NS_PER_S, 0.001)
+        self.updating_slider = False
+        self.on_load(path, header, events)
+        self.seek(0)
+
+    def step(self, offset):
+        if self.path not in self.paths:
+            return
+        index = self.paths.index(self.path) + offset
+        if 0 <= index < len(self.paths):
+            try:
+                self.load(self.paths[index])
+            except (OSError, ValueError, KeyError) as e:
+                self.on_error(f"Não foi possível abrir a sessão: {str(e)}")
+
+    def toggle_play(self, instance=None):
+        if self.player is None:
+            return
+        if self.player.playing:
+            self.pause()
+        else:
+            self.player.play()
+            self.play_btn.text = 'Pausar'
+            self.play_event = Clock.schedule_interval(self.on_tick, 1 / REPLAY_FPS)
+
+    def pause(self):
+        if self.play_event is not None:
+            self.play_event.cancel()
+            self.play_event = None
+        self.play_btn.text = 'Reproduzir'
+        if self.player is not None and self.player.playing:
+            self.player.pause()
+            self.show(final=True)
+
+    def on_speed(self, spinner, text):
+        if self.player is not None:
+            self.player.speed = int(text.rstrip('x'))
+
+    def on_tick(self, dt):
+        self.player.advance(int(dt * NS_PER_S))
+        if not self.player.playing:
+            self.pause()
+            self.show(final=True)
+            return False
+        self.show(final=False)
+        return True
+
+    def on_slider(self, slider, value):
+        if not self.updating_slider and self.player is not None:
+            self.seek(int(value * NS_PER_S))
+
+    def seek(self, t_ns):
+        self.player.seek(t_ns)
+        self.show(final=True)
+
+    def show(self, final):
+        t_ns = self.player.position_ns
+        seconds = t_ns / NS_PER_S
+        self.updating_slider = True
+        self.slider.value = seconds
+        self.updating_slider = False
+        self.position_label.text = f"{format_clock(seconds)} / {format_clock(self.timeline.end_ns / NS_PER_S)}"
+        self.on_position(self.timeline, t_ns, final)
+
+    def close(self):
+        self.pause()
+        self.on_close()
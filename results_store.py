@@ -0,0 +1,194 @@
+import datetime
+import sqlite3
+
+from session_engine import ZONES
+
+# Banco de resultados local (SQLite em modo WAL). Cada sessão finalizada
+# ocupa uma linha em "sessions" (indexada por animal, data, protocolo e
+# grupo) e seus eventos brutos ficam em "events", agrupados por sessão.
+# "ingested_files" registra os relatórios antigos já importados (caminho e
+# data de modificação), para que uma nova importação os ignore.
+
+DB_PATH = 'openfield.db'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    animal_id TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    protocol TEXT NOT NULL DEFAULT '',
+    group_name TEXT NOT NULL DEFAULT '',
+    duration NUMERIC NOT NULL,
+    effective_duration REAL NOT NULL,
+    corner_s REAL NOT NULL,
+    lateral_s REAL NOT NULL,
+    center_s REAL NOT NULL,
+    source TEXT UNIQUE
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_animal ON sessions (animal_id, started_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_date ON sessions (started_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_protocol ON sessions (protocol, started_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_group ON sessions (group_name, started_at);
+
+CREATE TABLE IF NOT EXISTS events (
+    session_id INTEGER NOT NULL REFERENCES sessions (id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    t_ns INTEGER NOT NULL,
+    zone INTEGER NOT NULL,
+    kind INTEGER NOT NULL,
+    PRIMARY KEY (session_id, seq)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS ingested_files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    session_id INTEGER REFERENCES sessions (id) ON DELETE SET NULL
+);
+"""
+
+ZONE_COLUMNS = ('corner_s', 'lateral_s', 'center_s')
+
+
+class ResultsStore:
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA foreign_keys=ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add_session(self, summary, started_at, events=(), protocol='', group='', source=None):
+        # Insere a sessão e seus eventos em uma única transação. Retorna o id
+        # da sessão, ou None se a mesma origem (source) já estiver gravada.
+        seconds = dict(zip(summary['zones'], summary['zone_seconds']))
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO sessions (animal_id, started_at, protocol, group_name,"
+                " duration, effective_duration, corner_s, lateral_s, center_s, source)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (summary['animal_id'], started_at, protocol, group,
+                 summary['duration'], summary['effective_duration'],
+                 *(seconds.get(zone, 0.0) for zone in ZONES), source))
+            if cursor.rowcount == 0:
+                return None
+            session_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO events (session_id, seq, t_ns, zone, kind) VALUES (?, ?, ?, ?, ?)",
+                ((session_id, seq, t_ns, zone, kind) for seq, (t_ns, zone, kind) in enumerate(events)))
+        return session_id
+
+    def ingest_sessions(self, items):
+        # Importação em lote de relatórios antigos, em uma única transação.
+        # items: (resumo, início, caminho, mtime_ns); um arquivo modificado
+        # desde a última importação substitui a sessão importada antes. Um
+        # relatório de uma sessão já no banco (mesmo animal e mesma data) só
+        # é marcado como importado. Retorna o número de sessões inseridas.
+        count = 0
+        with self.connection:
+            for summary, started_at, path, mtime_ns in items:
+                seconds = dict(zip(summary['zones'], summary['zone_seconds']))
+                # A sessão substituída não devolve seu id: o histórico e a
+                # coorte detectam mudanças pela contagem e pela soma dos ids
+                (next_id,) = self.connection.execute(
+                    "SELECT COALESCE(MAX(id), 0) + 1 FROM sessions").fetchone()
+                self.connection.execute("DELETE FROM sessions WHERE source = ?", (path,))
+                duplicate = self.connection.execute(
+                    "SELECT 1 FROM sessions WHERE animal_id = ? AND started_at = ?",
+                    (summary['animal_id'], started_at)).fetchone()
+                if duplicate is not None:
+                    self.connection.execute(
+                        "INSERT OR REPLACE INTO ingested_files (path, mtime_ns, session_id)"
+                        " VALUES (?, ?, NULL)", (path, mtime_ns))
+                    continue
+                cursor = self.connection.execute(
+                    "INSERT INTO sessions (id, animal_id, started_at, duration, effective_duration,"
+                    " corner_s, lateral_s, center_s, source) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (next_id, summary['animal_id'], started_at, summary['duration'],
+                     summary['effective_duration'],
+                     *(seconds.get(zone, 0.0) for zone in ZONES), path))
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO ingested_files (path, mtime_ns, session_id) VALUES (?, ?, ?)",
+                    (path, mtime_ns, cursor.lastrowid))
+                count += 1
+        return count
+
+    def ingested_files(self):
+        # {caminho: mtime_ns} dos relatórios já importados
+        cursor = self.connection.cursor()
+        cursor.row_factory = None
+        return dict(cursor.execute("SELECT path, mtime_ns FROM ingested_files"))
+
+    def has_source(self, source):
+        row = self.connection.execute(
+            "SELECT 1 FROM sessions WHERE source = ?", (source,)).fetchone()
+        return row is not None
+
+    def query_sessions(self, **filters):
+        # Filtros opcionais: animal_id, group, protocol, date_from e date_to
+        # (AAAA-MM-DD, inclusive)
+        return self.iter_sessions(**filters).fetchall()
+
+    def iter_sessions(self, animal_id=None, group=None, protocol=None,
+                      date_from=None, date_to=None):
+        # Cursor sobre as sessões, para leitura em fluxo
+        clauses = []
+        params = []
+        if animal_id:
+            clauses.append("animal_id = ?")
+            params.append(animal_id)
+        if group:
+            clauses.append("group_name = ?")
+            params.append(group)
+        if protocol:
+            clauses.append("protocol = ?")
+            params.append(protocol)
+        if date_from:
+            clauses.append("started_at >= ?")
+            params.append(date_from)
+        if date_to:
+            next_day = datetime.date.fromisoformat(date_to) + datetime.timedelta(days=1)
+            clauses.append("started_at < ?")
+            params.append(next_day.isoformat())
+        sql = "SELECT * FROM sessions"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY started_at, id"
+        return self.connection.execute(sql, params)
+
+    def session(self, session_id):
+        # Linha de "sessions" pelo id, ou None se não existir mais
+        return self.connection.execute(
+            "SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+
+    def session_events(self, session_id):
+        # Tuplas simples (t_ns, zona, tipo), como as do SessionEngine
+        cursor = self.connection.cursor()
+        cursor.row_factory = None
+        return cursor.execute(
+            "SELECT t_ns, zone, kind FROM events WHERE session_id = ? ORDER BY seq",
+            (session_id,)).fetchall()
+
+
+def row_to_summary(row):
+    # Linha de "sessions" -> resumo no formato de session_engine.summarize
+    effective_duration = row['effective_duration']
+    zone_seconds = [row[column] for column in ZONE_COLUMNS]
+    return {
+        "animal_id": row['animal_id'],
+        "duration": row['duration'],
+        "effective_duration": effective_duration,
+        "zones": ZONES,
+        "zone_seconds": zone_seconds,
+        "zone_percent": [s / effective_duration * 100 for s in zone_seconds],
+    }
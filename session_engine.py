@@ -0,0 +1,300 @@
+import time
+
+# Motor de sessão do teste Open Field, independente de Kivy e matplotlib.
+# Toda a contabilidade de tempo por área fica aqui; a interface apenas
+# repassa as entradas (pressionar/soltar) e lê o estado para exibição.
+
+# Relógio monotônico de alta resolução, em nanossegundos. Diferente de
+# time.time(), não salta quando o relógio do sistema é ajustado (NTP).
+now_ns = time.perf_counter_ns
+
+NS_PER_S = 1_000_000_000
+
+# Áreas padrão do teste: identificadores internos e rótulos exibidos
+ZONES = ('corner', 'lateral', 'center')
+ZONE_LABELS = {'corner': 'Canto', 'lateral': 'Lateral', 'center': 'Centro'}
+ZONE_PHRASES = {'corner': 'no Canto', 'lateral': 'na Lateral', 'center': 'no Centro'}
+
+# Tipos de evento registrados durante a sessão
+EVENT_START = 0
+EVENT_ENTER = 1
+EVENT_EXIT = 2
+EVENT_STOP = 3
+
+# Identificador usado nos eventos que não pertencem a nenhuma área
+NO_ZONE = 255
+
+
+class SessionEngine:
+    """Máquina de estados de uma sessão, agnóstica quanto às áreas.
+
+    Apenas uma área pode estar ativa por vez: entrar em uma área encerra a
+    anterior. Os eventos são guardados como tuplas (t_ns, zona, tipo), com
+    t_ns relativo ao início da sessão.
+    """
+
+    __slots__ = ('zones', 'clock', 'listeners', 'running', 'started',
+                 'animal_id', 'duration_s', 'duration_ns', 'start_ns', 'stop_ns',
+                 'active_zone', 'enter_ns', 'zone_ns', 'events')
+
+    def __init__(self, zones=ZONES, clock=now_ns):
+        self.zones = tuple(zones)
+        self.clock = clock
+        # Funções chamadas a cada evento: listener(t_ns, zona, tipo)
+        self.listeners = []
+        self.reset()
+
+    def reset(self):
+        self.running = False
+        self.started = False
+        self.animal_id = ""
+        self.duration_s = 0
+        self.duration_ns = 0
+        self.start_ns = None
+        self.stop_ns = None
+        self.active_zone = None
+        self.enter_ns = None
+        self.zone_ns = [0] * len(self.zones)
+        self.events = []
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def zone_index(self, zone):
+        if isinstance(zone, int):
+            return zone
+        return self.zones.index(zone)
+
+    def _emit(self, t_ns, zone, kind):
+        rel_ns = t_ns - self.start_ns
+        self.events.append((rel_ns, zone, kind))
+        for listener in self.listeners:
+            listener(rel_ns, zone, kind)
+
+    def _clamp(self, t_ns):
+        # Garante ordem monotônica dos eventos e respeita o fim programado
+        if t_ns is None:
+            t_ns = self.clock()
+        if self.events:
+            last_ns = self.start_ns + self.events[-1][0]
+            if t_ns < last_ns:
+                t_ns = last_ns
+        return min(t_ns, self.start_ns + self.duration_ns)
+
+    def start(self, animal_id, duration_s, t_ns=None):
+        if self.running:
+            return False
+        self.reset()
+        self.running = True
+        self.started = True
+        self.animal_id = animal_id
+        self.duration_s = duration_s
+        self.duration_ns = int(duration_s * NS_PER_S)
+        self.start_ns = self.clock() if t_ns is None else t_ns
+        self._emit(self.start_ns, NO_ZONE, EVENT_START)
+        return True
+
+    def deadline_reached(self, t_ns=None):
+        if t_ns is None:
+            t_ns = self.clock()
+        return t_ns - self.start_ns >= self.duration_ns
+
+    def press(self, zone, t_ns=None):
+        if not self.running:
+            return False
+        index = self.zone_index(zone)
+        if self.active_zone == index:
+            return False
+        if t_ns is None:
+            t_ns = self.clock()
+        if self.deadline_reached(t_ns):
+            self.stop(t_ns)
+            return False
+        t_ns = self._clamp(t_ns)
+        if self.active_zone is not None:
+            self._exit(t_ns)
+        self.active_zone = index
+        self.enter_ns = t_ns
+        self._emit(t_ns, index, EVENT_ENTER)
+        return True
+
+    def release(self, zone, t_ns=None):
+        if not self.running:
+            return False
+        index = self.zone_index(zone)
+        if self.active_zone != index:
+            return False
+        self._exit(self._clamp(t_ns))
+        return True
+
+    def release_all(self, t_ns=None):
+        if self.running and self.active_zone is not None:
+            self._exit(self._clamp(t_ns))
+
+    def _exit(self, t_ns):
+        index = self.active_zone
+        self.zone_ns[index] += t_ns - self.enter_ns
+        self.active_zone = None
+        self.enter_ns = None
+        self._emit(t_ns, index, EVENT_EXIT)
+
+    def stop(self, t_ns=None):
+        if not self.running:
+            return False
+        t_ns = self._clamp(t_ns)
+        if self.active_zone is not None:
+            self._exit(t_ns)
+        self.running = False
+        self.stop_ns = t_ns
+        self._emit(t_ns, NO_ZONE, EVENT_STOP)
+        return True
+
+    def tick(self, t_ns=None):
+        # Encerra a sessão ao atingir a duração programada.
+        # Retorna True enquanto a sessão continuar em andamento.
+        if not self.running:
+            return False
+        if t_ns is None:
+            t_ns = self.clock()
+        if self.deadline_reached(t_ns):
+            self.stop(t_ns)
+            return False
+        return True
+
+    def elapsed_ns(self, t_ns=None):
+        if not self.started:
+            return 0
+        if not self.running:
+            return self.stop_ns - self.start_ns
+        if t_ns is None:
+            t_ns = self.clock()
+        return max(0, min(t_ns - self.start_ns, self.duration_ns))
+
+    def remaining_s(self, t_ns=None):
+        return max(0, self.duration_ns - self.elapsed_ns(t_ns)) / NS_PER_S
+
+    def zone_time_ns(self, zone, t_ns=None):
+        index = self.zone_index(zone)
+        total = self.zone_ns[index]
+        if self.running and self.active_zone == index:
+            total += self.start_ns + self.elapsed_ns(t_ns) - self.enter_ns
+        return total
+
+    def zone_seconds(self, t_ns=None):
+        if t_ns is None and self.running:
+            t_ns = self.clock()
+        return [self.zone_time_ns(i, t_ns) / NS_PER_S for i in range(len(self.zones))]
+
+    def summary(self, t_ns=None):
+        if t_ns is None and self.running:
+            t_ns = self.clock()
+        zone_ns = [self.zone_time_ns(i, t_ns) for i in range(len(self.zones))]
+        return summarize(self.animal_id, self.duration_s, zone_ns,
+                         self.elapsed_ns(t_ns), self.zones)
+
+    def load_events(self, animal_id, duration_s, events, finish=True):
+        # Reconstrói a sessão a partir da sequência de eventos gravada.
+        # Se a sequência não terminar com EVENT_STOP e finish=True, a sessão
+        # é encerrada no instante do último evento (sessão recuperada).
+        self.running = False
+        self.start(animal_id, duration_s, t_ns=0)
+        for t_ns, zone, kind in events:
+            if kind == EVENT_ENTER:
+                self.press(zone, t_ns)
+            elif kind == EVENT_EXIT:
+                self.release(zone, t_ns)
+            elif kind == EVENT_STOP:
+                self.stop(t_ns)
+                break
+        if finish and self.running:
+            self.stop(self.events[-1][0])
+        return self
+
+    @classmethod
+    def from_events(cls, animal_id, duration_s, events, zones=ZONES, finish=True):
+        return cls(zones).load_events(animal_id, duration_s, events, finish)
+
+
+def summarize(animal_id, duration_s, zone_ns, elapsed_ns, zones=ZONES):
+    # Mesmas métricas do relatório da interface: duração efetiva e tempo
+    # (segundos e porcentagem) em cada área
+    effective_duration = elapsed_ns / NS_PER_S
+    if effective_duration <= 0:
+        effective_duration = 0.001
+    zone_seconds = [ns / NS_PER_S for ns in zone_ns]
+    return {
+        "animal_id": animal_id,
+        "duration": duration_s,
+        "effective_duration": effective_duration,
+        "zones": tuple(zones),
+        "zone_seconds": zone_seconds,
+        "zone_percent": [s / effective_duration * 100 for s in zone_seconds],
+    }
+
+
+def summarize_events(animal_id, duration_s, events, zones=ZONES):
+    # Versão enxuta de SessionEngine.from_events(...).summary() para
+    # processamento em lote: um único laço sobre os eventos, sem objetos
+    # intermediários. Os eventos já devem vir do motor (ordenados e pareados).
+    zone_ns = [0] * len(zones)
+    active = None
+    enter_ns = 0
+    last_ns = 0
+    stopped = False
+    for t_ns, zone, kind in events:
+        last_ns = t_ns
+        if kind == EVENT_ENTER:
+            active = zone
+            enter_ns = t_ns
+        elif kind == EVENT_EXIT:
+            if active is not None:
+                zone_ns[active] += t_ns - enter_ns
+                active = None
+        elif kind == EVENT_STOP:
+            stopped = True
+            break
+    if active is not None:
+        zone_ns[active] += last_ns - enter_ns
+    elapsed_ns = last_ns
+    if not stopped:
+        elapsed_ns = min(last_ns, int(duration_s * NS_PER_S))
+    return summarize(animal_id, duration_s, zone_ns, elapsed_ns, zones)
+
+
+def format_report(summary, date_text=None):
+    if date_text is None:
+        date_text = time.strftime('%Y-%m-%d %H:%M:%S')
+    report = f"--- Relatório do Teste Open Field ---\n\n"
+    report += f"ID do Animal: {summary['animal_id']}\n"
+    report += f"Data/Hora: {date_text}\n"
+    report += f"Duração Programada do Teste: {summary['duration']} segundos\n"
+    report += f"Duração Efetiva do Teste: {summary['effective_duration']:.2f} segundos\n\n"
+    report += f"Tempo Acumulado nas Áreas:\n"
+    for zone, seconds, percent in zip(summary['zones'], summary['zone_seconds'],
+                                      summary['zone_percent']):
+        label = ZONE_LABELS.get(zone, zone)
+        report += f"  {label}: {seconds:.2f} segundos ({percent:.2f}%)\n"
+    report += "\n"
+    return report
+
+
+def report_row(summary, date_text=None):
+    # Linha de resultados com as mesmas chaves usadas pela interface
+    if date_text is None:
+        date_text = time.strftime('%Y-%m-%d %H:%M:%S')
+    row = {
+        "ID do Animal": summary['animal_id'],
+        "Data/Hora": date_text,
+        "Duração Programada (s)": summary['duration'],
+        "Duração Efetiva (s)": summary['effective_duration'],
+    }
+    for zone, seconds, percent in zip(summary['zones'], summary['zone_seconds'],
+                                      summary['zone_percent']):
+        phrase = ZONE_PHRASES.get(zone, zone)
+        row[f"Tempo {phrase} (s)"] = seconds
+        row[f"Porcentagem {phrase} (%)"] = percent
+    return row
@@ -0,0 +1,48 @@
+import json
+import time
+from contextlib import contextmanager
+
+# Medição do caminho de inicialização do aplicativo: tempo de importação
+# de cada módulo e tempo até o primeiro quadro desenhado. Deve ser o
+# primeiro módulo importado por openfield.py.
+
+_T0 = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self, t0=_T0):
+        self.t0 = t0
+        self.imports = []  # (módulo, segundos)
+        self.marks = []    # (etapa, segundos desde o início)
+
+    @contextmanager
+    def measure(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.imports.append((name, time.perf_counter() - started))
+
+    def mark(self, name):
+        self.marks.append((name, time.perf_counter() - self.t0))
+
+    def as_dict(self):
+        return {
+            'imports': {name: seconds for name, seconds in self.imports},
+            'marks': {name: seconds for name, seconds in self.marks},
+        }
+
+    def report(self):
+        lines = ["--- Tempo de Inicialização ---"]
+        for name, seconds in self.imports:
+            lines.append(f"  import {name}: {seconds * 1000:.1f} ms")
+        for name, seconds in self.marks:
+            lines.append(f"  {name}: {seconds * 1000:.1f} ms")
+        return "\n".join(lines)
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(self.as_dict(), file, indent=2)
+
+
+startup = StartupTimer()
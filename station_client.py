@@ -0,0 +1,202 @@
+import asyncio
+import collections
+import itertools
+import json
+import os
+import socket
+import threading
+
+from aggregator import encode, open_connection, parse_address
+
+# Cliente do agregador usado pelo aplicativo (uma estação de pontuação). Os
+# listeners do SessionEngine apenas acrescentam tuplas a uma fila local
+# (deque), sem rede nem serialização na thread da interface. Uma thread com
+# seu próprio loop asyncio junta a fila em lotes, envia e guarda cada lote
+# até a confirmação do agregador; se a conexão cair, os lotes pendentes são
+# reenviados após a reconexão, e a pontuação nunca espera pela rede. A cada
+# conexão, o início e os eventos de cada sessão em andamento também são
+# reenviados, para que um agregador reiniciado recupere a visão ao vivo.
+#
+# Ativado pela variável de ambiente OPENFIELD_AGGREGATOR (host:porta ou
+# unix:/caminho); OPENFIELD_STATION dá o nome da estação (padrão: nome da
+# máquina).
+
+# Intervalo entre envios quando a fila está vazia, em segundos
+FLUSH_INTERVAL = 0.2
+
+# Itens da fila por lote
+BATCH_SIZE = 500
+
+# Lotes enviados e ainda não confirmados antes de pausar o envio
+MAX_UNACKED = 64
+
+# Espera entre tentativas de conexão, em segundos (dobra até o máximo)
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 10.0
+
+
+def session_name(journal_path):
+    # Identificador da sessão na estação: nome do diário sem extensão
+    return os.path.splitext(os.path.basename(journal_path))[0]
+
+
+def station_client_from_env():
+    address = os.environ.get('OPENFIELD_AGGREGATOR', '').strip()
+    if not address:
+        return None
+    station = os.environ.get('OPENFIELD_STATION', '').strip() or socket.gethostname()
+    return StationClient(address, station).start()
+
+
+class StationClient:
+    def __init__(self, address, station, flush_interval=FLUSH_INTERVAL, batch_size=BATCH_SIZE):
+        parse_address(address)
+        self.address = address
+        self.station = station
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queue = collections.deque()
+        # Lotes enviados aguardando confirmação (usados só pela thread de envio)
+        self.unacked = collections.OrderedDict()
+        # Sessões em andamento: {sessão: (cabeçalho, eventos já emitidos)}
+        self.open_sessions = {}
+        self.batch_numbers = itertools.count()
+        self.connected = False
+        self.closing = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._run()),
+                                       name='station-client', daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self, timeout=2.0):
+        # Tenta entregar o que falta por até timeout segundos
+        self.closing = True
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    @property
+    def pending(self):
+        return len(self.queue) + len(self.unacked)
+
+    # Chamados na thread da interface: apenas acrescentam à fila
+
+    def begin_session(self, session, header):
+        # Retorna o listener a registrar no SessionEngine da sessão
+        header = dict(header)
+        events = []
+        self.open_sessions[session] = header, events
+        self.queue.append(('begin', session, header))
+        append = self.queue.append
+        record = events.append
+
+        def listener(t_ns, zone, kind):
+            append(('event', session, len(events), t_ns, zone, kind))
+            record((t_ns, zone, kind))
+        return listener
+
+    def end_session(self, session, header, events):
+        self.open_sessions.pop(session, None)
+        self.queue.append(('end', session, dict(header), list(events)))
+
+    # Thread de envio
+
+    def _take_batch(self):
+        # Junta até batch_size itens da fila em um lote; eventos seguidos da
+        # mesma sessão viram uma única mensagem
+        messages = []
+        last = None
+        for _ in range(min(self.batch_size, len(self.queue))):
+            item = self.queue.popleft()
+            if item[0] == 'event':
+                _, session, seq, t_ns, zone, kind = item
+                if (last is not None and last['session'] == session
+                        and last['seq'] + len(last['events']) == seq):
+                    last['events'].append((t_ns, zone, kind))
+                    continue
+                last = {'type': 'events', 'session': session, 'seq': seq, 'events': [(t_ns, zone, kind)]}
+                messages.append(last)
+                continue
+            last = None
+            if item[0] == 'begin':
+                messages.append({'type': 'begin', 'session': item[1], 'header': item[2]})
+            else:
+                messages.append({'type': 'end', 'session': item[1], 'header': item[2], 'events': item[3]})
+        if not messages:
+            return None
+        batch = next(self.batch_numbers)
+        data = encode({'station': self.station, 'batch': batch, 'messages': messages})
+        self.unacked[batch] = data
+        return data
+
+    def _resync_batch(self):
+        # Início e eventos de cada sessão em andamento; não fica na lista de
+        # lotes pendentes, pois é refeito a cada conexão. Eventos repetidos
+        # são ignorados pelo agregador (posição "seq")
+        messages = []
+        for session, (header, events) in list(self.open_sessions.items()):
+            messages.append({'type': 'begin', 'session': session, 'header': header})
+            messages.append({'type': 'events', 'session': session, 'seq': 0, 'events': events[:]})
+        if not messages:
+            return None
+        return encode({'station': self.station, 'batch': next(self.batch_numbers),
+                       'messages': messages})
+
+    def _done(self):
+        return self.closing and not self.queue and not self.unacked
+
+    async def _run(self):
+        delay = RECONNECT_MIN
+        while not self._done():
+            try:
+                reader, writer = await open_connection(self.address)
+            except OSError:
+                if self.closing:
+                    break
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX)
+                continue
+            delay = RECONNECT_MIN
+            self.connected = True
+            try:
+                await self._send(reader, writer)
+            except (OSError, ValueError, KeyError):
+                pass
+            finally:
+                self.connected = False
+                writer.close()
+
+    async def _send(self, reader, writer):
+        acks = asyncio.create_task(self._read_acks(reader))
+        try:
+            # Lotes não confirmados na conexão anterior vão primeiro, seguidos
+            # das sessões em andamento (o agregador pode ter sido reiniciado)
+            for data in list(self.unacked.values()):
+                writer.write(data)
+            data = self._resync_batch()
+            if data is not None:
+                writer.write(data)
+            await writer.drain()
+            while not self._done():
+                if acks.done():
+                    acks.result()
+                    return
+                data = self._take_batch() if len(self.unacked) < MAX_UNACKED else None
+                if data is None:
+                    await asyncio.wait((acks,), timeout=self.flush_interval)
+                    continue
+                writer.write(data)
+                await writer.drain()
+        finally:
+            acks.cancel()
+
+    async def _read_acks(self, reader):
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionResetError("conexão encerrada pelo agregador")
+            ack = json.loads(line)['ack']
+            while self.unacked and next(iter(self.unacked)) <= ack:
+                self.unacked.popitem(last=False)
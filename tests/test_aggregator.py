@@ -0,0 +1,168 @@
+import asyncio
+import json
+
+import pytest
+
+from aggregator import Aggregator, encode, open_connection
+from results_store import ResultsStore
+from session_engine import NS_PER_S, ZONES, SessionEngine
+from station_client import StationClient
+
+HEADER = {'animal_id': 'R1', 'duration': 300, 'zones': list(ZONES),
+          'started_at': '2025-07-01 10:00:00', 'group': 'controle'}
+
+
+async def wait_until(condition, timeout=10.0):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise AssertionError("condição não atingida a tempo")
+        await asyncio.sleep(0.01)
+
+
+async def start_aggregator(tmp_path, port=0):
+    aggregator = Aggregator(str(tmp_path / 'agregado.db'), str(tmp_path / 'estado.json'))
+    server = await aggregator.start(f'127.0.0.1:{port}')
+    return aggregator, server.sockets[0].getsockname()[1]
+
+
+def feed(engine, start_s, count):
+    # Alterna as áreas a cada segundo
+    for second in range(start_s, start_s + count):
+        engine.press(ZONES[second % len(ZONES)], second * NS_PER_S)
+
+
+def live_seconds(aggregator, key, t_ns):
+    return aggregator.sessions[key]['engine'].zone_seconds(t_ns)
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 30))
+
+
+def test_round_trip_and_restart(tmp_path):
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        aggregator, port = await start_aggregator(tmp_path)
+        client = StationClient(f'127.0.0.1:{port}', 'PC1', flush_interval=0.01).start()
+        engine = SessionEngine()
+        engine.add_listener(client.begin_session('s1', HEADER))
+        engine.start('R1', 300, t_ns=0)
+
+        feed(engine, 1, 20)
+        await wait_until(lambda: 'PC1/s1' in aggregator.sessions
+                         and aggregator.sessions['PC1/s1']['received'] == len(engine.events))
+        t_ns = engine.events[-1][0]
+        assert live_seconds(aggregator, 'PC1/s1', t_ns) == engine.zone_seconds(t_ns)
+        assert aggregator.view()['stations']['PC1']['connected']
+
+        # Agregador reiniciado no meio da sessão: a visão ao vivo é refeita
+        await aggregator.close()
+        feed(engine, 21, 20)
+        aggregator, _ = await start_aggregator(tmp_path, port)
+        await wait_until(lambda: 'PC1/s1' in aggregator.sessions
+                         and aggregator.sessions['PC1/s1']['received'] == len(engine.events))
+        t_ns = engine.events[-1][0]
+        assert live_seconds(aggregator, 'PC1/s1', t_ns) == engine.zone_seconds(t_ns)
+
+        engine.stop(45 * NS_PER_S)
+        client.end_session('s1', HEADER, engine.events)
+        await wait_until(lambda: client.pending == 0 and aggregator.sessions['PC1/s1']['finished'])
+        await loop.run_in_executor(None, client.close)
+        await aggregator.close()
+        return engine
+
+    engine = run(scenario())
+
+    with ResultsStore(str(tmp_path / 'agregado.db')) as store:
+        rows = store.query_sessions(group='controle')
+        assert [row['source'] for row in rows] == ['aggregator:PC1/s1']
+        assert store.session_events(rows[0]['id']) == engine.events
+    with open(tmp_path / 'estado.json', encoding='utf-8') as file:
+        session = json.load(file)['sessions']['PC1/s1']
+    assert session['finished']
+    assert session['zone_seconds'] == pytest.approx(engine.zone_seconds())
+
+
+def test_invalid_messages_are_dropped_and_acked(tmp_path):
+    async def scenario():
+        aggregator, port = await start_aggregator(tmp_path)
+        reader, writer = await open_connection(f'127.0.0.1:{port}')
+        writer.write(encode({'station': 'PC2', 'batch': 3, 'messages': [
+            {'type': 'begin', 'session': 's', 'header': {'animal_id': 'R2', 'duration': 60}},
+            {'type': 'events', 'session': 's', 'seq': 0, 'events': [[10, 9, 1]]},
+            {'type': 'events', 'session': 's', 'seq': 0, 'events': [[10, 'a']]},
+            {'type': 'begin', 'session': 't', 'header': {'duration': 60}},
+            {'type': 'desconhecido', 'session': 's'},
+            {'type': 'events', 'session': 's', 'seq': 0, 'events': [[NS_PER_S, 1, 1]]},
+        ]}))
+        await writer.drain()
+        assert json.loads(await reader.readline()) == {'ack': 3}
+        assert set(aggregator.sessions) == {'PC2/s'}
+        assert aggregator.sessions['PC2/s']['engine'].active_zone == 1
+
+        # A conexão ainda aberta é encerrada junto com o agregador
+        await aggregator.close()
+        assert await reader.read() == b''
+        writer.close()
+
+    run(scenario())
+
+
+def end_message(session, animal_id):
+    engine = SessionEngine()
+    engine.start(animal_id, 300, t_ns=0)
+    feed(engine, 1, 5)
+    engine.stop(10 * NS_PER_S)
+    return {'type': 'end', 'session': session, 'header': dict(HEADER, animal_id=animal_id),
+            'events': [list(event) for event in engine.events]}
+
+
+def test_finished_sessions_keep_only_a_bounded_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr('aggregator.MAX_FINISHED', 2)
+
+    async def scenario():
+        aggregator, port = await start_aggregator(tmp_path)
+        reader, writer = await open_connection(f'127.0.0.1:{port}')
+        writer.write(encode({'station': 'PC3', 'batch': 1, 'messages': [
+            end_message(f's{number}', f'R{number}') for number in range(3)]}))
+        await writer.drain()
+        assert json.loads(await reader.readline()) == {'ack': 1}
+        assert set(aggregator.sessions) == {'PC3/s1', 'PC3/s2'}
+        assert all('engine' not in session for session in aggregator.sessions.values())
+        view = aggregator.view()['sessions']['PC3/s2']
+        assert view['finished'] and view['elapsed_s'] == 10.0 and view['animal_id'] == 'R2'
+        writer.close()
+        await aggregator.close()
+
+    run(scenario())
+    with ResultsStore(str(tmp_path / 'agregado.db')) as store:
+        assert len(store.query_sessions()) == 3
+
+
+def test_database_failure_closes_the_connection_without_ack(tmp_path):
+    async def scenario():
+        aggregator, port = await start_aggregator(tmp_path)
+        # Um diretório no lugar do banco: o SQLite não consegue abri-lo
+        (tmp_path / 'ocupado.db').mkdir()
+        aggregator.db_path = str(tmp_path / 'ocupado.db')
+        packet = encode({'station': 'PC4', 'batch': 7, 'messages': [end_message('s', 'R4')]})
+        reader, writer = await open_connection(f'127.0.0.1:{port}')
+        writer.write(packet)
+        await writer.drain()
+        assert await reader.readline() == b''
+        writer.close()
+
+        # O lote reenviado é gravado quando o banco volta a funcionar
+        aggregator.db_path = str(tmp_path / 'agregado.db')
+        reader, writer = await open_connection(f'127.0.0.1:{port}')
+        writer.write(packet)
+        await writer.drain()
+        assert json.loads(await reader.readline()) == {'ack': 7}
+        writer.close()
+        await aggregator.close()
+
+    run(scenario())
+    with ResultsStore(str(tmp_path / 'agregado.db')) as store:
+        assert [row['animal_id'] for row in store.query_sessions()] == ['R4']
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from cohort import CohortStats, open_cohort
+from results_store import ResultsStore
+from session_engine import NS_PER_S, SessionEngine
+
+SESSIONS = [
+    # (animal, início, grupo, segundos no canto)
+    ('R1', '2025-07-01 09:00:00', 'controle', 10),
+    ('R2', '2025-07-01 10:00:00', 'controle', 30),
+    ('R3', '2025-07-01 11:00:00', 'tratado', 50),
+    ('R4', '2025-07-02 09:00:00', 'tratado', 20),
+    ('R5', '2025-07-02 10:00:00', '', 40),
+]
+
+
+def add_sessions(store, sessions):
+    for animal_id, started_at, group, corner_s in sessions:
+        engine = SessionEngine()
+        engine.start(animal_id, 300, t_ns=0)
+        engine.press('corner', NS_PER_S)
+        engine.release('corner', int((1 + corner_s) * NS_PER_S))
+        engine.stop(100 * NS_PER_S)
+        store.add_session(engine.summary(), started_at, engine.events, group=group,
+                          source=f"{animal_id}.ofj")
+
+
+def assert_same_stats(stats, expected):
+    assert stats.key == expected.key
+    for method in ('group_summary', 'day_summary', 'box_stats'):
+        for measure in ('percent', 'seconds'):
+            np.testing.assert_equal(getattr(stats, method)(measure), getattr(expected, method)(measure))
+
+
+def rebuilt(store):
+    stats = CohortStats()
+    stats.update(store)
+    return stats
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultsStore(str(tmp_path / 'r.db')) as store:
+        add_sessions(store, SESSIONS[:3])
+        yield store
+
+
+def test_incremental_update_matches_full_rebuild(store):
+    stats = CohortStats()
+    assert stats.update(store) == 3
+    stats.group_summary()
+    add_sessions(store, SESSIONS[3:])
+    assert stats.update(store) == 2
+    assert stats.update(store) == 0
+    assert_same_stats(stats, rebuilt(store))
+
+    count, mean, sem = stats.group_summary('seconds')['controle']
+    assert count == 2
+    assert mean[0] == pytest.approx(20)
+    assert sem[0] == pytest.approx(10)
+    assert stats.group_summary('seconds')['Sem grupo'][0] == 1
+
+
+def test_update_rebuilds_after_deletion(store):
+    stats = CohortStats()
+    stats.update(store)
+    with store.connection:
+        store.connection.execute("DELETE FROM sessions WHERE animal_id = 'R2'")
+    add_sessions(store, SESSIONS[3:4])
+    assert stats.update(store) == 3
+    assert_same_stats(stats, rebuilt(store))
+    assert stats.group_summary('seconds')['controle'][0] == 1
+
+
+def test_cache_round_trip_and_open_cohort_reads_only_new_sessions(store, tmp_path):
+    path = str(tmp_path / 'r_coorte.npz')
+    stats = open_cohort(store, path=path)
+    loaded = CohortStats.load(path)
+    assert_same_stats(loaded, stats)
+    assert loaded.groups == stats.groups and loaded.days == stats.days
+
+    add_sessions(store, SESSIONS[3:])
+    loaded = CohortStats.load(path)
+    assert loaded.update(store) == 2
+    assert_same_stats(open_cohort(store, path=path), rebuilt(store))
+    assert CohortStats.load(path).key == rebuilt(store).key
+
+    # Outras áreas ou arquivo corrompido: o cache é descartado
+    assert CohortStats.load(path, zones=('corner', 'center')) is None
+    (tmp_path / 'r_coorte.npz').write_bytes(b'lixo')
+    assert CohortStats.load(path) is None
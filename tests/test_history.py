@@ -0,0 +1,54 @@
+import pytest
+
+from history import SessionIndex
+from results_store import ResultsStore
+from session_engine import NS_PER_S, SessionEngine
+
+
+def summary(animal_id, corner_s):
+    engine = SessionEngine()
+    engine.start(animal_id, 300, t_ns=0)
+    engine.press('corner', NS_PER_S)
+    engine.stop(int((1 + corner_s) * NS_PER_S))
+    return engine.summary()
+
+
+def indexed(index):
+    # {id: (animal, tempo no canto)} do índice
+    return {index.session_id(position): (index.animal_names[index.animals[position]],
+                                         float(index.zone_seconds[position][0]))
+            for position in range(len(index))}
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultsStore(str(tmp_path / 'r.db')) as store:
+        store.ingest_sessions([(summary('R1', 5), '2005-03-01 09:00:00', 'R1.txt', 1),
+                               (summary('R2', 6), '2005-03-02 09:00:00', 'R2.txt', 1)])
+        yield store
+
+
+def test_update_reads_only_new_sessions(store):
+    index = SessionIndex()
+    assert index.update(store) == 2
+    assert index.update(store) == 0
+    store.ingest_sessions([(summary('R3', 7), '2005-03-03 09:00:00', 'R3.txt', 1)])
+    assert index.update(store) == 1
+    assert sorted(value for value in indexed(index).values()) == [('R1', 5.0), ('R2', 6.0), ('R3', 7.0)]
+
+
+def test_update_rebuilds_after_replaced_or_deleted_sessions(store):
+    index = SessionIndex()
+    index.update(store)
+    # Relatório modificado: a sessão mais recente é substituída
+    store.ingest_sessions([(summary('R2', 9), '2005-03-02 09:00:00', 'R2.txt', 2)])
+    assert index.update(store)
+    assert indexed(index) == {row['id']: (row['animal_id'], row['corner_s'])
+                              for row in store.query_sessions()}
+    assert sorted(indexed(index).values()) == [('R1', 5.0), ('R2', 9.0)]
+
+    with store.connection:
+        store.connection.execute("DELETE FROM sessions WHERE animal_id = 'R1'")
+    assert index.update(store)
+    assert list(indexed(index).values()) == [('R2', 9.0)]
+    assert len(index.filter('r1')) == 0
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from journal import (RECORD, JournalWriter, find_unfinished, read_journal, read_journal_raw,
+                     recover_journal, write_journal)
+from session_engine import EVENT_START, EVENT_STOP, NO_ZONE, NS_PER_S, SessionEngine
+
+EVENTS = [(0, NO_ZONE, EVENT_START), (NS_PER_S, 0, 1), (3 * NS_PER_S, 0, 2),
+          (4 * NS_PER_S, 2, 1), (9 * NS_PER_S, 2, 2)]
+HEADER = {'animal_id': 'R1', 'duration': 10, 'zones': ['corner', 'lateral', 'center'],
+          'started_at': '2025-07-01 10:00:00'}
+
+
+def test_writer_records_engine_events(tmp_path):
+    journal = JournalWriter.create('R 1/a', 10, directory=str(tmp_path),
+                                   extra_header={'group': 'controle'})
+    engine = SessionEngine()
+    engine.add_listener(journal.append)
+    engine.start('R 1/a', 10, t_ns=0)
+    engine.press('corner', NS_PER_S)
+    engine.stop(2 * NS_PER_S)
+    journal.close()
+
+    assert os.path.dirname(journal.path) == str(tmp_path)
+    assert os.path.basename(journal.path).startswith('R_1_a_')
+    header, events = read_journal(journal.path)
+    assert header['animal_id'] == 'R 1/a'
+    assert header['group'] == 'controle'
+    assert header == journal.header
+    assert events == engine.events
+
+
+def test_write_and_read_round_trip(tmp_path):
+    path = write_journal(str(tmp_path / 'a.ofj'), HEADER, EVENTS)
+    assert read_journal(path) == (HEADER, EVENTS)
+    header, data = read_journal_raw(path)
+    assert len(data) == len(EVENTS) * RECORD.size
+
+
+@pytest.mark.parametrize('data', [b'OFJ1', b'OFJ1\x10', b'OFJ1\x10\x00\x00\x00{"animal',
+                                  b'OFJ1\x02\x00\x00\x00[]'])
+def test_torn_or_invalid_header_is_rejected(tmp_path, data):
+    path = tmp_path / 'a.ofj'
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        read_journal(str(path))
+    # A recuperação ao abrir o aplicativo ignora o arquivo em vez de falhar
+    assert find_unfinished(str(tmp_path)) == []
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'x.ofj'
+    path.write_bytes(b'nada disso')
+    with pytest.raises(ValueError):
+        read_journal(str(path))
+
+
+def test_recover_drops_torn_record_and_appends_stop(tmp_path):
+    path = write_journal(str(tmp_path / 'a.ofj'), HEADER, EVENTS)
+    complete_size = os.path.getsize(path)
+    with open(path, 'ab') as file:
+        # Registro parcial: gravação interrompida no meio
+        file.write(RECORD.pack(10 * NS_PER_S, 1, 1)[:7])
+
+    assert read_journal(path)[1] == EVENTS
+    assert find_unfinished(str(tmp_path)) == [path]
+
+    header, events = recover_journal(path)
+    assert events == EVENTS + [(9 * NS_PER_S, NO_ZONE, EVENT_STOP)]
+    assert read_journal(path) == (header, events)
+    assert os.path.getsize(path) == complete_size + RECORD.size
+    assert find_unfinished(str(tmp_path)) == []
+
+    # Recuperar de novo não altera o diário
+    assert recover_journal(path) == (header, events)
+    assert read_journal(path)[1] == events
+
+
+def test_find_unfinished_ignores_finished_and_missing_directory(tmp_path):
+    write_journal(str(tmp_path / 'fim.ofj'), HEADER, EVENTS + [(9 * NS_PER_S, NO_ZONE, EVENT_STOP)])
+    (tmp_path / 'outro.txt').write_text('x')
+    assert find_unfinished(str(tmp_path)) == []
+    assert find_unfinished(str(tmp_path / 'nao_existe')) == []
@@ -0,0 +1,65 @@
+import pytest
+
+from journal import write_journal
+from legacy_import import ingest, parse_report
+from results_store import ResultsStore
+from session_engine import NS_PER_S, SessionEngine, format_report
+
+
+def session(animal_id, corner_s):
+    engine = SessionEngine()
+    engine.start(animal_id, 300, t_ns=0)
+    engine.press('corner', NS_PER_S)
+    engine.stop(int((1 + corner_s) * NS_PER_S))
+    return engine
+
+
+def write_report(path, animal_id, started_at, corner_s=10, encoding='utf-8', preamble=''):
+    summary = session(animal_id, corner_s).summary()
+    path.write_text(preamble + format_report(summary, started_at), encoding=encoding)
+    return summary
+
+
+@pytest.mark.parametrize('encoding', ['utf-8', 'latin-1'])
+def test_report_is_parsed_in_either_encoding(tmp_path, encoding):
+    path = tmp_path / 'r.txt'
+    summary = write_report(path, 'Rá1', '2005-03-01 09:30:00', encoding=encoding, preamble="Arena: 3\n")
+
+    record = parse_report(str(path))
+    assert record['animal_id'] == 'Rá1'
+    assert record['started_at'] == '2005-03-01 09:30:00'
+    assert record['duration'] == 300
+    assert record['effective_duration'] == pytest.approx(summary['effective_duration'])
+    assert record['zone_seconds'] == pytest.approx(summary['zone_seconds'], abs=0.005)
+    assert record['zone_percent'] == pytest.approx(summary['zone_percent'], abs=0.005)
+
+
+def test_ingest_reports_errors_and_skips_sessions_already_in_the_store(tmp_path):
+    reports = tmp_path / 'relatorios'
+    (reports / '2005').mkdir(parents=True)
+    write_report(reports / 'utf8.txt', 'R1', '2005-03-01 09:30:00')
+    write_report(reports / '2005' / 'latin1.txt', 'Rá2', '2005-03-02 09:30:00', encoding='latin-1')
+    complete = format_report(session('R3', 5).summary(), '2005-03-03 09:30:00')
+    (reports / 'incompleto.txt').write_text(complete[:complete.index('Tempo Acumulado')], encoding='utf-8')
+    (reports / 'lixo.txt').write_bytes(b'\xff\xfe\x00\x01 sem relatorio\n' * 10)
+    # Relatório exportado junto de um diário: a sessão já vem do diário
+    write_report(reports / 'diario.txt', 'R4', '2005-03-04 09:30:00')
+    write_journal(str(reports / 'diario.ofj'), {'animal_id': 'R4', 'duration': 300},
+                  session('R4', 10).events)
+    # Mesmo animal e mesma data de uma sessão já gravada no banco
+    write_report(reports / 'repetido.txt', 'R5', '2005-03-05 09:30:00')
+    db_path = str(tmp_path / 'r.db')
+    with ResultsStore(db_path) as store:
+        engine = session('R5', 10)
+        store.add_session(engine.summary(), '2005-03-05 09:30:00', engine.events, source='R5.ofj')
+
+    imported, skipped, errors = ingest([str(reports)], db_path, workers=1)
+    assert (imported, skipped) == (2, 2)
+    assert [path for path, _ in errors] == [str(reports / 'incompleto.txt'), str(reports / 'lixo.txt')]
+    assert 'incompleto' in errors[0][1]
+    with ResultsStore(db_path) as store:
+        assert sorted(row['animal_id'] for row in store.query_sessions()) == ['R1', 'R5', 'Rá2']
+
+    # Segunda execução: nada é importado de novo e os erros continuam relatados
+    imported, skipped, errors = ingest([str(reports)], db_path, workers=1)
+    assert (imported, skipped, len(errors)) == (0, 4, 2)
@@ -0,0 +1,119 @@
+import csv
+import math
+import random
+
+import numpy as np
+import pytest
+
+from exporter import write_csv
+from journal import write_journal
+from metrics import (compute_metrics, events_to_arrays, load_journal_arrays, metrics_from_events,
+                     metrics_row)
+from session_engine import EVENT_ENTER, EVENT_EXIT, NS_PER_S, ZONES, SessionEngine
+
+
+def random_events(seed, duration_s=300, visits=200, finish=True):
+    # Sessão gerada pelo próprio motor: entradas, trocas diretas de área e
+    # intervalos sem marcação
+    rng = random.Random(seed)
+    engine = SessionEngine()
+    engine.start('R', duration_s, t_ns=0)
+    t_ns = 0
+    for _ in range(visits):
+        t_ns += rng.randint(1, 3 * NS_PER_S)
+        if engine.active_zone is not None and rng.random() < 0.3:
+            engine.release(engine.active_zone, t_ns)
+        else:
+            engine.press(rng.choice(ZONES), t_ns)
+        if not engine.running:
+            break
+    if finish:
+        engine.stop(t_ns + NS_PER_S)
+    return engine.events
+
+
+def reference_metrics(events, end_ns, n_zones=len(ZONES), bin_ns=60 * NS_PER_S):
+    # Mesmas métricas, evento a evento, sem NumPy
+    visits = []
+    for t_ns, zone, kind in events:
+        if kind == EVENT_ENTER:
+            visits.append([t_ns, end_ns, zone])
+        elif kind == EVENT_EXIT:
+            visits[-1][1] = t_ns
+    entries = [0] * n_zones
+    seconds = [0.0] * n_zones
+    latency = [math.nan] * n_zones
+    for start, end, zone in visits:
+        entries[zone] += 1
+        seconds[zone] += (end - start) / NS_PER_S
+        if math.isnan(latency[zone]):
+            latency[zone] = start / NS_PER_S
+    transitions = [[0] * n_zones for _ in range(n_zones)]
+    for previous, current in zip(visits, visits[1:]):
+        transitions[previous[2]][current[2]] += 1
+    n_bins = max(1, math.ceil(end_ns / bin_ns))
+    occupancy = [[0.0] * n_zones for _ in range(n_bins)]
+    for start, end, zone in visits:
+        for index in range(n_bins):
+            low, high = index * bin_ns, min((index + 1) * bin_ns, end_ns)
+            occupancy[index][zone] += max(0, min(end, high) - max(start, low)) / NS_PER_S
+    return entries, seconds, latency, transitions, occupancy
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_metrics_match_scalar_reference(seed):
+    events = random_events(seed)
+    end_ns = events[-1][0]
+    metrics = metrics_from_events(events)
+    entries, seconds, latency, transitions, occupancy = reference_metrics(events, end_ns)
+
+    assert metrics['end_s'] == end_ns / NS_PER_S
+    assert metrics['entries'].tolist() == entries
+    assert metrics['zone_seconds'] == pytest.approx(seconds)
+    np.testing.assert_allclose(metrics['latency_s'], latency)
+    assert metrics['transitions'].tolist() == transitions
+    np.testing.assert_allclose(metrics['occupancy_s'], occupancy, atol=1e-9)
+    assert metrics['zone_seconds'] == pytest.approx(SessionEngine.from_events('R', 300, events).zone_seconds())
+
+
+def test_open_visit_ends_at_given_instant():
+    events = random_events(7, finish=False)
+    if events[-1][2] == EVENT_EXIT:
+        events = events[:-1]
+    end_ns = events[-1][0] + 5 * NS_PER_S
+    metrics = metrics_from_events(events, end_ns)
+    entries, seconds, latency, transitions, occupancy = reference_metrics(events, end_ns)
+    assert metrics['zone_seconds'] == pytest.approx(seconds)
+    np.testing.assert_allclose(metrics['occupancy_s'], occupancy, atol=1e-9)
+
+
+def test_session_without_entries():
+    metrics = compute_metrics(*events_to_arrays([]), end_ns=90 * NS_PER_S)
+    assert metrics['entries'].tolist() == [0, 0, 0]
+    assert np.isnan(metrics['latency_s']).all()
+    assert metrics['occupancy_s'].shape == (2, len(ZONES))
+    assert not metrics['occupancy_s'].any()
+
+
+def test_journal_arrays_match_event_list(tmp_path):
+    events = random_events(3)
+    path = write_journal(str(tmp_path / 'a.ofj'), {'animal_id': 'R', 'duration': 300}, events)
+    header, t_ns, zone, kind = load_journal_arrays(path)
+    expected = events_to_arrays(events)
+    for loaded, reference in zip((t_ns, zone, kind), expected):
+        assert loaded.tolist() == reference.tolist()
+
+
+def test_row_has_occupancy_columns_and_csv_keeps_all_bins(tmp_path):
+    short = metrics_row(metrics_from_events(random_events(1, duration_s=90, visits=40)))
+    long = metrics_row(metrics_from_events(random_events(2, duration_s=300, visits=200)))
+    assert short['Ocupação min 2 Centro (s)'] >= 0
+    assert 'Ocupação min 3 Centro (s)' not in short
+    assert 'Ocupação min 5 Centro (s)' in long
+
+    path = str(tmp_path / 'm.csv')
+    assert write_csv(path, iter([short, long])) == 2
+    with open(path, encoding='utf-8', newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert rows[0]['Ocupação min 5 Centro (s)'] == ''
+    assert float(rows[1]['Ocupação min 5 Centro (s)']) == pytest.approx(long['Ocupação min 5 Centro (s)'])
@@ -0,0 +1,89 @@
+import pytest
+
+from exporter import write_events_columnar
+from journal import write_journal
+from reliability import compare_sessions, pair_directories
+from session_engine import NS_PER_S, ZONES, SessionEngine
+
+HEADER = {'animal_id': 'R1', 'duration': 10, 'zones': list(ZONES), 'started_at': '2025-07-01 10:00:00'}
+
+
+def scored(marks, stop_s=10):
+    # marks: (início, fim, área) em segundos
+    engine = SessionEngine()
+    engine.start('R1', 10, t_ns=0)
+    for start_s, end_s, zone in marks:
+        engine.press(zone, int(start_s * NS_PER_S))
+        engine.release(zone, int(end_s * NS_PER_S))
+    engine.stop(stop_s * NS_PER_S)
+    return engine.events
+
+
+def reference_states(marks, times_s):
+    states = []
+    for t_s in times_s:
+        inside = [ZONES.index(zone) for start_s, end_s, zone in marks if start_s <= t_s < end_s]
+        states.append(inside[0] if inside else len(ZONES))
+    return states
+
+
+MARKS_A = [(1, 4, 'corner'), (4, 8, 'center')]
+MARKS_B = [(1, 5, 'corner'), (5, 8, 'center')]
+
+
+def test_agreement_matches_sample_by_sample_reference(tmp_path):
+    path_a = write_journal(str(tmp_path / 'a.ofj'), HEADER, scored(MARKS_A))
+    path_b = write_journal(str(tmp_path / 'b.ofj'), HEADER, scored(MARKS_B))
+    result = compare_sessions(path_a, path_b, resolution=0.1, window_seconds=5)
+
+    times_s = [(index + 0.5) * 0.1 for index in range(100)]
+    a = reference_states(MARKS_A, times_s)
+    b = reference_states(MARKS_B, times_s)
+    confusion = [[0] * (len(ZONES) + 1) for _ in range(len(ZONES) + 1)]
+    for state_a, state_b in zip(a, b):
+        confusion[state_a][state_b] += 1
+
+    assert result['samples'] == 100
+    assert result['confusion'].tolist() == confusion
+    assert result['agreement'] == pytest.approx(0.9)
+    assert result['window_agreement'].tolist() == pytest.approx([0.8, 1.0])
+    total = 100
+    observed = sum(confusion[i][i] for i in range(len(confusion))) / total
+    expected = sum(sum(confusion[i]) * sum(row[i] for row in confusion)
+                   for i in range(len(confusion))) / total ** 2
+    assert result['kappa'] == pytest.approx((observed - expected) / (1 - expected))
+
+
+def test_identical_recordings_agree_fully(tmp_path):
+    path = write_journal(str(tmp_path / 'a.ofj'), HEADER, scored(MARKS_A))
+    result = compare_sessions(path, path)
+    assert result['agreement'] == 1.0
+    assert result['kappa'] == 1.0
+
+
+def test_pairs_journal_with_columnar_export_by_animal_and_date(tmp_path):
+    (tmp_path / 'ana').mkdir()
+    (tmp_path / 'bruno').mkdir()
+    write_journal(str(tmp_path / 'ana' / 'R1.ofj'), HEADER, scored(MARKS_A))
+    write_journal(str(tmp_path / 'ana' / 'R2.ofj'), dict(HEADER, animal_id='R2'), scored(MARKS_A))
+    write_events_columnar(str(tmp_path / 'bruno' / 'relatorio_R1.ofc'), scored(MARKS_B),
+                          dict(HEADER, started_at='2025-07-01 10:00:03'))
+
+    pairs, errors = pair_directories(str(tmp_path / 'ana'), str(tmp_path / 'bruno'))
+    assert pairs == [(str(tmp_path / 'ana' / 'R1.ofj'), str(tmp_path / 'bruno' / 'relatorio_R1.ofc'))]
+    assert [key for key, _ in errors] == ['R2 2025-07-01']
+    assert compare_sessions(*pairs[0])['agreement'] == pytest.approx(0.9)
+
+
+def test_unreadable_recordings_are_reported_without_stopping_pairing(tmp_path):
+    (tmp_path / 'ana').mkdir()
+    (tmp_path / 'bruno').mkdir()
+    write_journal(str(tmp_path / 'ana' / 'R1.ofj'), HEADER, scored(MARKS_A))
+    write_journal(str(tmp_path / 'bruno' / 'R1.ofj'), HEADER, scored(MARKS_B))
+    (tmp_path / 'ana' / 'cortado.ofj').write_bytes(b'OFJ1\x10')
+    (tmp_path / 'bruno' / 'lixo.ofc').write_bytes(b'OFC1')
+
+    pairs, errors = pair_directories(str(tmp_path / 'ana'), str(tmp_path / 'bruno'))
+    assert pairs == [(str(tmp_path / 'ana' / 'R1.ofj'), str(tmp_path / 'bruno' / 'R1.ofj'))]
+    assert [path for path, _ in errors] == [str(tmp_path / 'ana' / 'cortado.ofj'),
+                                            str(tmp_path / 'bruno' / 'lixo.ofc')]
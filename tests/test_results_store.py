@@ -0,0 +1,81 @@
+import pytest
+
+from results_store import ResultsStore, row_to_summary
+from session_engine import NS_PER_S, SessionEngine
+
+SESSIONS = [
+    # (animal, início, grupo, protocolo)
+    ('R1', '2025-06-30 23:59:59', 'controle', 'OF5'),
+    ('R1', '2025-07-01 00:00:00', 'controle', 'OF5'),
+    ('R2', '2025-07-01 10:00:00', 'tratado', 'OF5'),
+    ('R3', '2025-07-02 23:59:59', 'tratado', 'OF10'),
+    ('R3', '2025-07-03 00:00:00', '', ''),
+]
+
+
+def session_engine(animal_id, corner_s):
+    engine = SessionEngine()
+    engine.start(animal_id, 300, t_ns=0)
+    engine.press('corner', NS_PER_S)
+    engine.stop(int((1 + corner_s) * NS_PER_S))
+    return engine
+
+
+@pytest.fixture
+def store(tmp_path):
+    with ResultsStore(str(tmp_path / 'r.db')) as store:
+        for number, (animal_id, started_at, group, protocol) in enumerate(SESSIONS):
+            engine = session_engine(animal_id, number + 1)
+            store.add_session(engine.summary(), started_at, engine.events, protocol=protocol,
+                              group=group, source=f"s{number}.ofj")
+        yield store
+
+
+def started(rows):
+    return [row['started_at'] for row in rows]
+
+
+def test_filters(store):
+    assert len(store.query_sessions()) == len(SESSIONS)
+    assert started(store.query_sessions(animal_id='R1')) == ['2025-06-30 23:59:59', '2025-07-01 00:00:00']
+    assert [row['animal_id'] for row in store.query_sessions(group='tratado')] == ['R2', 'R3']
+    assert [row['animal_id'] for row in store.query_sessions(protocol='OF5', group='tratado')] == ['R2']
+    assert [row['animal_id'] for row in store.query_sessions(animal_id='R3', protocol='OF10')] == ['R3']
+
+
+def test_date_range_is_inclusive(store):
+    assert started(store.query_sessions(date_from='2025-07-01', date_to='2025-07-02')) == [
+        '2025-07-01 00:00:00', '2025-07-01 10:00:00', '2025-07-02 23:59:59']
+    assert started(store.query_sessions(date_to='2025-06-30')) == ['2025-06-30 23:59:59']
+    assert started(store.query_sessions(date_from='2025-07-03')) == ['2025-07-03 00:00:00']
+
+
+def test_empty_filters_are_ignored(store):
+    assert len(store.query_sessions(animal_id='', group=None, protocol='')) == len(SESSIONS)
+
+
+def test_same_source_is_stored_once(store):
+    engine = session_engine('R9', 1)
+    assert store.add_session(engine.summary(), '2025-08-01 10:00:00', engine.events,
+                             source='s0.ofj') is None
+    assert len(store.query_sessions()) == len(SESSIONS)
+
+
+def test_session_events_and_summary_round_trip(store):
+    row = store.query_sessions(animal_id='R2')[0]
+    engine = session_engine('R2', 3)
+    assert store.session(row['id'])['animal_id'] == 'R2'
+    assert store.session_events(row['id']) == engine.events
+    summary = row_to_summary(row)
+    assert summary['zone_seconds'] == pytest.approx(engine.summary()['zone_seconds'])
+    assert summary['effective_duration'] == pytest.approx(4.0)
+    assert store.session(10 ** 6) is None
+
+
+def test_ingest_skips_sessions_already_stored(store):
+    engine = session_engine('R2', 3)
+    legacy = [(engine.summary(), '2025-07-01 10:00:00', 'velho/R2.txt', 1),
+              (engine.summary(), '2024-01-01 09:00:00', 'velho/R2_2024.txt', 1)]
+    assert store.ingest_sessions(legacy) == 1
+    assert store.ingested_files() == {'velho/R2.txt': 1, 'velho/R2_2024.txt': 1}
+    assert len(store.query_sessions(animal_id='R2')) == 2
@@ -0,0 +1,117 @@
+import pytest
+
+from session_engine import (EVENT_ENTER, EVENT_EXIT, EVENT_START, EVENT_STOP, NO_ZONE, NS_PER_S,
+                            SessionEngine, summarize_events)
+
+
+class FakeClock:
+    def __init__(self, t_ns=0):
+        self.t_ns = t_ns
+
+    def __call__(self):
+        return self.t_ns
+
+
+def started_engine(duration_s=10, start_ns=1000):
+    engine = SessionEngine(clock=FakeClock(start_ns))
+    engine.start('R1', duration_s, t_ns=start_ns)
+    return engine
+
+
+def test_press_and_release_accumulate_time():
+    engine = started_engine()
+    assert engine.press('center', 1000 + 2 * NS_PER_S)
+    assert engine.release('center', 1000 + 5 * NS_PER_S)
+    assert engine.zone_time_ns('center') == 3 * NS_PER_S
+    assert engine.active_zone is None
+    assert engine.events == [(0, NO_ZONE, EVENT_START),
+                             (2 * NS_PER_S, 2, EVENT_ENTER),
+                             (5 * NS_PER_S, 2, EVENT_EXIT)]
+
+
+def test_entering_a_zone_closes_the_previous_one():
+    engine = started_engine()
+    engine.press('corner', 1000)
+    engine.press('lateral', 1000 + NS_PER_S)
+    assert engine.zone_time_ns('corner') == NS_PER_S
+    assert engine.active_zone == 1
+    assert [kind for _, _, kind in engine.events[1:]] == [EVENT_ENTER, EVENT_EXIT, EVENT_ENTER]
+
+
+def test_repeated_press_and_release_of_other_zone_are_ignored():
+    engine = started_engine()
+    engine.press('corner', 1000)
+    assert not engine.press('corner', 1000 + NS_PER_S)
+    assert not engine.release('center', 1000 + NS_PER_S)
+    assert engine.active_zone == 0
+    assert len(engine.events) == 2
+
+
+def test_events_before_the_last_one_are_clamped():
+    engine = started_engine()
+    engine.press('corner', 1000 + 3 * NS_PER_S)
+    engine.release('corner', 1000 + NS_PER_S)
+    assert engine.events[-1] == (3 * NS_PER_S, 0, EVENT_EXIT)
+    assert engine.zone_time_ns('corner') == 0
+
+
+def test_release_after_deadline_is_clamped_to_duration():
+    engine = started_engine(duration_s=10)
+    engine.press('lateral', 1000 + 4 * NS_PER_S)
+    engine.release('lateral', 1000 + 25 * NS_PER_S)
+    assert engine.zone_time_ns('lateral') == 6 * NS_PER_S
+
+
+def test_press_after_deadline_stops_the_session():
+    engine = started_engine(duration_s=10)
+    assert not engine.press('center', 1000 + 11 * NS_PER_S)
+    assert not engine.running
+    assert engine.events[-1] == (10 * NS_PER_S, NO_ZONE, EVENT_STOP)
+    assert engine.elapsed_ns() == 10 * NS_PER_S
+
+
+def test_tick_stops_at_deadline_and_counts_active_zone():
+    engine = started_engine(duration_s=10)
+    engine.press('center', 1000 + 7 * NS_PER_S)
+    assert engine.tick(1000 + 9 * NS_PER_S)
+    assert not engine.tick(1000 + 12 * NS_PER_S)
+    assert engine.zone_time_ns('center') == 3 * NS_PER_S
+    assert engine.events[-2:] == [(10 * NS_PER_S, 2, EVENT_EXIT), (10 * NS_PER_S, NO_ZONE, EVENT_STOP)]
+
+
+def test_start_is_refused_while_running():
+    engine = started_engine()
+    assert not engine.start('R2', 10, t_ns=0)
+    assert engine.animal_id == 'R1'
+
+
+def test_listeners_receive_relative_events():
+    engine = SessionEngine(clock=FakeClock())
+    received = []
+    engine.add_listener(lambda *event: received.append(event))
+    engine.start('R1', 10, t_ns=500)
+    engine.press('corner', 500 + NS_PER_S)
+    assert received == engine.events
+
+
+def test_load_events_and_summarize_events_agree():
+    engine = started_engine(duration_s=10)
+    engine.press('corner', 1000 + NS_PER_S)
+    engine.press('center', 1000 + 4 * NS_PER_S)
+    engine.release('center', 1000 + 6 * NS_PER_S)
+    engine.stop(1000 + 8 * NS_PER_S)
+
+    rebuilt = SessionEngine.from_events('R1', 10, engine.events)
+    summary = summarize_events('R1', 10, engine.events)
+    assert rebuilt.summary() == engine.summary()
+    assert summary['zone_seconds'] == pytest.approx([3.0, 0.0, 2.0])
+    assert summary['effective_duration'] == pytest.approx(8.0)
+
+
+def test_recovered_session_ends_at_last_event():
+    engine = started_engine(duration_s=10)
+    engine.press('lateral', 1000 + NS_PER_S)
+    rebuilt = SessionEngine.from_events('R1', 10, engine.events[:2] + [(5 * NS_PER_S, 1, EVENT_EXIT)])
+    assert not rebuilt.running
+    assert rebuilt.elapsed_ns() == 5 * NS_PER_S
+    assert rebuilt.zone_time_ns('lateral') == 4 * NS_PER_S
@@ -0,0 +1,112 @@
+import numpy as np
+
+from session_engine import NS_PER_S
+
+# Trajetória do animal traçada pelo observador: amostras (t, x, y) em um
+# buffer circular pré-alocado do NumPy. As posições são relativas à arena
+# (0 a 1); a escala em centímetros é aplicada apenas no cálculo das métricas.
+
+# Lado da arena, em centímetros, usado para converter a distância
+ARENA_SIZE_CM = 50.0
+
+
+def path_length(x, y):
+    # Amostras NaN marcam interrupções do traçado e não contam distância
+    if len(x) < 2:
+        return 0.0
+    return float(np.nansum(np.hypot(np.diff(x), np.diff(y))))
+
+
+class TrajectoryBuffer:
+    """Buffer circular de amostras com compactação em lote.
+
+    Quando o buffer enche, a metade mais antiga é resumida (distância e
+    duração acumuladas) e descartada de uma só vez, de modo que a distância
+    total continua exata e a memória não cresce com a duração da sessão.
+    """
+
+    def __init__(self, capacity=1 << 18):
+        self.capacity = capacity
+        self.t_ns = np.empty(capacity, dtype=np.int64)
+        self.xy = np.empty((capacity, 2), dtype=np.float64)
+        self.clear()
+
+    def clear(self):
+        self.start = 0
+        self.count = 0
+        self.total_samples = 0
+        self.folded_distance = 0.0
+        self.folded_max_speed = 0.0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, t_ns, x, y):
+        if self.count == self.capacity:
+            self._fold(self.capacity // 2)
+        index = (self.start + self.count) % self.capacity
+        self.t_ns[index] = t_ns
+        self.xy[index, 0] = x
+        self.xy[index, 1] = y
+        self.count += 1
+        self.total_samples += 1
+
+    def append_break(self, t_ns):
+        # Interrupção do traçado (ex.: o observador levantou o dedo)
+        self.append(t_ns, np.nan, np.nan)
+
+    def _fold(self, n):
+        # Resume as n amostras mais antigas (incluindo o trecho até a seguinte)
+        t_ns, x, y = self.arrays(n + 1)
+        self.folded_distance += path_length(x, y)
+        self.folded_max_speed = max(self.folded_max_speed, max_speed(t_ns, x, y))
+        self.start = (self.start + n) % self.capacity
+        self.count -= n
+
+    def arrays(self, n=None):
+        # Amostras em ordem cronológica: (t_ns, x, y)
+        n = self.count if n is None else min(n, self.count)
+        indices = (self.start + np.arange(n)) % self.capacity
+        xy = self.xy[indices]
+        return self.t_ns[indices], xy[:, 0], xy[:, 1]
+
+
+def max_speed(t_ns, x, y):
+    if len(t_ns) < 2:
+        return 0.0
+    dt = np.diff(t_ns) / NS_PER_S
+    step = np.hypot(np.diff(x), np.diff(y))
+    valid = (dt > 0) & ~np.isnan(step)
+    if not valid.any():
+        return 0.0
+    return float((step[valid] / dt[valid]).max())
+
+
+def trajectory_metrics(buffer, duration_s, scale_cm=ARENA_SIZE_CM):
+    # Distância percorrida e velocidades, calculadas de forma vetorizada
+    t_ns, x, y = buffer.arrays()
+    distance = (buffer.folded_distance + path_length(x, y)) * scale_cm
+    top_speed = max(buffer.folded_max_speed, max_speed(t_ns, x, y)) * scale_cm
+    return {
+        'distance_cm': distance,
+        'mean_speed_cm_s': distance / duration_s if duration_s > 0 else 0.0,
+        'max_speed_cm_s': top_speed,
+        'samples': buffer.total_samples,
+    }
+
+
+def format_trajectory(metrics):
+    report = "Trajetória (traçado do observador):\n"
+    report += f"  Distância Percorrida: {metrics['distance_cm']:.1f} cm\n"
+    report += f"  Velocidade Média: {metrics['mean_speed_cm_s']:.2f} cm/s\n"
+    report += f"  Velocidade Máxima: {metrics['max_speed_cm_s']:.2f} cm/s\n"
+    report += f"  Amostras: {metrics['samples']}\n\n"
+    return report
+
+
+def trajectory_row(metrics):
+    return {
+        "Distância Percorrida (cm)": metrics['distance_cm'],
+        "Velocidade Média (cm/s)": metrics['mean_speed_cm_s'],
+        "Velocidade Máxima (cm/s)": metrics['max_speed_cm_s'],
+    }
@@ -0,0 +1,287 @@
+import argparse
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from arena_geometry import ArenaGeometry, load_geometry
+from journal import JOURNAL_EXT, write_journal
+from metrics import compute_metrics, format_metrics
+from session_engine import (NS_PER_S, NO_ZONE, ZONES, EVENT_START, EVENT_ENTER, EVENT_EXIT,
+                            EVENT_STOP, format_report, summarize_events)
+
+# Rastreamento offline: classifica a posição do animal em cada quadro de um
+# vídeo gravado (ou de um diretório de imagens) nas mesmas áreas do
+# aplicativo e gera o mesmo relatório. A localização usa subtração de fundo
+# e centroide com NumPy; os quadros são processados em blocos por um pool de
+# processos, com um número limitado de blocos em andamento.
+#
+# Uso:
+#   python video_tracker.py sessao.mp4 --id R01 --arena 40,20,600,460
+#   python video_tracker.py quadros/ --fps 30 --id R01 --geometry arena.json --journal sessoes/
+#
+# Vídeos exigem OpenCV (pip install opencv-python); diretórios de imagens
+# usam apenas Pillow.
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+
+class ImageSequence:
+    def __init__(self, directory, fps):
+        self.paths = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        self.fps = fps
+
+    def __len__(self):
+        return len(self.paths)
+
+    def frame(self, index):
+        from PIL import Image
+        with Image.open(self.paths[index]) as image:
+            return np.asarray(image.convert('L'))
+
+    def __iter__(self):
+        for index in range(len(self.paths)):
+            yield self.frame(index)
+
+
+class VideoFile:
+    def __init__(self, path, fps=None):
+        try:
+            import cv2
+        except ImportError:
+            raise RuntimeError("Leitura de vídeo requer OpenCV: pip install opencv-python")
+        self.cv2 = cv2
+        self.path = path
+        capture = cv2.VideoCapture(path)
+        if not capture.isOpened():
+            raise RuntimeError(f"Não foi possível abrir o vídeo: {path}")
+        self.count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fps = fps or capture.get(cv2.CAP_PROP_FPS) or 30.0
+        capture.release()
+
+    def __len__(self):
+        return self.count
+
+    def _gray(self, frame):
+        return self.cv2.cvtColor(frame, self.cv2.COLOR_BGR2GRAY)
+
+    def frame(self, index):
+        capture = self.cv2.VideoCapture(self.path)
+        capture.set(self.cv2.CAP_PROP_POS_FRAMES, index)
+        ok, frame = capture.read()
+        capture.release()
+        if not ok:
+            raise RuntimeError(f"Falha ao ler o quadro {index} de {self.path}")
+        return self._gray(frame)
+
+    def __iter__(self):
+        capture = self.cv2.VideoCapture(self.path)
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield self._gray(frame)
+        finally:
+            capture.release()
+
+
+def open_source(path, fps=None):
+    if os.path.isdir(path):
+        return ImageSequence(path, fps or 30.0)
+    return VideoFile(path, fps)
+
+
+def estimate_background(source, samples=25):
+    # Mediana de quadros espalhados pela gravação: o animal se move e some
+    indices = np.unique(np.linspace(0, len(source) - 1, num=min(samples, len(source))).astype(int))
+    stack = np.stack([source.frame(int(index)) for index in indices])
+    return np.median(stack, axis=0).astype(np.int16)
+
+
+# Estado dos processos de trabalho (definido uma vez pelo initializer)
+_background = None
+_threshold = None
+_min_pixels = None
+
+
+def _init_worker(background, threshold, min_pixels):
+    global _background, _threshold, _min_pixels
+    _background = background
+    _threshold = threshold
+    _min_pixels = min_pixels
+
+
+def locate_chunk(frames):
+    # frames: (n, altura, largura) uint8 -> centroides (n, 2); NaN se não detectado
+    mask = np.abs(frames.astype(np.int16) - _background) > _threshold
+    counts = mask.sum(axis=(1, 2))
+    rows = np.arange(frames.shape[1], dtype=np.float64)
+    cols = np.arange(frames.shape[2], dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        y = (mask.sum(axis=2) * rows).sum(axis=1) / counts
+        x = (mask.sum(axis=1) * cols).sum(axis=1) / counts
+    lost = counts < _min_pixels
+    x[lost] = np.nan
+    y[lost] = np.nan
+    return np.column_stack((x, y))
+
+
+def _chunks(frames, size):
+    chunk = []
+    for frame in frames:
+        chunk.append(frame)
+        if len(chunk) == size:
+            yield np.stack(chunk)
+            chunk = []
+    if chunk:
+        yield np.stack(chunk)
+
+
+def track_positions(source, background, threshold=30, min_pixels=20, chunk_size=64, workers=None):
+    # Pipeline limitado: no máximo 2 blocos por processo aguardando resultado
+    workers = workers or os.cpu_count() or 1
+    max_pending = workers * 2
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(background, threshold, min_pixels)) as executor:
+        pending = deque()
+        for chunk in _chunks(source, chunk_size):
+            if len(pending) >= max_pending:
+                results.append(pending.popleft().result())
+            pending.append(executor.submit(locate_chunk, chunk))
+        while pending:
+            results.append(pending.popleft().result())
+    if not results:
+        return np.zeros((0, 2))
+    return np.concatenate(results)
+
+
+def fill_lost(zones):
+    # Quadros sem detecção mantêm a última área conhecida
+    valid = zones >= 0
+    if not valid.any():
+        return zones
+    index = np.where(valid, np.arange(len(zones)), 0)
+    np.maximum.accumulate(index, out=index)
+    filled = zones[index]
+    first = np.argmax(valid)
+    filled[:first] = zones[first]
+    return filled
+
+
+def zones_to_events(zones, fps):
+    # Sequência de áreas por quadro -> eventos no formato do SessionEngine
+    n_frames = len(zones)
+    end_ns = int(round(n_frames / fps * NS_PER_S))
+    if n_frames == 0:
+        return [(0, NO_ZONE, EVENT_START), (0, NO_ZONE, EVENT_STOP)]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(zones)) + 1))
+    start_ns = np.round(starts / fps * NS_PER_S).astype(np.int64)
+    end_visit_ns = np.append(start_ns[1:], end_ns)
+    visit_zones = zones[starts]
+
+    events = [(0, NO_ZONE, EVENT_START)]
+    for t_enter, t_exit, zone in zip(start_ns.tolist(), end_visit_ns.tolist(), visit_zones.tolist()):
+        events.append((t_enter, zone, EVENT_ENTER))
+        events.append((t_exit, zone, EVENT_EXIT))
+    events.append((end_ns, NO_ZONE, EVENT_STOP))
+    return events
+
+
+def track_session(path, geometry=None, fps=None, threshold=30, min_pixels=20,
+                  chunk_size=64, workers=None):
+    source = open_source(path, fps)
+    if len(source) == 0:
+        raise RuntimeError(f"Nenhum quadro encontrado em {path}")
+    background = estimate_background(source)
+    if geometry is None:
+        height, width = background.shape
+        geometry = ArenaGeometry(0, 0, width, height)
+    positions = track_positions(source, background, threshold, min_pixels, chunk_size, workers)
+    zones = fill_lost(geometry.classify_array(positions[:, 0], positions[:, 1]))
+    lost_frames = int(np.isnan(positions[:, 0]).sum())
+    if lost_frames == len(positions):
+        raise RuntimeError("O animal não foi detectado em nenhum quadro (ajuste --threshold)")
+    return zones_to_events(zones, source.fps), source.fps, len(positions), lost_frames
+
+
+def parse_arena(text):
+    x0, y0, x1, y1 = (float(value) for value in text.split(','))
+    return x0, y0, x1, y1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rastreamento offline de sessões do Open Field")
+    parser.add_argument('source', help="Arquivo de vídeo ou diretório de imagens")
+    parser.add_argument('--id', dest='animal_id', required=True, help="ID do animal")
+    parser.add_argument('--fps', type=float, help="Quadros por segundo (padrão: do vídeo ou 30)")
+    parser.add_argument('--arena', type=parse_arena, help="Retângulo da arena em pixels: x0,y0,x1,y1")
+    parser.add_argument('--border', type=float, default=0.25,
+                        help="Largura da periferia como fração do lado (padrão: 0.25)")
+    parser.add_argument('--geometry', help="Arquivo JSON com a geometria da arena")
+    parser.add_argument('--threshold', type=int, default=30, help="Limiar da subtração de fundo")
+    parser.add_argument('--min-pixels', type=int, default=20, help="Área mínima detectada (pixels)")
+    parser.add_argument('--workers', type=int, default=None, help="Número de processos")
+    parser.add_argument('--journal', help="Diretório onde gravar o diário da sessão (.ofj)")
+    args = parser.parse_args(argv)
+
+    if args.geometry:
+        geometry = load_geometry(args.geometry)
+    elif args.arena:
+        geometry = ArenaGeometry(*args.arena, border=args.border)
+    else:
+        geometry = None
+
+    started = time.perf_counter()
+    try:
+        events, fps, n_frames, lost_frames = track_session(
+            args.source, geometry, args.fps, args.threshold, args.min_pixels, workers=args.workers)
+    except RuntimeError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+
+    duration = round(n_frames / fps)
+    summary = summarize_events(args.animal_id, duration, events)
+    t_ns, zone, kind = (np.array(column, dtype=np.int64) for column in zip(*events))
+    print(format_report(summary) + format_metrics(compute_metrics(t_ns, zone, kind)), end='')
+
+    if args.journal:
+        header = {
+            'animal_id': args.animal_id,
+            'duration': duration,
+            'zones': list(ZONES),
+            'started_at': time.strftime('%Y-%m-%d %H:%M:%S',
+                                        time.localtime(os.path.getmtime(args.source))),
+            'source': os.path.abspath(args.source),
+        }
+        stem = os.path.join(args.journal, f"{args.animal_id}_{time.strftime('%Y%m%d_%H%M%S')}_video")
+        path = stem + JOURNAL_EXT
+        suffix = 1
+        try:
+            os.makedirs(args.journal, exist_ok=True)
+            while True:
+                # Mesma sessão rastreada de novo no mesmo segundo: novo sufixo
+                try:
+                    write_journal(path, header, events)
+                    break
+                except FileExistsError:
+                    path = f"{stem}_{suffix}{JOURNAL_EXT}"
+                    suffix += 1
+        except OSError as e:
+            print(f"Erro: não foi possível gravar o diário em {path}: {e}", file=sys.stderr)
+            return 1
+        print(f"Diário gravado em {path}", file=sys.stderr)
+
+    print(f"{n_frames} quadros ({n_frames / fps:.1f} s de gravação) processados em {elapsed:.2f} s; "
+          f"{lost_frames} sem detecção", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
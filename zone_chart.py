@@ -0,0 +1,87 @@
+import math
+
+from matplotlib.figure import Figure
+
+from session_engine import ZONES, ZONE_LABELS
+
+# Gráfico de pizza do tempo por área, usando apenas matplotlib (sem pyplot e
+# sem Kivy). A figura e as fatias são criadas uma única vez; atualizações
+# apenas reposicionam as fatias e os textos existentes.
+
+ZONE_COLORS = {'corner': 'red', 'lateral': 'skyblue', 'center': 'forestgreen'}
+CHART_TITLE = "Distribuição de Tempo por Área"
+
+START_ANGLE = 90
+LABEL_DISTANCE = 1.1
+PCT_DISTANCE = 0.85
+
+
+class ZonePie:
+    def __init__(self, figure=None, zones=ZONES, figsize=(6, 4), ax=None):
+        # ax: eixos já existentes (ex.: parte de uma página de relatório)
+        self.zones = tuple(zones)
+        if ax is not None:
+            self.figure = ax.figure
+            self.ax = ax
+        else:
+            self.figure = figure if figure is not None else Figure(figsize=figsize)
+            self.ax = self.figure.add_subplot(111)
+
+        self.wedges, self.texts, self.autotexts = self.ax.pie(
+            [1] * len(self.zones),
+            labels=[ZONE_LABELS.get(zone, zone) for zone in self.zones],
+            colors=[ZONE_COLORS.get(zone, 'gray') for zone in self.zones],
+            autopct='%1.1f%%',
+            startangle=START_ANGLE,
+            labeldistance=LABEL_DISTANCE,
+            pctdistance=PCT_DISTANCE
+        )
+
+        # Ajusta o texto
+        for autotext in self.autotexts:
+            autotext.set_color('black')
+            autotext.set_fontsize(10)
+        for text in self.texts:
+            text.set_fontsize(10)
+
+        self.ax.axis('equal')
+        self.ax.set_title(CHART_TITLE)
+
+        self.sizes = None
+
+    def update(self, sizes):
+        # Atualiza as fatias no lugar. Retorna False quando nada mudou
+        # (com a resolução exibida no relatório), para evitar redesenhos.
+        sizes = tuple(round(max(size, 0.0), 2) for size in sizes)
+        if sizes == self.sizes:
+            return False
+        self.sizes = sizes
+
+        total = sum(sizes)
+        theta1 = START_ANGLE
+        for wedge, text, autotext, size in zip(self.wedges, self.texts, self.autotexts, sizes):
+            # Remove áreas com tempo zero
+            visible = size > 0 and total > 0
+            wedge.set_visible(visible)
+            text.set_visible(visible)
+            autotext.set_visible(visible)
+            if not visible:
+                continue
+
+            fraction = size / total
+            theta2 = theta1 + 360 * fraction
+            wedge.set_theta1(theta1)
+            wedge.set_theta2(theta2)
+
+            angle = math.radians((theta1 + theta2) / 2)
+            x, y = math.cos(angle), math.sin(angle)
+            r = wedge.r
+            text.set_position((LABEL_DISTANCE * r * x, LABEL_DISTANCE * r * y))
+            text.set_horizontalalignment('left' if x > 0 else 'right')
+            autotext.set_position((PCT_DISTANCE * r * x, PCT_DISTANCE * r * y))
+            autotext.set_text(f"{fraction * 100:.1f}%")
+            theta1 = theta2
+        return True
+
+    def has_data(self):
+        return bool(self.sizes) and sum(self.sizes) > 0
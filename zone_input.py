@@ -0,0 +1,106 @@
+import json
+import os
+import time
+from array import array
+
+from session_engine import NS_PER_S, now_ns
+
+# Entrada de áreas por teclado ou pedal USB (que se apresenta como teclado),
+# independente de Kivy. Os instantes registrados vêm do próprio evento de
+# entrada, e não do momento em que o tratador é executado.
+
+# Tecla -> área. Os nomes seguem kivy.core.window.Keyboard.keycodes
+DEFAULT_KEY_BINDINGS = {'1': 'corner', '2': 'lateral', '3': 'center'}
+KEY_BINDINGS_FILE = 'teclas_areas.json'
+
+
+def load_key_bindings(path=KEY_BINDINGS_FILE):
+    # Lê o mapeamento tecla -> área de um arquivo JSON, se existir
+    if not os.path.exists(path):
+        return dict(DEFAULT_KEY_BINDINGS)
+    with open(path, encoding='utf-8') as file:
+        return dict(json.load(file))
+
+
+def wall_to_monotonic_ns(wall_s, t_ns=None):
+    # Converte um instante de relógio de parede (ex.: MotionEvent.time_start)
+    # para o relógio monotônico do motor, pela idade do evento
+    if t_ns is None:
+        t_ns = now_ns()
+    age_ns = int((time.time() - wall_s) * NS_PER_S)
+    return t_ns - max(0, age_ns)
+
+
+def touch_event_ns(touch, released=False):
+    # Instante do toque que gerou o on_press/on_release de um botão
+    if touch is None:
+        return None
+    if released:
+        wall_s = touch.time_end if touch.time_end > 0 else touch.time_update
+    else:
+        wall_s = touch.time_start
+    return wall_to_monotonic_ns(wall_s)
+
+
+class KeyZoneInput:
+    """Traduz teclas pressionadas/soltas em entradas e saídas de área.
+
+    bindings mapeia códigos de tecla (int) para áreas. A repetição
+    automática do teclado é ignorada enquanto a tecla continuar pressionada.
+    """
+
+    def __init__(self, bindings, press, release):
+        self.bindings = dict(bindings)
+        self.press = press
+        self.release = release
+        self.held = set()
+
+    def key_down(self, keycode, t_ns):
+        zone = self.bindings.get(keycode)
+        if zone is None:
+            return False
+        if keycode not in self.held:
+            self.held.add(keycode)
+            self.press(zone, t_ns)
+        return True
+
+    def key_up(self, keycode, t_ns):
+        zone = self.bindings.get(keycode)
+        if zone is None:
+            return False
+        if keycode in self.held:
+            self.held.discard(keycode)
+            self.release(zone, t_ns)
+        return True
+
+    def reset(self):
+        self.held.clear()
+
+
+class LatencyStats:
+    # Distribuição da latência entre o evento de entrada e o registro no motor
+
+    def __init__(self):
+        self.samples = array('q')
+
+    def add(self, latency_ns):
+        self.samples.append(latency_ns)
+
+    def clear(self):
+        self.samples = array('q')
+
+    def percentiles(self, qs=(50, 90, 99, 100)):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        last = len(ordered) - 1
+        return {q: ordered[min(last, int(round(q / 100 * last)))] for q in qs}
+
+    def report(self):
+        if not self.samples:
+            return "Nenhuma entrada registrada ainda."
+        lines = [f"Entradas medidas: {len(self.samples)}"]
+        for q, value in self.percentiles().items():
+            name = "máx" if q == 100 else f"p{q}"
+            lines.append(f"  {name}: {value / 1e6:.3f} ms")
+        return "\n".join(lines)